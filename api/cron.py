@@ -25,7 +25,7 @@ class handler(BaseHTTPRequestHandler):
             logger.info(f"Cron job started at {datetime.now().isoformat()}")
             
             # Run the channel check task
-            updates = check_channels_for_updates()
+            summary = check_channels_for_updates()
             
             # Calculate execution time
             execution_time = time.time() - start_time
@@ -36,8 +36,10 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             
             response = f"Cron job completed in {execution_time:.2f} seconds. Checked for updates on YouTube channels."
-            if updates:
-                response += f" Found {len(updates)} new videos."
+            if summary:
+                response += (f" Checked {summary['channels_checked']} channels"
+                             f" ({summary['not_modified']} unchanged), found {summary['new_videos']} new videos,"
+                             f" processed {summary.get('deliveries', 0)} webhook deliveries.")
             
             self.wfile.write(response.encode())
             logger.info(f"Cron job completed in {execution_time:.2f} seconds")
@@ -14,8 +14,12 @@ load_dotenv()
 mongo = PyMongo()
 socketio = SocketIO(cors_allowed_origins="*", async_mode=None)
 
-def create_app(config_name=None):
-    """Create and configure the Flask application"""
+def create_app(config_name=None, start_monitor=None):
+    """
+    Create and configure the Flask application
+    
+    start_monitor overrides RUN_MONITOR (the standalone worker starts the monitor itself)
+    """
     
     app = Flask(__name__)
     
@@ -34,15 +38,50 @@ def create_app(config_name=None):
         app.config['MONGO_CONNECT'] = False  # Connect on first use instead of on initialization
         mongo.init_app(app)
         app.logger.info("MongoDB initialized successfully")
+        
+        # Apply the index registry (no-op for indexes that already exist)
+        if app.config.get('CREATE_INDEXES_ON_STARTUP', True):
+            from app.models.indexes import ensure_indexes
+            ensure_indexes()
     else:
         app.logger.error("MONGO_URI environment variable is not set!")
     
+    # Configure the shared pooled HTTP client used for YouTube API calls,
+    # the per-receiver sessions used for webhook notifications and the WebSub hub client
+    from app.services.http_client import youtube_http, webhook_http, websub_http
+    youtube_http.init_app(app)
+    webhook_http.init_app(app)
+    websub_http.init_app(app)
+    
+    # Size the in-memory known-video index; it is built when the monitor starts
+    from app.services.video_index import known_videos
+    known_videos.init_app(app)
+    
+    # Daily quota budget for the YouTube API ledger
+    from app.services.quota_service import quota_ledger
+    quota_ledger.init_app(app)
+    
+    # Pool of YouTube API keys that every API call takes its key from
+    from app.services.api_key_pool import youtube_keys
+    youtube_keys.init_app(app)
+    
+    # Lease that picks the one worker process running the monitor
+    from app.services.leader_lease import monitor_lease
+    monitor_lease.init_app(app)
+    
+    # Bounded pool that processes WebSub pushes
+    from app.services.websub_service import websub_pushes
+    websub_pushes.init_app(app)
+    
     # Initialize SocketIO safely - for Vercel we'll limit some functionality
     try:
         # In serverless env, use threading mode instead of eventlet/gevent
         socketio_mode = "threading" if os.environ.get('VERCEL', False) else os.environ.get('SOCKETIO_ASYNC_MODE', 'eventlet')
-        socketio.init_app(app, async_mode=socketio_mode, cors_allowed_origins="*")
-        app.logger.info(f"SocketIO initialized successfully with mode: {socketio_mode}")
+        # A shared message queue lets other processes (the monitor worker) emit to our clients
+        message_queue = app.config.get('SOCKETIO_MESSAGE_QUEUE') or None
+        socketio.init_app(app, async_mode=socketio_mode, cors_allowed_origins="*", message_queue=message_queue)
+        app.logger.info(f"SocketIO initialized successfully with mode: {socketio_mode}"
+                        f"{', message queue: ' + message_queue.split('@')[-1] if message_queue else ''}")
     except Exception as e:
         app.logger.warning(f"Failed to initialize SocketIO: {str(e)}")
     
@@ -51,11 +90,17 @@ def create_app(config_name=None):
     from app.routes.channels import channels_bp
     from app.routes.webhooks import webhooks_bp
     from app.routes.settings import settings_bp
+    from app.routes.websub import websub_bp
     
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(channels_bp, url_prefix='/channels')
     app.register_blueprint(webhooks_bp, url_prefix='/webhooks')
     app.register_blueprint(settings_bp, url_prefix='/settings')
+    app.register_blueprint(websub_bp, url_prefix='/websub')
+    
+    # Register CLI maintenance commands
+    from app.commands import register_commands
+    register_commands(app)
     
     # Initialize app-specific configurations if any
     if hasattr(config[config_name], 'init_app'):
@@ -65,8 +110,13 @@ def create_app(config_name=None):
     from app.logging_config import configure_logging
     configure_logging(app)
     
+    if start_monitor is None:
+        start_monitor = app.config.get('RUN_MONITOR', True)
+    
     # Setup monitoring task - disable in Vercel environment
-    if not os.environ.get('VERCEL', False):
+    if not start_monitor:
+        app.logger.info("Monitor not started in this process (RUN_MONITOR=False)")
+    elif not os.environ.get('VERCEL', False):
         try:
             from app.tasks.monitor_task import setup_monitor
             setup_monitor(app)
@@ -0,0 +1,73 @@
+# app/commands.py
+
+import click
+import logging
+
+logger = logging.getLogger(__name__)
+
+def register_commands(app):
+    """Register maintenance commands with the Flask CLI"""
+    
+    @app.cli.command('backfill-playlists')
+    @click.option('--batch-size', default=50, show_default=True, help='Channel IDs per channels.list request (max 50)')
+    def backfill_playlists(batch_size):
+        """Store the uploads playlist ID on every channel that is missing one"""
+        from app.services.youtube_service import YouTubeService
+        
+        results = YouTubeService.backfill_uploads_playlist_ids(batch_size=batch_size)
+        click.echo(
+            f"Updated {results['updated']} channels, "
+            f"{results['missing']} not found on YouTube, "
+            f"{results['failed_batches']} failed batches"
+        )
+    
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """Create every index in the index registry that doesn't exist yet"""
+        from app.models.indexes import ensure_indexes
+        
+        results = ensure_indexes()
+        for index_name in results['created']:
+            click.echo(f"  ok      {index_name}")
+        for index_name in results['failed']:
+            click.echo(f"  FAILED  {index_name}")
+        click.echo(f"{len(results['created'])} indexes in place, {len(results['failed'])} failed")
+    
+    @app.cli.command('index-report')
+    def index_report():
+        """Explain the hot queries and flag any that still scan a whole collection"""
+        from app.models.indexes import index_report as build_index_report
+        
+        report = build_index_report()
+        for entry in report:
+            if entry['error']:
+                status = 'ERROR'
+            elif entry['collscan']:
+                status = 'COLLSCAN'
+            elif entry['in_memory_sort']:
+                status = 'SORT'
+            else:
+                status = 'ok'
+            plan = entry['error'] or ' <- '.join(entry['stages'])
+            click.echo(f"  {status:<9} {entry['collection']}: {entry['query']} [{plan}]")
+        
+        collscans = sum(1 for entry in report if entry['collscan'])
+        click.echo(f"{collscans} of {len(report)} hot queries do a collection scan")
+    
+    @app.cli.command('websub-subscribe')
+    @click.option('--all', 'subscribe_all', is_flag=True, help='Re-subscribe every active channel, not just the ones due')
+    def websub_subscribe(subscribe_all):
+        """Subscribe active channels to WebSub push notifications (normally done by the monitor)"""
+        from app import mongo
+        from app.services.websub_service import WebSubService
+        
+        if not WebSubService.enabled():
+            click.echo("WebSub is disabled (set WEBSUB_ENABLED and WEBSUB_CALLBACK_URL)")
+            return
+        
+        channels = list(mongo.db.channels.find({'active': True}))
+        if subscribe_all:
+            accepted = sum(1 for channel in channels if WebSubService.subscribe(channel['channel_id']))
+        else:
+            accepted = WebSubService.renew_subscriptions(channels)
+        click.echo(f"Hub accepted {accepted} subscription requests for {len(channels)} active channels")
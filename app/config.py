@@ -18,11 +18,104 @@ class Config:
         logger.info(f"Loaded YouTube API key from environment: {masked_key}")
     else:
         logger.error("No YouTube API key found in environment variables")
+    
+    # Extra keys from other Google Cloud projects (comma separated); pooled with YOUTUBE_API_KEY
+    YOUTUBE_API_KEYS = os.environ.get('YOUTUBE_API_KEYS', '')
         
     POLLING_INTERVAL = int(os.environ.get('POLLING_INTERVAL', 3600))  # Default: 1 hour
     MAX_RETRIES = int(os.environ.get('MAX_RETRIES', 3))
     RETRY_DELAY = int(os.environ.get('RETRY_DELAY', 300))  # Default: 5 minutes
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    
+    # Shared HTTP client settings (connection pooling and timeouts for YouTube API calls)
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 20))
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 15))
+    
+    # Number of channels checked in parallel by the monitor (1 = sequential)
+    CHECK_CONCURRENCY = int(os.environ.get('CHECK_CONCURRENCY', 1))
+    
+    # Number of webhooks notified in parallel: the fan-out of a manual notification, and
+    # the delivery worker threads sending queued notifications from the outbox
+    WEBHOOK_CONCURRENCY = int(os.environ.get('WEBHOOK_CONCURRENCY', 8))
+    
+    # Webhook outbox: idle delivery workers look for due jobs this often; a job claimed by a
+    # worker that died is retried after OUTBOX_LEASE_SECONDS. Failed deliveries are retried
+    # MAX_RETRIES times, starting after ~RETRY_DELAY and doubling up to OUTBOX_MAX_BACKOFF
+    OUTBOX_POLL_SECONDS = float(os.environ.get('OUTBOX_POLL_SECONDS', 5))
+    OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', 60))
+    OUTBOX_MAX_BACKOFF = int(os.environ.get('OUTBOX_MAX_BACKOFF', 21600))  # 6 hours
+    
+    # Webhook receivers get one keep-alive session per scheme+host with up to WEBHOOK_POOL_SIZE
+    # connections; sessions unused for WEBHOOK_SESSION_IDLE_SECONDS are closed
+    WEBHOOK_POOL_SIZE = int(os.environ.get('WEBHOOK_POOL_SIZE', 4))
+    WEBHOOK_SESSION_IDLE_SECONDS = int(os.environ.get('WEBHOOK_SESSION_IDLE_SECONDS', 300))
+    
+    # Set RUN_MONITOR=False when a standalone worker (python -m app.worker) runs the monitor,
+    # so web processes only serve the UI/API. Socket.IO events from the worker reach browsers
+    # through SOCKETIO_MESSAGE_QUEUE (e.g. redis://redis:6379/0), which all processes must share
+    RUN_MONITOR = os.environ.get('RUN_MONITOR', 'True').lower() in ('true', '1', 't')
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+    
+    # With several worker processes only the one holding the monitor lease checks channels;
+    # a dead leader is replaced once its lease (renewed every heartbeat) expires
+    LEADER_ELECTION = os.environ.get('LEADER_ELECTION', 'True').lower() in ('true', '1', 't')
+    LEADER_LEASE_SECONDS = int(os.environ.get('LEADER_LEASE_SECONDS', 15))
+    LEADER_HEARTBEAT_SECONDS = float(os.environ.get('LEADER_HEARTBEAT_SECONDS', 5))
+    
+    # Sharded checks: every worker process (web or standalone) claims batches of due channels
+    # with a lease, so checking scales out; claims of a dead worker expire after CLAIM_LEASE_SECONDS
+    CHECK_SHARDING = os.environ.get('CHECK_SHARDING', 'False').lower() in ('true', '1', 't')
+    CLAIM_BATCH_SIZE = int(os.environ.get('CLAIM_BATCH_SIZE', 10))
+    CLAIM_LEASE_SECONDS = int(os.environ.get('CLAIM_LEASE_SECONDS', 300))
+    
+    # Checks of a channel that finished less than this many seconds ago are reused
+    # (page views, manual and scheduled checks); concurrent checks always share one run
+    CHECK_FRESHNESS_SECONDS = int(os.environ.get('CHECK_FRESHNESS_SECONDS', 60))
+    
+    # Channels are checked one by one as they fall due; each next check is scheduled one
+    # interval later +/- this fraction so checks stay spread out (0-0.5)
+    SCHEDULE_JITTER = float(os.environ.get('SCHEDULE_JITTER', 0.1))
+    
+    # New-video detection: 'api' (Data API only) or 'rss' (probe the free channel feed first,
+    # call the API only when it shows an unseen video)
+    DETECTION_MODE = os.environ.get('DETECTION_MODE', 'api')
+    
+    # Adaptive polling: each channel gets its own interval from its upload cadence, checked once
+    # a new upload is ADAPTIVE_TARGET_PROBABILITY likely (POLLING_INTERVAL becomes the longest sleep)
+    ADAPTIVE_POLLING = os.environ.get('ADAPTIVE_POLLING', 'False').lower() in ('true', '1', 't')
+    ADAPTIVE_MIN_INTERVAL = int(os.environ.get('ADAPTIVE_MIN_INTERVAL', 300))  # 5 minutes
+    ADAPTIVE_MAX_INTERVAL = int(os.environ.get('ADAPTIVE_MAX_INTERVAL', 86400))  # 1 day
+    ADAPTIVE_TARGET_PROBABILITY = float(os.environ.get('ADAPTIVE_TARGET_PROBABILITY', 0.1))
+    
+    # WebSub (PubSubHubbub) push: channels with a live subscription are only polled every
+    # WEBSUB_SAFETY_NET_INTERVAL seconds. WEBSUB_CALLBACK_URL is the public URL of /websub/callback.
+    # Each subscription gets its own secret; WEBSUB_SECRET only covers subscriptions made before that
+    WEBSUB_ENABLED = os.environ.get('WEBSUB_ENABLED', 'False').lower() in ('true', '1', 't')
+    WEBSUB_HUB_URL = os.environ.get('WEBSUB_HUB_URL', 'https://pubsubhubbub.appspot.com/subscribe')
+    WEBSUB_CALLBACK_URL = os.environ.get('WEBSUB_CALLBACK_URL', '')
+    WEBSUB_SECRET = os.environ.get('WEBSUB_SECRET', '')
+    WEBSUB_LEASE_SECONDS = int(os.environ.get('WEBSUB_LEASE_SECONDS', 432000))  # 5 days
+    WEBSUB_RENEW_BEFORE = int(os.environ.get('WEBSUB_RENEW_BEFORE', 86400))  # Renew a day before expiry
+    WEBSUB_SAFETY_NET_INTERVAL = int(os.environ.get('WEBSUB_SAFETY_NET_INTERVAL', 21600))  # 6 hours
+    WEBSUB_PUSH_WORKERS = int(os.environ.get('WEBSUB_PUSH_WORKERS', 4))
+    WEBSUB_PUSH_QUEUE = int(os.environ.get('WEBSUB_PUSH_QUEUE', 100))  # Pushes waiting beyond this get a 503
+    
+    # Detection engine: 'sync' (threads, see CHECK_CONCURRENCY) or 'async' (one asyncio event loop)
+    CHECK_ENGINE = os.environ.get('CHECK_ENGINE', 'sync')
+    ASYNC_MAX_IN_FLIGHT = int(os.environ.get('ASYNC_MAX_IN_FLIGHT', 50))
+    ASYNC_CYCLE_DEADLINE = int(os.environ.get('ASYNC_CYCLE_DEADLINE', 900))  # Seconds, 0 = no deadline
+    
+    # In-memory index of known video IDs (Bloom filter sized for this many videos before growing)
+    VIDEO_INDEX_CAPACITY = int(os.environ.get('VIDEO_INDEX_CAPACITY', 1000000))
+    VIDEO_INDEX_ERROR_RATE = float(os.environ.get('VIDEO_INDEX_ERROR_RATE', 0.01))
+    
+    # Daily YouTube Data API quota (units) per API key
+    YOUTUBE_DAILY_QUOTA = int(os.environ.get('YOUTUBE_DAILY_QUOTA', 10000))
+    
+    # Create missing MongoDB indexes when the app starts (see app/models/indexes.py)
+    CREATE_INDEXES_ON_STARTUP = os.environ.get('CREATE_INDEXES_ON_STARTUP', 'True').lower() in ('true', '1', 't')
+    
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
     # Socket.IO settings
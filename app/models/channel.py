@@ -1,13 +1,14 @@
 # app/models/channel.py
-from datetime import datetime
+from datetime import datetime, timedelta
 from app import mongo
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Channel:
     @staticmethod
-    def create(channel_id, channel_name):
+    def create(channel_id, channel_name, uploads_playlist_id=None):
         if mongo.db is None:
             logger.error("MongoDB connection is not available")
             return None
@@ -15,6 +16,7 @@ class Channel:
         channel = {
             'channel_id': channel_id,
             'channel_name': channel_name,
+            'uploads_playlist_id': uploads_playlist_id,
             'last_checked': None,
             'active': True,
             'added_at': datetime.utcnow()
@@ -66,6 +68,203 @@ class Channel:
             logger.error(f"Error updating last checked: {str(e)}")
             return False
     
+    @staticmethod
+    def set_uploads_playlist_id(channel_id, uploads_playlist_id):
+        """Store the channel's uploads playlist ID so it doesn't have to be looked up on every check"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return False
+            
+        try:
+            result = mongo.db.channels.update_one(
+                {'channel_id': channel_id},
+                {'$set': {'uploads_playlist_id': uploads_playlist_id, 'uploads_etag': None}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating uploads playlist ID: {str(e)}")
+            return False
+    
+    @staticmethod
+    def set_uploads_playlist_ids(playlists):
+        """Store uploads playlist IDs for many channels at once ({channel_id: playlist_id})"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return 0
+        
+        if not playlists:
+            return 0
+            
+        try:
+            operations = [
+                UpdateOne({'channel_id': channel_id}, {'$set': {'uploads_playlist_id': playlist_id}})
+                for channel_id, playlist_id in playlists.items()
+            ]
+            result = mongo.db.channels.bulk_write(operations, ordered=False)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error updating uploads playlist IDs: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def set_uploads_etag(channel_id, etag):
+        """Store the ETag of the last uploads playlist response, sent back as If-None-Match on the next check"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return False
+            
+        try:
+            result = mongo.db.channels.update_one(
+                {'channel_id': channel_id},
+                {'$set': {'uploads_etag': etag}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating uploads ETag: {str(e)}")
+            return False
+    
+    @staticmethod
+    def set_feed_validators(channel_id, etag, last_modified):
+        """Store the ETag / Last-Modified of the last fully processed RSS feed response"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return False
+            
+        try:
+            result = mongo.db.channels.update_one(
+                {'channel_id': channel_id},
+                {'$set': {'feed_etag': etag, 'feed_last_modified': last_modified}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating feed validators: {str(e)}")
+            return False
+    
+    @staticmethod
+    def set_schedules(schedules):
+        """Store per-channel polling schedules ({channel_id: {'next_check_at', 'check_interval', 'upload_rate'}})"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return 0
+        
+        if not schedules:
+            return 0
+            
+        try:
+            operations = [
+                UpdateOne({'channel_id': channel_id}, {'$set': schedule})
+                for channel_id, schedule in schedules.items()
+            ]
+            result = mongo.db.channels.bulk_write(operations, ordered=False)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error updating channel schedules: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def claim_due(worker_id, limit, lease_seconds):
+        """
+        Atomically claim up to limit active channels that are due, most overdue first
+        
+        Each claim is one find_one_and_update, so concurrent workers never get the same
+        channel. Claims whose lease_until has passed (the worker died) can be claimed again.
+        
+        Returns:
+            list: the claimed channel documents
+        """
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return []
+        
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=lease_seconds)
+        claimed = []
+        
+        try:
+            for _ in range(limit):
+                channel = mongo.db.channels.find_one_and_update(
+                    {
+                        'active': True,
+                        '$and': [
+                            {'$or': [{'next_check_at': None}, {'next_check_at': {'$lte': now}}]},
+                            {'$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]}
+                        ]
+                    },
+                    {'$set': {'claimed_by': worker_id, 'lease_until': lease_until}},
+                    sort=[('next_check_at', ASCENDING)],
+                    return_document=ReturnDocument.AFTER
+                )
+                if channel is None:
+                    break
+                claimed.append(channel)
+        except Exception as e:
+            logger.error(f"Error claiming channels: {str(e)}")
+        return claimed
+    
+    @staticmethod
+    def release_claims(channel_ids, worker_id):
+        """Release this worker's claims on channels so they can be claimed again once due"""
+        if mongo.db is None or not channel_ids:
+            return 0
+        
+        try:
+            result = mongo.db.channels.update_many(
+                {'channel_id': {'$in': list(channel_ids)}, 'claimed_by': worker_id},
+                {'$set': {'claimed_by': None, 'lease_until': None}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error releasing channel claims: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def mark_all_due():
+        """Make every active channel due now (a manual check with sharded workers)"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return 0
+        
+        try:
+            result = mongo.db.channels.update_many({'active': True}, {'$set': {'next_check_at': datetime.utcnow()}})
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error marking channels due: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def next_due_at():
+        """The earliest next_check_at of the active channels, or None if none is scheduled"""
+        if mongo.db is None:
+            return None
+        
+        try:
+            channel = mongo.db.channels.find_one(
+                {'active': True, 'next_check_at': {'$ne': None}},
+                {'next_check_at': 1},
+                sort=[('next_check_at', ASCENDING)]
+            )
+            return channel['next_check_at'] if channel else None
+        except Exception as e:
+            logger.error(f"Error reading the next scheduled check: {str(e)}")
+            return None
+    
+    @staticmethod
+    def update_websub(channel_id, fields):
+        """Update fields of the channel's WebSub subscription state (stored under 'websub')"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return False
+        
+        try:
+            result = mongo.db.channels.update_one(
+                {'channel_id': channel_id},
+                {'$set': {f"websub.{name}": value for name, value in fields.items()}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating WebSub state: {str(e)}")
+            return False
+    
     @staticmethod
     def toggle_active(channel_id, active_status):
         if mongo.db is None:
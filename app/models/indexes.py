@@ -0,0 +1,156 @@
+# app/models/indexes.py
+from app import mongo
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from bson.objectid import ObjectId
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Every index the app relies on, per collection. Names are fixed so re-applying is a no-op.
+INDEXES = {
+    'videos': [
+        {'keys': [('video_id', ASCENDING)], 'name': 'video_id_unique', 'unique': True},
+        {'keys': [('channel_id', ASCENDING), ('published_at', DESCENDING)], 'name': 'channel_published'},
+        {'keys': [('published_at', DESCENDING)], 'name': 'published_at'},
+        {'keys': [('detected_at', DESCENDING)], 'name': 'detected_at'},
+        {'keys': [('notification_queued', ASCENDING), ('detected_at', ASCENDING)], 'name': 'notification_queued_detected'}
+    ],
+    'channels': [
+        {'keys': [('channel_id', ASCENDING)], 'name': 'channel_id_unique', 'unique': True},
+        {'keys': [('active', ASCENDING), ('last_checked', ASCENDING)], 'name': 'active_last_checked'},
+        {'keys': [('active', ASCENDING), ('next_check_at', ASCENDING)], 'name': 'active_next_check'}
+    ],
+    'webhook_deliveries': [
+        {'keys': [('webhook_id', ASCENDING), ('timestamp', DESCENDING)], 'name': 'webhook_timestamp'}
+    ],
+    'webhook_outbox': [
+        # One job per (video, webhook), so queueing the same video twice is a no-op
+        {'keys': [('video_id', ASCENDING), ('webhook_id', ASCENDING)], 'name': 'video_webhook_unique', 'unique': True},
+        {'keys': [('status', ASCENDING), ('next_attempt_at', ASCENDING)], 'name': 'status_next_attempt'},
+        # Digest batches: a webhook's unsent jobs, and the members of a batch
+        {'keys': [('webhook_id', ASCENDING), ('status', ASCENDING), ('created_at', ASCENDING)], 'name': 'webhook_status_created'},
+        {'keys': [('batch_id', ASCENDING), ('status', ASCENDING)], 'name': 'batch_status'},
+        # Releasing the jobs held for a closed check cycle
+        {'keys': [('cycle_id', ASCENDING), ('status', ASCENDING)], 'name': 'cycle_status'},
+        # Removes finished jobs once their retention has passed
+        {'keys': [('expires_at', ASCENDING)], 'name': 'expires_at_ttl', 'expire_after_seconds': 0}
+    ],
+    'webhook_payloads': [
+        # Looked up by payload_id, which is the _id (indexed by MongoDB itself)
+        # Removes bodies PAYLOAD_RETENTION after their last use
+        {'keys': [('expires_at', ASCENDING)], 'name': 'expires_at_ttl', 'expire_after_seconds': 0}
+    ],
+    'system_events': [
+        {'keys': [('type', ASCENDING), ('timestamp', DESCENDING)], 'name': 'type_timestamp'},
+        {'keys': [('timestamp', DESCENDING)], 'name': 'timestamp'}
+    ],
+    'leases': [
+        # Removes leases nobody renews any more
+        {'keys': [('expires_at', ASCENDING)], 'name': 'expires_at_ttl', 'expire_after_seconds': 0}
+    ],
+    'check_workers': [
+        {'keys': [('expires_at', ASCENDING)], 'name': 'expires_at_ttl', 'expire_after_seconds': 0}
+    ]
+}
+
+def _hot_queries():
+    """The queries the dashboard and the checker run most often, as (name, collection, filter, sort, limit)"""
+    return [
+        ('video by id', 'videos', {'video_id': 'dQw4w9WgXcQ'}, None, 1),
+        ('known videos ($in)', 'videos', {'video_id': {'$in': ['dQw4w9WgXcQ', 'jNQXAC9IVRw']}}, None, 0),
+        ('videos by channel', 'videos', {'channel_id': 'UC_x5XG1OV2P6uZZ5FSM9Ttw'}, [('published_at', DESCENDING)], 100),
+        ('latest videos', 'videos', {}, [('published_at', DESCENDING)], 50),
+        ('recently detected videos', 'videos', {}, [('detected_at', DESCENDING)], 5),
+        ('videos in the last 24h', 'videos', {'detected_at': {'$gte': datetime.utcnow() - timedelta(days=1)}}, None, 0),
+        ('channel by id', 'channels', {'channel_id': 'UC_x5XG1OV2P6uZZ5FSM9Ttw'}, None, 1),
+        ('channels due for a check', 'channels', {'active': True}, [('last_checked', ASCENDING)], 0),
+        ('next channel to claim', 'channels', {'active': True, 'next_check_at': {'$lte': datetime.utcnow()}}, [('next_check_at', ASCENDING)], 1),
+        ('videos never queued for delivery', 'videos', {'notification_queued': False, 'detected_at': {'$lte': datetime.utcnow()}}, None, 100),
+        ('next delivery job', 'webhook_outbox', {'status': 'pending', 'next_attempt_at': {'$lte': datetime.utcnow()}}, [('next_attempt_at', ASCENDING)], 1),
+        ('webhook delivery history', 'webhook_deliveries', {'webhook_id': ObjectId()}, [('timestamp', DESCENDING)], 50),
+        ('last channel check event', 'system_events', {'type': 'CHANNEL_CHECK'}, [('timestamp', DESCENDING)], 1),
+        ('recent system events', 'system_events', {}, [('timestamp', DESCENDING)], 5),
+        ('expired system events', 'system_events', {'timestamp': {'$lt': datetime.utcnow() - timedelta(days=7)}}, None, 0)
+    ]
+
+def ensure_indexes():
+    """
+    Create every index in INDEXES that doesn't exist yet
+
+    Safe to run repeatedly. A failure on one index (e.g. duplicate values blocking a
+    unique index) is logged and the remaining indexes are still created.
+
+    Returns:
+        dict: {'created': [...], 'failed': [...]} with 'collection.index_name' entries
+    """
+    results = {'created': [], 'failed': []}
+
+    if mongo.db is None:
+        logger.error("MongoDB connection is not available, cannot create indexes")
+        return results
+
+    for collection_name, specs in INDEXES.items():
+        collection = mongo.db[collection_name]
+        for spec in specs:
+            index_name = f"{collection_name}.{spec['name']}"
+            try:
+                options = {'name': spec['name'], 'unique': spec.get('unique', False)}
+                if 'expire_after_seconds' in spec:
+                    options['expireAfterSeconds'] = spec['expire_after_seconds']
+                model = IndexModel(spec['keys'], **options)
+                collection.create_indexes([model])
+                results['created'].append(index_name)
+            except Exception as e:
+                logger.error(f"Error creating index {index_name}: {str(e)}")
+                results['failed'].append(index_name)
+
+    logger.info(f"Ensured {len(results['created'])} indexes ({len(results['failed'])} failed)")
+    return results
+
+def _plan_stages(plan):
+    """Flatten the stage names of a query plan tree"""
+    stages = []
+    if not isinstance(plan, dict):
+        return stages
+    if 'stage' in plan:
+        stages.append(plan['stage'])
+    for key in ('inputStage', 'queryPlan'):
+        stages.extend(_plan_stages(plan.get(key)))
+    for child in plan.get('inputStages', []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+def index_report():
+    """
+    Run explain() on each hot query and report its winning plan
+
+    Returns:
+        list: one dict per query with the plan stages and 'collscan' / 'in_memory_sort' flags
+    """
+    report = []
+
+    if mongo.db is None:
+        logger.error("MongoDB connection is not available, cannot explain queries")
+        return report
+
+    for name, collection_name, query, sort, limit in _hot_queries():
+        entry = {'query': name, 'collection': collection_name, 'stages': [], 'collscan': False, 'in_memory_sort': False, 'error': None}
+        try:
+            cursor = mongo.db[collection_name].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+
+            winning_plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+            stages = _plan_stages(winning_plan)
+            entry['stages'] = stages
+            entry['collscan'] = 'COLLSCAN' in stages
+            entry['in_memory_sort'] = 'SORT' in stages
+        except Exception as e:
+            logger.error(f"Error explaining query '{name}': {str(e)}")
+            entry['error'] = str(e)
+        report.append(entry)
+
+    return report
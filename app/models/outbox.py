@@ -0,0 +1,255 @@
+# app/models/outbox.py
+from datetime import datetime, timedelta
+from app import mongo
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+import logging
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Finished jobs are kept this long (removed by the expires_at TTL index)
+FINISHED_RETENTION = timedelta(days=7)
+
+class OutboxJob:
+    """
+    Webhook delivery jobs, one per (video, webhook), in the webhook_outbox collection
+
+    status is 'pending' (waiting for next_attempt_at), 'delivering' (claimed by a
+    delivery worker until lease_until), or one of the final states 'delivered',
+    'failed' (retries exhausted) and 'cancelled' (webhook or video gone).
+
+    Digest webhooks add two states: 'held' (waiting for the end of the check cycle
+    cycle_id, at the latest until next_attempt_at) and 'batched' (part of the batch
+    whose head job has _id batch_id). Only the head is claimed and retried; its
+    members follow it to its final status.
+    """
+
+    @staticmethod
+    def enqueue(videos, webhooks, is_manual=False, plans=None):
+        """
+        Write one job per (video, webhook) with a single unordered insert_many
+
+        Jobs are pending and due now unless plans ({webhook_id: (status, next_attempt_at, cycle_id)})
+        says otherwise for their webhook. The unique (video_id, webhook_id) index makes
+        this idempotent: jobs that already exist are skipped.
+
+        Returns:
+            int: the number of jobs written, or None if the write failed
+        """
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return None
+
+        now = datetime.utcnow()
+        plans = plans or {}
+        default_plan = ('pending', now, None)
+        jobs = [
+            {
+                'video_id': video['video_id'],
+                'webhook_id': webhook['_id'],
+                'is_manual': is_manual,
+                'status': plans.get(webhook['_id'], default_plan)[0],
+                'attempts': 0,
+                'next_attempt_at': plans.get(webhook['_id'], default_plan)[1],
+                'cycle_id': plans.get(webhook['_id'], default_plan)[2],
+                'claimed_by': None,
+                'lease_until': None,
+                'last_error': None,
+                'created_at': now
+            }
+            for video in videos
+            for webhook in webhooks
+        ]
+        if not jobs:
+            return 0
+
+        try:
+            result = mongo.db.webhook_outbox.insert_many(jobs, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            other_errors = [error for error in errors if error.get('code') != DUPLICATE_KEY_ERROR]
+            for error in other_errors:
+                logger.error(f"Error queueing webhook delivery: {error.get('errmsg')}")
+            return None if other_errors else len(jobs) - len(errors)
+        except Exception as e:
+            logger.error(f"Error queueing webhook deliveries: {str(e)}")
+            return None
+
+    @staticmethod
+    def claim(worker_id, lease_seconds):
+        """
+        Atomically claim the job that has been due longest
+
+        Jobs left 'delivering' by a worker that died become claimable once their
+        lease_until passes, and held jobs once their cycle's deadline passes (the
+        cycle was never closed). Every claim counts as an attempt.
+
+        Returns:
+            dict: the claimed job, or None if no job is due
+        """
+        if mongo.db is None:
+            return None
+
+        now = datetime.utcnow()
+        try:
+            return mongo.db.webhook_outbox.find_one_and_update(
+                {'$or': [
+                    {'status': {'$in': ['pending', 'held']}, 'next_attempt_at': {'$lte': now}},
+                    {'status': 'delivering', 'lease_until': {'$lt': now}}
+                ]},
+                {
+                    '$set': {
+                        'status': 'delivering',
+                        'claimed_by': worker_id,
+                        'lease_until': now + timedelta(seconds=lease_seconds)
+                    },
+                    '$inc': {'attempts': 1}
+                },
+                sort=[('next_attempt_at', ASCENDING)],
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            logger.error(f"Error claiming webhook delivery: {str(e)}")
+            return None
+
+    @staticmethod
+    def window_due(webhook_id):
+        """When the open digest window of a webhook closes (its first unsent job's due time), or None"""
+        if mongo.db is None:
+            return None
+
+        try:
+            job = mongo.db.webhook_outbox.find_one(
+                {'webhook_id': webhook_id, 'status': 'pending', 'attempts': 0,
+                 'next_attempt_at': {'$gt': datetime.utcnow()}},
+                {'next_attempt_at': 1},
+                sort=[('next_attempt_at', ASCENDING)]
+            )
+            return job['next_attempt_at'] if job else None
+        except Exception as e:
+            logger.error(f"Error reading the digest window: {str(e)}")
+            return None
+
+    @staticmethod
+    def release_cycle(cycle_id):
+        """Make the jobs held for a closed check cycle due now; returns how many were released"""
+        if mongo.db is None or cycle_id is None:
+            return 0
+
+        try:
+            result = mongo.db.webhook_outbox.update_many(
+                {'status': 'held', 'cycle_id': cycle_id},
+                {'$set': {'status': 'pending', 'next_attempt_at': datetime.utcnow()}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error releasing held webhook deliveries: {str(e)}")
+            return 0
+
+    @staticmethod
+    def gather_batch(head, max_size):
+        """
+        Attach the webhook's other unsent pending jobs to a claimed head job, oldest first
+
+        Jobs still held for the head's own cycle join too (its deadline passed or it
+        was just released); jobs held for any other cycle wait for theirs.
+
+        Returns:
+            list: the member jobs of the batch (without the head)
+        """
+        if mongo.db is None:
+            return []
+
+        try:
+            if head.get('batch_id') is None:
+                unsent = [{'status': 'pending'}]
+                if head.get('cycle_id') is not None:
+                    unsent.append({'status': 'held', 'cycle_id': head['cycle_id']})
+                unsent_query = {'webhook_id': head['webhook_id'], 'attempts': 0, 'batch_id': None, '$or': unsent}
+
+                candidates = mongo.db.webhook_outbox.find(
+                    dict(unsent_query, _id={'$ne': head['_id']}),
+                    {'_id': 1}
+                ).sort('created_at', ASCENDING).limit(max(max_size - 1, 0))
+                candidate_ids = [job['_id'] for job in candidates]
+
+                mongo.db.webhook_outbox.update_one({'_id': head['_id']}, {'$set': {'batch_id': head['_id']}})
+                if candidate_ids:
+                    # Jobs claimed by another worker in the meantime no longer match and stay out
+                    mongo.db.webhook_outbox.update_many(
+                        dict(unsent_query, _id={'$in': candidate_ids}),
+                        {'$set': {'status': 'batched', 'batch_id': head['_id']}}
+                    )
+
+            return list(mongo.db.webhook_outbox.find({'batch_id': head['_id'], 'status': 'batched'}))
+        except Exception as e:
+            logger.error(f"Error gathering webhook digest: {str(e)}")
+            return []
+
+    @staticmethod
+    def finish(job, worker_id, status, error=None):
+        """Move a claimed job (and the members of its batch) to a final status ('delivered', 'failed' or 'cancelled')"""
+        if mongo.db is None:
+            return False
+
+        now = datetime.utcnow()
+        final = {
+            'status': status,
+            'last_error': error,
+            'finished_at': now,
+            'expires_at': now + FINISHED_RETENTION
+        }
+        try:
+            result = mongo.db.webhook_outbox.update_one(
+                {'_id': job['_id'], 'claimed_by': worker_id},
+                {'$set': dict(final, claimed_by=None, lease_until=None)}
+            )
+            if result.modified_count and job.get('batch_id') == job['_id']:
+                mongo.db.webhook_outbox.update_many(
+                    {'batch_id': job['_id'], 'status': 'batched'},
+                    {'$set': final}
+                )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error finishing webhook delivery: {str(e)}")
+            return False
+
+    @staticmethod
+    def retry_at(job, worker_id, next_attempt_at, error):
+        """Put a claimed job back to pending until next_attempt_at"""
+        if mongo.db is None:
+            return False
+
+        try:
+            result = mongo.db.webhook_outbox.update_one(
+                {'_id': job['_id'], 'claimed_by': worker_id},
+                {'$set': {
+                    'status': 'pending',
+                    'next_attempt_at': next_attempt_at,
+                    'last_error': error,
+                    'claimed_by': None,
+                    'lease_until': None
+                }}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error rescheduling webhook delivery: {str(e)}")
+            return False
+
+    @staticmethod
+    def get_counts():
+        """Number of jobs per status"""
+        if mongo.db is None:
+            return {}
+
+        try:
+            return {
+                doc['_id']: doc['count']
+                for doc in mongo.db.webhook_outbox.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+            }
+        except Exception as e:
+            logger.error(f"Error counting webhook deliveries: {str(e)}")
+            return {}
@@ -1,10 +1,14 @@
 # app/models/video.py
 from datetime import datetime
 from app import mongo
+from app.services.video_index import known_videos
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import logging
 
 logger = logging.getLogger(__name__)
 
+DUPLICATE_KEY_ERROR = 11000
+
 class Video:
     @staticmethod
     def create(video_id, channel_id, title, description, published_at, thumbnail_url):
@@ -12,6 +16,7 @@ class Video:
             logger.error("MongoDB connection is not available")
             return None
             
+        now = datetime.utcnow()
         video = {
             'video_id': video_id,
             'channel_id': channel_id,
@@ -20,17 +25,99 @@ class Video:
             'published_at': published_at,
             'thumbnail_url': thumbnail_url,
             'notification_sent': False,
+            'notification_queued': False,
             'notification_count': 0,
             'last_notification_time': None,
-            'created_at': datetime.utcnow()
+            # detected_at lets the recovery sweep find it if its notifications are never queued
+            'detected_at': now,
+            'created_at': now
         }
         try:
             mongo.db.videos.insert_one(video)
+            known_videos.add(video_id)
             return video
+        except DuplicateKeyError:
+            logger.debug(f"Video {video_id} already exists in database")
+            known_videos.add(video_id)
+            return None
         except Exception as e:
             logger.error(f"Error creating video: {str(e)}")
             return None
     
+    @staticmethod
+    def unknown_ids(video_ids):
+        """
+        Return the video IDs that aren't stored yet, in their original order
+        
+        IDs the in-memory index knows are answered without a query; the rest are
+        looked up with a single $in query. Raises on database errors.
+        """
+        candidates = [video_id for video_id in video_ids if not known_videos.contains(video_id)]
+        if not candidates:
+            return []
+        
+        existing = mongo.db.videos.find({'video_id': {'$in': candidates}}, {'video_id': 1, '_id': 0})
+        existing_ids = {doc['video_id'] for doc in existing}
+        known_videos.add_many(existing_ids)
+        return [video_id for video_id in candidates if video_id not in existing_ids]
+    
+    @staticmethod
+    def insert_new(videos):
+        """
+        Store the videos that aren't in the database yet
+        
+        Uses one $in query to drop known videos and one unordered insert_many for the
+        rest. The unique video_id index has the final say: a duplicate-key error means
+        another checker stored the video first, so it counts as already known.
+        
+        Returns:
+            tuple: (list of newly stored videos, True if any insert failed for another reason)
+        """
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return [], True
+            
+        # Drop videos without an ID and duplicates within the list itself
+        candidates = {}
+        for video in videos:
+            video_id = video.get('video_id')
+            if not video_id:
+                logger.warning(f"Video missing video_id, skipping: {video}")
+                continue
+            candidates.setdefault(video_id, video)
+        
+        try:
+            unknown_ids = Video.unknown_ids(list(candidates))
+        except Exception as e:
+            logger.error(f"Error looking up existing videos: {str(e)}")
+            return [], True
+        
+        to_insert = [candidates[video_id] for video_id in unknown_ids]
+        if not to_insert:
+            return [], False
+        
+        failed_positions = set()
+        store_failed = False
+        try:
+            mongo.db.videos.insert_many(to_insert, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                failed_positions.add(error['index'])
+                video_id = to_insert[error['index']]['video_id']
+                if error.get('code') == DUPLICATE_KEY_ERROR:
+                    logger.debug(f"Video {video_id} was stored by another checker, skipping")
+                    known_videos.add(video_id)
+                else:
+                    logger.error(f"Error inserting video {video_id}: {error.get('errmsg')}")
+                    store_failed = True
+        except Exception as e:
+            logger.error(f"Error inserting videos: {str(e)}")
+            return [], True
+        
+        new_videos = [video for position, video in enumerate(to_insert) if position not in failed_positions]
+        known_videos.add_many(video['video_id'] for video in new_videos)
+        return new_videos, store_failed
+    
     @staticmethod
     def get_all(limit=50):
         if mongo.db is None:
@@ -55,6 +142,18 @@ class Video:
             logger.error(f"Error getting video by ID: {str(e)}")
             return None
     
+    @staticmethod
+    def get_by_ids(video_ids):
+        """Videos by video_id, as a dict keyed by video_id (missing ones are left out)"""
+        if mongo.db is None or not video_ids:
+            return {}
+            
+        try:
+            return {video['video_id']: video for video in mongo.db.videos.find({'video_id': {'$in': list(video_ids)}})}
+        except Exception as e:
+            logger.error(f"Error getting videos by ID: {str(e)}")
+            return {}
+    
     @staticmethod
     def get_by_channel(channel_id, limit=100):
         if mongo.db is None:
@@ -74,7 +173,7 @@ class Video:
             return False
             
         try:
-            return mongo.db.videos.count_documents({'video_id': video_id}) > 0
+            return known_videos.is_known(video_id)
         except Exception as e:
             logger.error(f"Error checking if video exists: {str(e)}")
             return False
@@ -102,6 +201,41 @@ class Video:
             logger.error(f"Error marking notification sent: {str(e)}")
             return False
             
+    @staticmethod
+    def mark_queued(video_ids):
+        """Record that webhook delivery jobs were written for these videos (see OutboxJob)"""
+        if mongo.db is None or not video_ids:
+            return 0
+        
+        try:
+            result = mongo.db.videos.update_many(
+                {'video_id': {'$in': list(video_ids)}},
+                {'$set': {'notification_queued': True}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error marking videos queued: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def get_unqueued(detected_before, limit=100):
+        """
+        Videos stored as new before detected_before whose delivery jobs were never written
+        
+        Only videos stored with notification_queued=False match, so videos from before
+        the outbox existed are never picked up.
+        """
+        if mongo.db is None:
+            return []
+        
+        try:
+            return list(mongo.db.videos.find(
+                {'notification_queued': False, 'detected_at': {'$lte': detected_before}}
+            ).limit(limit))
+        except Exception as e:
+            logger.error(f"Error getting unqueued videos: {str(e)}")
+            return []
+    
     @staticmethod
     def get_notification_count(video_id):
         """Get the number of times notifications were sent for a video"""
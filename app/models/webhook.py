@@ -6,9 +6,19 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Digest modes: 'off' (one request per video), 'window' (videos queued within window_seconds
+# of the first one go out together) or 'cycle' (the videos of one check cycle go out together)
+DIGEST_MODES = ('off', 'window', 'cycle')
+DEFAULT_DIGEST = {'mode': 'off', 'window_seconds': 300, 'max_batch': 25}
+
 class Webhook:
     @staticmethod
-    def create(url, description="", headers=None, active=True):
+    def digest_settings(webhook):
+        """The webhook's digest settings, with defaults for webhooks created before digest mode"""
+        return dict(DEFAULT_DIGEST, **(webhook.get('digest') or {}))
+    
+    @staticmethod
+    def create(url, description="", headers=None, active=True, digest=None):
         if mongo.db is None:
             logger.error("MongoDB connection is not available")
             return None
@@ -18,6 +28,7 @@ class Webhook:
             'description': description,
             'headers': headers or {},
             'active': active,
+            'digest': digest or dict(DEFAULT_DIGEST),
             'created_at': datetime.utcnow()
         }
         try:
@@ -67,7 +78,7 @@ class Webhook:
             return []
     
     @staticmethod
-    def update(webhook_id, url=None, description=None, headers=None, active=None):
+    def update(webhook_id, url=None, description=None, headers=None, active=None, digest=None):
         if mongo.db is None:
             logger.error("MongoDB connection is not available")
             return False
@@ -85,6 +96,8 @@ class Webhook:
                 update_data['headers'] = headers
             if active is not None:
                 update_data['active'] = active
+            if digest is not None:
+                update_data['digest'] = digest
             
             if update_data:
                 result = mongo.db.webhooks.update_one(
@@ -1,8 +1,12 @@
 # app/routes/channels.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from app import mongo
 from app.models.channel import Channel
 from app.models.video import Video
 from app.services.youtube_service import YouTubeService
+from app.services.websub_service import WebSubService
+from app.tasks.monitor_task import monitor, notify_new_videos
+from app.tasks.delivery_task import delivery_workers
 import logging
 import traceback
 from datetime import datetime, timedelta
@@ -57,10 +61,18 @@ def add():
             return redirect(url_for('channels.add'))
         
         # Create channel
-        result = Channel.create(channel_info['channel_id'], channel_info['channel_name'])
+        result = Channel.create(
+            channel_info['channel_id'],
+            channel_info['channel_name'],
+            uploads_playlist_id=channel_info.get('uploads_playlist_id')
+        )
         if result:
             flash(f'Channel "{channel_info["channel_name"]}" added successfully', 'success')
             logger.info(f"Successfully added channel: {channel_info['channel_name']} ({channel_info['channel_id']})")
+            if WebSubService.enabled():
+                WebSubService.subscribe(channel_info['channel_id'])
+            # Schedule the new channel's first check now
+            monitor.wake(reload=True)
         else:
             flash('Error adding channel to database', 'error')
             
@@ -86,6 +98,8 @@ def view(channel_id):
         if new_videos:
             flash(f'Found {len(new_videos)} new videos!', 'success')
             logger.info(f"Fetched {len(new_videos)} new videos for channel {channel_id}")
+            # This check owns the new videos (the monitor skips shared results), so announce them here
+            notify_new_videos([(channel, video) for video in new_videos], enrich=False)
             # Refresh videos after fetching to include the new ones
             videos = Video.get_by_channel(channel_id)
         
@@ -104,7 +118,8 @@ def view(channel_id):
     
     # Create settings object similar to what dashboard uses
     settings = {
-        'polling_interval': active_config.POLLING_INTERVAL
+        'polling_interval': active_config.POLLING_INTERVAL,
+        'adaptive_polling': current_app.config.get('ADAPTIVE_POLLING', False)
     }
     
     return render_template('channels_view.html', 
@@ -133,6 +148,15 @@ def toggle(channel_id):
         # Update in database
         success = Channel.toggle_active(channel_id, new_status)
         
+        # Start or stop push notifications along with polling
+        if success and WebSubService.enabled():
+            if new_status:
+                WebSubService.subscribe(channel_id)
+            else:
+                WebSubService.unsubscribe(channel_id)
+        if success:
+            monitor.wake(reload=True)
+        
         # Log the action
         logger.info(f"Toggled channel {channel_id} from {'active' if current_status else 'inactive'} to {'active' if new_status else 'inactive'}")
         
@@ -176,6 +200,9 @@ def delete(channel_id):
         return redirect(url_for('channels.index'))
     
     Channel.delete(channel_id)
+    if WebSubService.enabled():
+        WebSubService.unsubscribe(channel_id)
+    monitor.wake(reload=True)
     flash('Channel deleted successfully', 'success')
     return redirect(url_for('channels.index'))
 
@@ -207,11 +234,17 @@ def batch_import():
             # Get channel info
             channel_info = YouTubeService.get_channel_info(channel_id)
             if channel_info:
-                Channel.create(channel_id, channel_info['title'])
+                Channel.create(
+                    channel_id,
+                    channel_info['channel_name'],
+                    uploads_playlist_id=channel_info.get('uploads_playlist_id')
+                )
                 added += 1
             else:
                 skipped += 1
         
+        if added:
+            monitor.wake(reload=True)
         flash(f'Imported {added} channels, skipped {skipped}', 'success')
     except Exception as e:
         flash(f'Error importing channels: {str(e)}', 'error')
@@ -229,6 +262,8 @@ def import_channels():
         
         # Process the channel IDs
         results = YouTubeService.batch_import_channels(channel_ids)
+        if results['success']:
+            monitor.wake(reload=True)
         
         if results['success'] > 0:
             flash(f"Successfully imported {results['success']} channels", 'success')
@@ -262,48 +297,41 @@ def fetch_videos(channel_id):
             latest_videos = YouTubeService._get_videos_from_uploads_playlist(channel_id, max_results=50)
         
         if latest_videos:
-            # Process new videos
-            new_count = 0
+            # Add notification tracking fields to the videos
             for video in latest_videos:
-                video_id = video.get('video_id')
-                # Check if video already exists in database
-                if not Video.exists(video_id):
-                    # Add notification tracking fields to the video
-                    video['notification_sent'] = False
-                    video['notification_count'] = 0
-                    video['last_notification_time'] = None
-                    video['detected_at'] = datetime.utcnow()
-                    
-                    # Insert the video
-                    try:
-                        mongo.db.videos.insert_one(video)
-                        new_count += 1
-                        logger.info(f"✓ Successfully added video {video_id} to database: {video['title']}")
-                        
-                        # Also notify webhooks about this new video
-                        try:
-                            from app.services.webhook_service import WebhookService
-                            logger.info(f"→ Sending webhook notifications for video: {video['title']}")
-                            notification_result = WebhookService.notify_all_webhooks(video, is_manual=True)
-                            
-                            if notification_result['success_count'] > 0:
-                                logger.info(f"Sent {notification_result['success_count']} webhook notifications for video: {video['title']}")
-                                
-                                if notification_result.get('errors'):
-                                    logger.warning(f"Some webhook notifications failed: {', '.join(notification_result['errors'][:3])}")
-                            else:
-                                logger.warning(f"Failed to send webhook notifications for video: {video['title']}")
-                                if notification_result.get('errors'):
-                                    logger.error(f"Webhook errors: {', '.join(notification_result['errors'][:3])}")
-                        except Exception as e:
-                            logger.error(f"Error sending webhook notifications: {str(e)}")
-                            logger.error(traceback.format_exc())
-                            
-                    except Exception as e:
-                        logger.error(f"Error inserting video {video_id}: {str(e)}")
-                        
+                video['notification_sent'] = False
+                video['notification_queued'] = False
+                video['notification_count'] = 0
+                video['last_notification_time'] = None
+                video['detected_at'] = datetime.utcnow()
+            
+            # Store only the videos that aren't in the database yet
+            new_videos, store_failed = Video.insert_new(latest_videos)
+            for video in new_videos:
+                logger.info(f"✓ Successfully added video {video['video_id']} to database: {video['title']}")
+            if store_failed:
+                logger.error(f"Some videos for channel {channel_id} could not be stored")
+            
+            # Fetch duration/statistics for all new videos in batched videos.list calls
+            if new_videos:
+                try:
+                    YouTubeService.enrich_videos(new_videos)
+                except Exception as e:
+                    logger.error(f"Error enriching new videos: {str(e)}")
+            
+            # Queue webhook notifications for the new videos
+            if new_videos:
+                try:
+                    logger.info(f"→ Queueing webhook notifications for {len(new_videos)} videos")
+                    if delivery_workers.enqueue(new_videos, is_manual=True) is None:
+                        logger.error("Could not queue webhook notifications, the recovery sweep will retry")
+                except Exception as e:
+                    logger.error(f"Error queueing webhook notifications: {str(e)}")
+                    logger.error(traceback.format_exc())
+            
+            new_count = len(new_videos)
             if new_count:
-                flash(f'Successfully fetched {new_count} new videos! Webhook notifications have been sent.', 'success')
+                flash(f'Successfully fetched {new_count} new videos! Webhook notifications have been queued.', 'success')
                 logger.info(f"Manually fetched {new_count} videos for channel {channel_id}")
             else:
                 flash('No new videos found', 'info')
@@ -361,9 +389,7 @@ def send_manual_notification(channel_id, video_id):
         return redirect(url_for('channels.view', channel_id=channel_id))
     
     try:
-        from app import mongo
         from app.services.webhook_service import WebhookService
-        import traceback
         
         # Get current notification count before sending
         notification_count = Video.get_notification_count(video_id)
@@ -376,41 +402,20 @@ def send_manual_notification(channel_id, video_id):
         # Log message about attempting to send notification
         logger.info(f"Sending manual notification for video: {video['title']} ({video_id})")
         
-        # Get all active webhooks (similar to test notification logic)
-        active_webhooks = list(mongo.db.webhooks.find({'active': True}))
-        webhook_count = len(active_webhooks)
+        # Notify all active webhooks in parallel
+        notification_result = WebhookService.notify_all_webhooks(video_with_count, is_manual=True)
+        webhook_count = notification_result['webhook_count']
+        success_count = notification_result['success_count']
+        errors = notification_result.get('errors', [])
         
         if webhook_count == 0:
-            logger.warning("No active webhooks found when attempting to send manual notification")
-            flash('No active webhooks configured. Please add and activate webhooks first.', 'warning')
+            if errors:
+                flash(f'Error sending notification: {errors[0]}', 'error')
+            else:
+                logger.warning("No active webhooks found when attempting to send manual notification")
+                flash('No active webhooks configured. Please add and activate webhooks first.', 'warning')
             return redirect(url_for('channels.view', channel_id=channel_id))
         
-        logger.info(f"Found {webhook_count} active webhooks to notify")
-        success_count = 0
-        errors = []
-        
-        # Process each webhook directly (no threading) for better error reporting
-        for webhook in active_webhooks:
-            try:
-                logger.info(f"Sending notification to webhook: {webhook.get('url')}")
-                
-                # Send notification directly (not in thread)
-                result = WebhookService.send_notification(webhook, video_with_count, is_test=False)
-                
-                if result['success']:
-                    logger.info(f"Successfully sent notification to {webhook.get('url')}")
-                    success_count += 1
-                else:
-                    error_msg = f"Failed to send notification to {webhook.get('url')}: {result.get('message')}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
-                    
-            except Exception as webhook_error:
-                error_msg = f"Error sending to webhook {webhook.get('url')}: {str(webhook_error)}"
-                logger.error(error_msg)
-                logger.error(traceback.format_exc())
-                errors.append(error_msg)
-        
         # Mark the notification as sent and increment count regardless of partial failures
         Video.mark_notification_sent(video_id)
         
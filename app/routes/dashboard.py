@@ -1,9 +1,18 @@
 # app/routes/dashboard.py (updated)
 
-from flask import Blueprint, render_template, current_app, redirect, url_for, flash
+from flask import Blueprint, render_template, current_app, redirect, url_for, flash, jsonify
 from app import mongo
 from app.models.system_event import SystemEvent
 from app.tasks.monitor_task import monitor
+from app.services.http_client import youtube_http, webhook_http
+from app.services.video_index import known_videos
+from app.services.quota_service import quota_ledger, quota_breaker
+from app.services.api_key_pool import youtube_keys
+from app.services.youtube_service import YouTubeService
+from app.services.websub_service import WebSubService
+from app.services.leader_lease import monitor_lease
+from app.services.single_flight import channel_checks
+from app.tasks.delivery_task import delivery_workers
 from datetime import datetime, timedelta
 import requests
 import os
@@ -97,8 +106,13 @@ def index():
     else:
         current_app.logger.error("MongoDB connection is not available")
 
-    # Check monitor status
-    monitor_active = monitor.running
+    # Check monitor status: with leader election the monitor may run in another worker process
+    if monitor_lease.enabled:
+        monitor_holder = monitor_lease.get_holder()
+        monitor_active = monitor_holder is not None
+    else:
+        monitor_holder = {'holder': monitor_lease.holder_id} if monitor.running else None
+        monitor_active = monitor.running
     
     # Check API key validity
     api_key_valid = False
@@ -106,31 +120,24 @@ def index():
     api_key_details = "No YouTube API key configured"
     
     try:
-        # First try to get API key from app config
-        api_key = current_app.config.get('YOUTUBE_API_KEY')
-        
-        # If not found in app config, try getting it directly from environment
-        if not api_key:
-            # Load environment variables from .env file
+        # Keys come from the key pool (YOUTUBE_API_KEYS / YOUTUBE_API_KEY)
+        if not youtube_keys.has_keys():
+            # Pick up a key added to the .env file since startup
             load_dotenv()
-            
-            # Check if environment has the key now
-            api_key = os.environ.get('YOUTUBE_API_KEY')
-            current_app.logger.info(f"API key from environment: {'Found' if api_key else 'Not found'}")
-            
-            # Update the app config if we found a key in the environment
-            if api_key:
-                current_app.config['YOUTUBE_API_KEY'] = api_key
-                current_app.logger.info("Updated app config with API key from environment")
+            current_app.config['YOUTUBE_API_KEYS'] = os.environ.get('YOUTUBE_API_KEYS', '')
+            current_app.config['YOUTUBE_API_KEY'] = os.environ.get('YOUTUBE_API_KEY', '')
+            youtube_keys.init_app(current_app)
         
-        if not api_key:
+        if not youtube_keys.has_keys():
             api_key_status = "Missing"
             api_key_details = "No YouTube API key configured in environment variables"
+        elif quota_breaker.is_open() or not youtube_keys.acquire():
+            api_key_status = "Quota Exceeded"
+            api_key_details = "Every API key has reached its daily quota"
         else:
             # Make a simple API request to test the key
             try:
-                test_url = f"https://www.googleapis.com/youtube/v3/videos?part=snippet&chart=mostPopular&maxResults=1&key={api_key}"
-                response = requests.get(test_url, timeout=10)
+                response = YouTubeService._api_get('videos', {'part': 'snippet', 'chart': 'mostPopular', 'maxResults': 1})
                 
                 if response.status_code == 200:
                     api_key_valid = True
@@ -186,6 +193,11 @@ def index():
         api_key_status = "Error"
         api_key_details = f"Unexpected error: {str(e)}"
     
+    # Get today's YouTube API quota spend
+    quota_usage = quota_ledger.get_usage()
+    api_keys = youtube_keys.get_stats()
+    quota_breaker_state = quota_breaker.get_state()
+    
     # Get settings
     settings = {
         'polling_interval': current_app.config.get('POLLING_INTERVAL', 3600),
@@ -199,6 +211,8 @@ def index():
         recent_videos=recent_videos,
         system_events=system_events,
         monitor_active=monitor_active,
+        monitor_holder=monitor_holder,
+        monitor_local=monitor.is_leader,
         last_check=last_check,
         api_key_valid=api_key_valid,
         api_key_status=api_key_status,
@@ -206,6 +220,9 @@ def index():
         settings=settings,
         mongo_available=mongo.db is not None,
         channels=channels,
+        quota_usage=quota_usage,
+        api_keys=api_keys,
+        quota_breaker=quota_breaker_state,
         now=datetime.utcnow(),
         timedelta=timedelta
     )
@@ -214,30 +231,22 @@ def index():
 def test_api_key():
     """Endpoint to test the YouTube API key and refresh status"""
     try:
-        # First try to get API key from app config
-        api_key = current_app.config.get('YOUTUBE_API_KEY')
-        
-        # If not found in app config, try getting it directly from environment
-        if not api_key:
-            # Load environment variables from .env file
+        # Keys come from the key pool (YOUTUBE_API_KEYS / YOUTUBE_API_KEY)
+        if not youtube_keys.has_keys():
+            # Pick up a key added to the .env file since startup
             load_dotenv()
-            
-            # Check if environment has the key now
-            api_key = os.environ.get('YOUTUBE_API_KEY')
-            current_app.logger.info(f"API key from environment: {'Found' if api_key else 'Not found'}")
-            
-            # Update the app config if we found a key in the environment
-            if api_key:
-                current_app.config['YOUTUBE_API_KEY'] = api_key
-                current_app.logger.info("Updated app config with API key from environment")
+            current_app.config['YOUTUBE_API_KEYS'] = os.environ.get('YOUTUBE_API_KEYS', '')
+            current_app.config['YOUTUBE_API_KEY'] = os.environ.get('YOUTUBE_API_KEY', '')
+            youtube_keys.init_app(current_app)
         
-        if not api_key:
+        if not youtube_keys.has_keys():
             flash("No YouTube API key configured in environment variables", "error")
+        elif quota_breaker.is_open() or not youtube_keys.acquire():
+            flash("Every API key has reached its daily quota", "warning")
         else:
             # Make a simple API request to test the key
             try:
-                test_url = f"https://www.googleapis.com/youtube/v3/videos?part=snippet&chart=mostPopular&maxResults=1&key={api_key}"
-                response = requests.get(test_url, timeout=10)
+                response = YouTubeService._api_get('videos', {'part': 'snippet', 'chart': 'mostPopular', 'maxResults': 1})
                 
                 if response.status_code == 200:
                     flash("API key is working correctly", "success")
@@ -282,3 +291,24 @@ def test_api_key():
         flash(f"Unexpected error: {str(e)}", "error")
     
     return redirect(url_for('dashboard.index'))
+
+@dashboard_bp.route('/api/stats')
+def runtime_stats():
+    """Runtime statistics for this process (connection reuse, known-video index etc.)"""
+    return jsonify({
+        'youtube_http': youtube_http.get_stats(),
+        'quota': quota_ledger.get_usage(),
+        'api_keys': youtube_keys.get_stats(),
+        'quota_breaker': quota_breaker.get_state(),
+        'video_index': known_videos.get_stats(),
+        'websub': WebSubService.get_stats(),
+        'channel_checks': channel_checks.get_stats(),
+        'webhook_outbox': delivery_workers.get_stats(),
+        'webhook_http': webhook_http.get_stats(),
+        'monitor': {
+            'process': monitor_lease.holder_id,
+            'running': monitor.running,
+            'leader': monitor.is_leader,
+            'lease': monitor_lease.get_holder()
+        }
+    })
@@ -2,6 +2,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from app.tasks.monitor_task import monitor, run_immediate_check
 from app.config import Config
+from app.services.api_key_pool import youtube_keys
+from app.services.quota_service import quota_breaker
 import os
 import time
 import logging
@@ -58,10 +60,12 @@ def update():
         if hasattr(monitor, 'app') and monitor.app is not None:
             current_app.logger.info("Updating polling interval in running monitor task")
             try:
-                # This just flags for the next cycle, doesn't affect current sleep
                 monitor.app.config['POLLING_INTERVAL'] = polling_interval
             except Exception as e:
                 current_app.logger.error(f"Error updating monitor task config: {e}")
+        
+        # Reschedule right away instead of after the current wait
+        monitor.wake(reload=True)
     
     # Update max retries if provided
     if max_retries and max_retries.isdigit():
@@ -92,6 +96,9 @@ def update():
         Config.YOUTUBE_API_KEY = youtube_api_key
         current_app.config['YOUTUBE_API_KEY'] = youtube_api_key
         os.environ['YOUTUBE_API_KEY'] = youtube_api_key
+        youtube_keys.init_app(current_app)
+        # A new key brings new quota
+        quota_breaker.close()
         current_app.logger.info("Updated YOUTUBE_API_KEY environment variable")
     
     # Update log level if provided
@@ -118,6 +125,14 @@ def update():
 
 @settings_bp.route('/restart', methods=['POST'])
 def restart_monitor():
+    if not current_app.config.get('RUN_MONITOR', True):
+        # The monitor runs in a standalone worker (python -m app.worker); have it reload instead
+        if monitor.wake(reload=True):
+            flash('The monitor runs in a separate worker process; it has been asked to reload its schedule', 'info')
+        else:
+            flash('No monitor worker is running; start one with python -m app.worker', 'warning')
+        return redirect(url_for('settings.index'))
+    
     # Restart the monitoring task with the current settings
     monitor.stop()
     
@@ -135,14 +150,10 @@ def restart_monitor():
         os.environ['POLLING_INTERVAL'] = str(current_polling)
         current_app.logger.info(f"Updated environment POLLING_INTERVAL to match config: {current_polling}")
     
-    # Start the monitoring task with current app
+    # Start the monitoring task with current app; it resumes the stored check schedule
     monitor.start(current_app._get_current_object())
     
-    # Run an immediate check to ensure all channels are checked right away
-    current_app.logger.info("Running immediate check after restart")
-    run_immediate_check(current_app._get_current_object())
-    
-    flash('Monitoring service restarted successfully and immediate check initiated', 'success')
+    flash('Monitoring service restarted successfully', 'success')
     return redirect(url_for('settings.index'))
 
 @settings_bp.route('/check_now', methods=['POST'])
@@ -150,6 +161,11 @@ def check_now():
     """Force an immediate check of all channels"""
     current_app.logger.info("Manual check triggered by user")
     
+    if quota_breaker.is_open():
+        breaker_state = quota_breaker.get_state()
+        flash(f"YouTube API quota is exhausted; checks resume at {breaker_state['open_until'].strftime('%Y-%m-%d %H:%M')} UTC", 'warning')
+        return redirect(url_for('settings.index'))
+    
     # Run an immediate check
     run_immediate_check(current_app._get_current_object())
     
@@ -161,8 +177,6 @@ def test_youtube_api():
     """Test the YouTube API connection"""
     try:
         from app.services.youtube_service import YouTubeService
-        import requests
-        import json
         
         # Get current settings to pass to the template
         env_polling_interval = os.environ.get('POLLING_INTERVAL')
@@ -182,19 +196,15 @@ def test_youtube_api():
             if isinstance(settings[key], str) and settings[key].isdigit():
                 settings[key] = int(settings[key])
         
-        api_key = current_app.config.get('YOUTUBE_API_KEY')
-        
-        if not api_key or api_key == 'YOUR_NEW_API_KEY_HERE':
+        if not youtube_keys.has_keys() or current_app.config.get('YOUTUBE_API_KEY') == 'YOUR_NEW_API_KEY_HERE':
             flash('YouTube API key is not set or is using the default placeholder value.', 'error')
             return render_template('settings.html', 
                                   settings=settings,
                                   api_status='error',
                                   api_message='API key not configured')
         
-        # Use a simple YouTube API endpoint that doesn't consume much quota
-        test_url = f"https://www.googleapis.com/youtube/v3/videos?part=id&chart=mostPopular&maxResults=1&key={api_key}"
-        
-        response = requests.get(test_url)
+        # Use a simple YouTube API endpoint that doesn't consume much quota (goes through the key pool)
+        response = YouTubeService._api_get('videos', {'part': 'id', 'chart': 'mostPopular', 'maxResults': 1})
         
         if response.status_code == 200:
             # Success - API is working
@@ -1,11 +1,30 @@
 # app/routes/webhooks.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from app.models.webhook import Webhook
+from app.models.webhook import Webhook, DIGEST_MODES, DEFAULT_DIGEST
 from app.services.webhook_service import WebhookService
 from bson.objectid import ObjectId
 
 webhooks_bp = Blueprint('webhooks', __name__)
 
+def _parse_digest(form):
+    """Read the digest settings from the webhook form; returns (digest, error message)"""
+    mode = form.get('digest_mode', 'off')
+    if mode not in DIGEST_MODES:
+        return None, 'Invalid digest mode'
+    
+    try:
+        window_seconds = int(form.get('digest_window', DEFAULT_DIGEST['window_seconds']))
+        max_batch = int(form.get('digest_max_batch', DEFAULT_DIGEST['max_batch']))
+    except ValueError:
+        return None, 'Digest window and batch size must be whole numbers'
+    
+    if not 10 <= window_seconds <= 86400:
+        return None, 'Digest window must be between 10 seconds and 24 hours'
+    if not 1 <= max_batch <= 500:
+        return None, 'Digest batch size must be between 1 and 500 videos'
+    
+    return {'mode': mode, 'window_seconds': window_seconds, 'max_batch': max_batch}, None
+
 @webhooks_bp.route('/')
 def index():
     webhooks = Webhook.get_all()
@@ -31,12 +50,17 @@ def add():
             flash('Webhook URL is required', 'error')
             return redirect(url_for('webhooks.add'))
         
+        digest, error = _parse_digest(request.form)
+        if error:
+            flash(error, 'error')
+            return redirect(url_for('webhooks.add'))
+        
         # Create webhook
-        Webhook.create(url, description, headers)
+        Webhook.create(url, description, headers, digest=digest)
         flash('Webhook added successfully', 'success')
         return redirect(url_for('webhooks.index'))
     
-    return render_template('webhooks_add.html')
+    return render_template('webhooks_add.html', digest=DEFAULT_DIGEST)
 
 @webhooks_bp.route('/<webhook_id>')
 def view(webhook_id):
@@ -48,7 +72,8 @@ def view(webhook_id):
     # Get webhook delivery history
     delivery_history = WebhookService.get_delivery_history(webhook_id)
     
-    return render_template('webhooks_view.html', webhook=webhook, delivery_history=delivery_history)
+    return render_template('webhooks_view.html', webhook=webhook, delivery_history=delivery_history,
+                           digest=Webhook.digest_settings(webhook))
 
 @webhooks_bp.route('/<webhook_id>/edit', methods=['GET', 'POST'])
 def edit(webhook_id):
@@ -76,12 +101,17 @@ def edit(webhook_id):
             flash('Webhook URL is required', 'error')
             return redirect(url_for('webhooks.edit', webhook_id=webhook_id))
         
+        digest, error = _parse_digest(request.form)
+        if error:
+            flash(error, 'error')
+            return redirect(url_for('webhooks.edit', webhook_id=webhook_id))
+        
         # Update webhook
-        Webhook.update(webhook_id, url, description, headers, active)
+        Webhook.update(webhook_id, url, description, headers, active, digest=digest)
         flash('Webhook updated successfully', 'success')
         return redirect(url_for('webhooks.index'))
     
-    return render_template('webhooks_edit.html', webhook=webhook)
+    return render_template('webhooks_edit.html', webhook=webhook, digest=Webhook.digest_settings(webhook))
 
 @webhooks_bp.route('/<webhook_id>/toggle', methods=['POST'])
 def toggle(webhook_id):
@@ -0,0 +1,30 @@
+# app/routes/websub.py
+from flask import Blueprint, request, current_app
+from app.services.websub_service import WebSubService
+import logging
+
+logger = logging.getLogger(__name__)
+websub_bp = Blueprint('websub', __name__)
+
+@websub_bp.route('/callback/<channel_id>', methods=['GET'])
+def verify(channel_id):
+    """Subscription verification challenge from the hub"""
+    challenge = WebSubService.verify_intent(channel_id, request.args)
+    if challenge is None:
+        return '', 404
+    return challenge, 200, {'Content-Type': 'text/plain'}
+
+@websub_bp.route('/callback/<channel_id>', methods=['POST'])
+def notify(channel_id):
+    """Pushed Atom entry for a new or updated video"""
+    body = request.get_data()
+    
+    # Per the WebSub spec a rejected push is still acknowledged with a 2xx, but the content is ignored
+    if not WebSubService.accept_notification(channel_id, body, request.headers.get('X-Hub-Signature')):
+        return '', 202
+    
+    if not WebSubService.handle_notification_in_background(current_app._get_current_object(), channel_id, body):
+        # Too many pushes waiting; the hub retries deliveries that weren't acknowledged
+        logger.warning(f"WebSub push queue full, asking the hub to retry the notification for channel {channel_id}")
+        return '', 503
+    return '', 202
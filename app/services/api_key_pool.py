@@ -0,0 +1,151 @@
+# app/services/api_key_pool.py
+
+import hashlib
+import logging
+import re
+import threading
+from datetime import datetime
+from app.services.quota_service import quota_ledger, next_quota_reset
+
+logger = logging.getLogger(__name__)
+
+class NoApiKeyAvailable(Exception):
+    """Raised when no YouTube API key is configured or every key is out of quota"""
+
+def key_id(api_key):
+    """Stable, non-secret identifier for a key (used in the quota ledger instead of the key itself)"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+def mask_key(api_key):
+    return api_key[:6] + '*****' + api_key[-4:] if len(api_key) > 10 else '******'
+
+class ApiKeyPool:
+    """
+    Pool of YouTube Data API keys, one per Google Cloud project
+
+    Every API call asks the pool for a key; the pool hands out the keys in turn,
+    skipping keys that have spent their daily quota according to the quota ledger.
+    A key that answers quotaExceeded is taken out of rotation until the next quota
+    reset, in every process: the exhaustion is written to the ledger document.
+    """
+
+    # How stale the per-key usage read from the ledger may be when picking a key
+    # (this process's own unflushed usage is always included)
+    USAGE_MAX_AGE = 30
+
+    def __init__(self, daily_quota=10000):
+        self.daily_quota = daily_quota
+        self._keys = []
+        self._exhausted_until = {}
+        self._quota_errors = {}
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Load the keys from YOUTUBE_API_KEYS (comma separated) and YOUTUBE_API_KEY"""
+        self.daily_quota = app.config.get('YOUTUBE_DAILY_QUOTA', self.daily_quota)
+
+        keys = re.split(r'[\s,]+', app.config.get('YOUTUBE_API_KEYS') or '')
+        keys.append(app.config.get('YOUTUBE_API_KEY') or '')
+        self.set_keys(keys)
+
+    def set_keys(self, keys):
+        """Replace the keys in the pool; usage and exhaustion state of kept keys is preserved"""
+        unique_keys = [key for key in dict.fromkeys(key.strip() for key in keys if key) if key]
+
+        with self._lock:
+            self._keys = [{'key': key, 'id': key_id(key), 'label': mask_key(key)} for key in unique_keys]
+
+        # The planner budgets against the combined quota of all keys
+        quota_ledger.daily_quota = self.daily_quota * max(len(unique_keys), 1)
+        logger.info(f"YouTube API key pool loaded with {len(unique_keys)} keys")
+
+    def has_keys(self):
+        return bool(self._keys)
+
+    def _exhausted_until_for(self, entry, key_usage):
+        """When the key comes back into rotation, from this process or the shared ledger (or None)"""
+        times = [self._exhausted_until.get(entry['id']), key_usage.get(entry['id'], {}).get('exhausted_until')]
+        times = [until for until in times if until is not None]
+        return max(times) if times else None
+
+    def _is_exhausted(self, entry, now, key_usage):
+        until = self._exhausted_until_for(entry, key_usage)
+        return until is not None and until > now
+
+    def _key_usage(self, max_age=None):
+        return quota_ledger.get_usage(max_age=self.USAGE_MAX_AGE if max_age is None else max_age)['keys']
+
+    def acquire(self):
+        """
+        Pick the next key in turn among the keys with budget left today
+
+        If the ledger shows every key still in rotation at its daily quota, they all
+        take turns anyway; quotaExceeded answers then take them out one by one.
+
+        Returns:
+            str: the API key, or None if there are no keys or all of them are exhausted
+        """
+        now = datetime.utcnow()
+        key_usage = self._key_usage()
+        with self._lock:
+            available = [entry for entry in self._keys if not self._is_exhausted(entry, now, key_usage)]
+            if not available:
+                return None
+
+            with_budget = [
+                entry for entry in available
+                if key_usage.get(entry['id'], {}).get('units', 0) < self.daily_quota
+            ] or available
+            entry = with_budget[self._cursor % len(with_budget)]
+            self._cursor += 1
+        return entry['key']
+
+    def report_quota_exceeded(self, api_key):
+        """Take a key out of rotation until the next quota reset"""
+        entry_id = key_id(api_key)
+        reset_at = next_quota_reset()
+
+        with self._lock:
+            self._exhausted_until[entry_id] = reset_at
+            self._quota_errors[entry_id] = self._quota_errors.get(entry_id, 0) + 1
+        quota_ledger.mark_key_exhausted(entry_id, reset_at)
+
+        logger.warning(f"YouTube API key {mask_key(api_key)} exceeded its quota, "
+                       f"out of rotation until {reset_at.isoformat()} UTC")
+
+    def remaining_units(self):
+        """Units left today across all keys still in rotation"""
+        now = datetime.utcnow()
+        key_usage = self._key_usage()
+        with self._lock:
+            return sum(
+                max(self.daily_quota - key_usage.get(entry['id'], {}).get('units', 0), 0)
+                for entry in self._keys
+                if not self._is_exhausted(entry, now, key_usage)
+            )
+
+    def get_stats(self):
+        """Usage counters for every key in the pool"""
+        now = datetime.utcnow()
+        key_usage = self._key_usage(max_age=0)
+
+        stats = []
+        with self._lock:
+            for entry in self._keys:
+                usage = key_usage.get(entry['id'], {})
+                exhausted = self._is_exhausted(entry, now, key_usage)
+                stats.append({
+                    'key': entry['label'],
+                    'id': entry['id'],
+                    'calls': usage.get('calls', 0),
+                    'units': usage.get('units', 0),
+                    'remaining': 0 if exhausted else max(self.daily_quota - usage.get('units', 0), 0),
+                    'available': not exhausted,
+                    'exhausted_until': self._exhausted_until_for(entry, key_usage) if exhausted else None,
+                    'quota_errors': self._quota_errors.get(entry['id'], 0)
+                })
+        return stats
+
+# Shared pool used for all YouTube Data API calls
+youtube_keys = ApiKeyPool()
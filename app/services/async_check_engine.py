@@ -0,0 +1,240 @@
+# app/services/async_check_engine.py
+
+import asyncio
+import logging
+import time
+import aiohttp
+from app.services import youtube_service
+from app.services.youtube_service import YouTubeService
+from app.services.quota_service import quota_ledger, quota_breaker
+from app.services.api_key_pool import youtube_keys, key_id
+from app.services.single_flight import channel_checks
+
+logger = logging.getLogger(__name__)
+
+class AsyncCheckEngine:
+    """
+    asyncio-based detection engine that checks many channels on one event loop
+
+    Only the common case runs on the loop: a channel with a stored uploads playlist ID
+    whose playlistItems call returns 200 or 304. Anything else (no playlist ID yet, 404,
+    empty playlist, API or network errors) is handed to the sync
+    YouTubeService.check_channel in a worker thread, and stored videos go through the
+    same YouTubeService._store_new_videos as the sync path, so both engines produce
+    the same results. Each check runs as a channel_checks flight like a sync check, so
+    a page view or "Check now" of a channel being checked waits for this check (and
+    the other way round) instead of calling the API again.
+    """
+
+    def __init__(self, app, max_in_flight=50, deadline=None, connect_timeout=5, read_timeout=15, should_stop=None,
+                 fresh_for=0):
+        """
+        Args:
+            app: Flask app, used for the app context of sync fallbacks
+            max_in_flight: maximum number of HTTP requests in flight at once
+            deadline: seconds after which channels not yet started are skipped (None = no deadline)
+            should_stop: optional callable; when it returns True remaining channels are skipped
+                         (they are also skipped while the quota circuit breaker is open)
+            fresh_for: seconds a finished check of a channel is reused (CHECK_FRESHNESS_SECONDS)
+        """
+        self.app = app
+        self.max_in_flight = max(int(max_in_flight), 1)
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.should_stop = should_stop
+        self.fresh_for = fresh_for
+        self._deadline_at = None
+
+    def run(self, channels, api_key=None, enrich=False):
+        """
+        Check the channels for new videos
+
+        Returns:
+            list: (channel, result) tuples in completion order; results have the same
+                  shape as YouTubeService.check_channel (including 'shared'), or {'skipped': True}
+        """
+        return asyncio.run(self._run(channels, api_key, enrich))
+
+    def fetch_playlists(self, channels, api_key=None):
+        """
+        Run only the fetch stage (no database work) and return {channel_id: status code}
+        Used by the benchmark to compare raw throughput with the sync client
+        """
+        return asyncio.run(self._fetch_all(channels, api_key))
+
+    async def _run(self, channels, api_key, enrich):
+        self._start_deadline()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = []
+
+        async with self._create_session() as session:
+            async def check(channel):
+                result = await self._check_channel(session, semaphore, channel, api_key, enrich)
+                results.append((channel, result))
+
+            await asyncio.gather(*(check(channel) for channel in channels))
+
+        skipped = sum(1 for _, result in results if result.get('skipped'))
+        if skipped:
+            logger.warning(f"Async engine skipped {skipped} channels (deadline reached, quota breaker open or monitor stopping)")
+        return results
+
+    async def _fetch_all(self, channels, api_key):
+        self._start_deadline()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        statuses = {}
+
+        async with self._create_session() as session:
+            async def fetch(channel):
+                async with semaphore:
+                    try:
+                        status, _, _ = await self._get_playlist_items(
+                            session, channel['uploads_playlist_id'], api_key, channel.get('uploads_etag')
+                        )
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        status = 0
+                statuses[channel['channel_id']] = status
+
+            await asyncio.gather(*(fetch(channel) for channel in channels))
+
+        return statuses
+
+    def _start_deadline(self):
+        self._deadline_at = time.monotonic() + self.deadline if self.deadline else None
+
+    def _create_session(self):
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def _should_skip(self):
+        if self.should_stop and self.should_stop():
+            return True
+        if quota_breaker.is_open():
+            return True
+        return self._deadline_at is not None and time.monotonic() > self._deadline_at
+
+    async def _get_playlist_items(self, session, uploads_playlist_id, api_key=None, etag=None):
+        """
+        Fetch the first page of an uploads playlist; returns (status, etag, data)
+        Without an explicit api_key a key is taken from the key pool for this request
+        """
+        key = api_key or youtube_keys.acquire()
+        if not key:
+            # Every key is out of quota - let the sync fallback report it
+            return None, None, None
+
+        url = f"{youtube_service.YOUTUBE_API_BASE_URL}/playlistItems"
+        params = {
+            'part': 'snippet',
+            'maxResults': 15,
+            'playlistId': uploads_playlist_id,
+            'key': key
+        }
+        headers = {'If-None-Match': etag} if etag else None
+
+        async with session.get(url, params=params, headers=headers) as response:
+            quota_ledger.record('playlistItems', key_id=key_id(key))
+            if response.status == 403:
+                data = await response.json(content_type=None)
+                reason = data.get('error', {}).get('errors', [{}])[0].get('reason')
+                if reason == 'quotaExceeded':
+                    youtube_keys.report_quota_exceeded(key)
+                return response.status, None, None
+            if response.status != 200:
+                return response.status, None, None
+
+            data = await response.json(content_type=None)
+            return response.status, response.headers.get('ETag') or data.get('etag'), data
+
+    async def _check_channel(self, session, semaphore, channel, api_key, enrich):
+        channel_id = channel['channel_id']
+        skipped = {'channel_id': channel_id, 'skipped': True}
+
+        if self._should_skip():
+            return skipped
+
+        uploads_playlist_id = channel.get('uploads_playlist_id')
+        if not uploads_playlist_id:
+            return await self._check_sync(channel_id, enrich)
+
+        async with semaphore:
+            # The deadline may have passed while we were waiting for a slot
+            if self._should_skip():
+                return skipped
+
+            flight, owner = channel_checks.begin(channel_id, self.fresh_for)
+            if owner:
+                try:
+                    status, etag, data = await self._fetch_playlist(session, channel_id, uploads_playlist_id, api_key,
+                                                                    channel.get('uploads_etag'))
+                except BaseException as e:
+                    channel_checks.end(channel_id, flight, error=e, fresh_for=self.fresh_for)
+                    raise
+
+        if not owner:
+            # Checked by another caller just now or right now; that caller announces the new videos
+            result = await asyncio.to_thread(channel_checks.wait, channel_id, flight)
+            return dict(result, shared=True)
+
+        try:
+            result = await self._handle_playlist(channel_id, status, etag, data, api_key, enrich)
+        except BaseException as e:
+            channel_checks.end(channel_id, flight, error=e, fresh_for=self.fresh_for)
+            raise
+        channel_checks.end(channel_id, flight, result, fresh_for=self.fresh_for)
+        return dict(result, shared=False)
+
+    async def _fetch_playlist(self, session, channel_id, uploads_playlist_id, api_key, etag):
+        """_get_playlist_items, with network errors reported as status None (handled by the sync path)"""
+        try:
+            return await self._get_playlist_items(session, uploads_playlist_id, api_key, etag)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Async fetch failed for channel {channel_id}, retrying with sync check: {str(e)}")
+            return None, None, None
+
+    async def _handle_playlist(self, channel_id, status, etag, data, api_key, enrich):
+        """Turn a playlistItems response into a check result (runs inside the channel's flight)"""
+        result = {
+            'channel_id': channel_id,
+            'new_videos': [],
+            'not_modified': False,
+            'error': None
+        }
+
+        if status == 304:
+            logger.info(f"Uploads playlist for channel {channel_id} not modified since last check")
+            await asyncio.to_thread(YouTubeService._mark_checked, channel_id)
+            result['not_modified'] = True
+            return result
+
+        if status == 200:
+            videos = YouTubeService._parse_playlist_items(data.get('items', []), channel_id)
+            if videos:
+                await asyncio.to_thread(YouTubeService._mark_checked, channel_id)
+                result['new_videos'] = await asyncio.to_thread(
+                    self._store_in_context, channel_id, videos, etag, enrich, api_key
+                )
+                return result
+
+        # Missing playlist, 404, empty playlist or errors - the sync path knows how to handle these.
+        # This check already holds the channel's flight, so it runs the check itself
+        return await asyncio.to_thread(self._check_in_flight, channel_id, enrich)
+
+    async def _check_sync(self, channel_id, enrich):
+        return await asyncio.to_thread(self._check_in_context, channel_id, enrich)
+
+    def _check_in_context(self, channel_id, enrich):
+        with self.app.app_context():
+            return YouTubeService.check_channel(channel_id, enrich=enrich)
+
+    def _check_in_flight(self, channel_id, enrich):
+        with self.app.app_context():
+            return YouTubeService._check_channel(channel_id, enrich)
+
+    def _store_in_context(self, channel_id, videos, etag, enrich, api_key):
+        with self.app.app_context():
+            return YouTubeService._store_new_videos(
+                channel_id, videos, playlist_etag=etag, enrich=enrich, api_key=api_key
+            )
@@ -0,0 +1,94 @@
+# app/services/cadence_service.py
+
+import logging
+import math
+from datetime import datetime, timedelta
+from flask import current_app
+from pymongo import DESCENDING
+from app import mongo
+
+logger = logging.getLogger(__name__)
+
+# Recent uploads used to estimate a channel's upload rate
+CADENCE_SAMPLE_SIZE = 20
+
+# Shortest window the rate is averaged over, so a burst of uploads doesn't look like a daily habit
+MIN_RATE_WINDOW = timedelta(days=1)
+
+class CadenceService:
+    """
+    Per-channel polling intervals learned from upload history
+
+    Uploads are modelled as a Poisson process whose rate is estimated from the
+    publish dates of the channel's most recent stored videos, averaged up to now, so
+    the rate decays while a channel is quiet. A channel's interval is the time in
+    which a new upload becomes ADAPTIVE_TARGET_PROBABILITY likely, bounded by
+    ADAPTIVE_MIN_INTERVAL and ADAPTIVE_MAX_INTERVAL; the check scheduler uses it.
+    """
+
+    @staticmethod
+    def enabled():
+        return bool(current_app.config.get('ADAPTIVE_POLLING'))
+
+    @staticmethod
+    def upload_rate(published_dates, now=None):
+        """
+        Estimated uploads per second from publish dates (newest first), or None without history
+        """
+        if not published_dates:
+            return None
+
+        now = now or datetime.utcnow()
+        window = max(now - min(published_dates), MIN_RATE_WINDOW)
+        return len(published_dates) / window.total_seconds()
+
+    @staticmethod
+    def interval_for_rate(rate):
+        """Seconds until a new upload is ADAPTIVE_TARGET_PROBABILITY likely, within the configured bounds"""
+        config = current_app.config
+        min_interval = config.get('ADAPTIVE_MIN_INTERVAL', 300)
+        max_interval = config.get('ADAPTIVE_MAX_INTERVAL', 86400)
+
+        if not rate:
+            # No history yet: fall back to the global interval
+            interval = config.get('POLLING_INTERVAL', 3600)
+        else:
+            probability = min(max(config.get('ADAPTIVE_TARGET_PROBABILITY', 0.1), 0.001), 0.999)
+            # P(at least one upload within t) = 1 - exp(-rate * t)
+            interval = -math.log(1 - probability) / rate
+
+        return int(min(max(interval, min_interval), max_interval))
+
+    @staticmethod
+    def _recent_publish_dates(channel_id):
+        """Publish dates of the channel's latest stored videos (served by the channel_published index)"""
+        cursor = mongo.db.videos.find(
+            {'channel_id': channel_id},
+            {'published_at': 1, '_id': 0}
+        ).sort('published_at', DESCENDING).limit(CADENCE_SAMPLE_SIZE)
+        return [doc['published_at'] for doc in cursor if doc.get('published_at')]
+
+    @staticmethod
+    def plan_intervals(channel_ids, now=None):
+        """
+        Work out the check interval of channels from their (just updated) upload history
+
+        Returns:
+            dict: channel_id -> {'check_interval' (seconds), 'upload_rate' (uploads per day)}
+        """
+        now = now or datetime.utcnow()
+        plans = {}
+
+        for channel_id in channel_ids:
+            rate = None
+            if mongo.db is not None:
+                try:
+                    rate = CadenceService.upload_rate(CadenceService._recent_publish_dates(channel_id), now)
+                except Exception as e:
+                    logger.error(f"Error reading upload history for channel {channel_id}: {str(e)}")
+
+            plans[channel_id] = {
+                'check_interval': CadenceService.interval_for_rate(rate),
+                'upload_rate': round(rate * 86400, 3) if rate else None
+            }
+        return plans
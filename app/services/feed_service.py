@@ -0,0 +1,119 @@
+# app/services/feed_service.py
+
+import os
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+import requests
+from app.services.http_client import youtube_http
+
+logger = logging.getLogger(__name__)
+
+# Public Atom feed of a channel's latest uploads; fetching it costs no API quota
+YOUTUBE_FEED_URL = os.environ.get('YOUTUBE_FEED_URL', 'https://www.youtube.com/feeds/videos.xml')
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+YT_NS = '{http://www.youtube.com/xml/schemas/2015}'
+
+def _parse_timestamp(value):
+    """Feed timestamps look like 2024-01-01T12:00:00+00:00; returns naive UTC"""
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def parse_feed(source):
+    """
+    Stream-parse a YouTube channel feed
+
+    Elements are discarded as soon as each entry is read, so memory use doesn't grow
+    with the size of the document.
+
+    Args:
+        source: file name or binary file-like object (e.g. response.raw)
+
+    Returns:
+        list: [{'video_id', 'channel_id', 'title', 'published_at'}] in feed order (newest first)
+
+    Raises:
+        ET.ParseError: if the document is not well-formed XML
+    """
+    entries = []
+    current = None
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == f"{ATOM_NS}entry":
+                current = {'video_id': None, 'channel_id': None, 'title': None, 'published_at': None}
+            continue
+
+        if current is None:
+            continue
+
+        if elem.tag == f"{YT_NS}videoId":
+            current['video_id'] = (elem.text or '').strip() or None
+        elif elem.tag == f"{YT_NS}channelId":
+            current['channel_id'] = (elem.text or '').strip() or None
+        elif elem.tag == f"{ATOM_NS}title":
+            current['title'] = elem.text
+        elif elem.tag == f"{ATOM_NS}published":
+            current['published_at'] = _parse_timestamp(elem.text)
+        elif elem.tag == f"{ATOM_NS}entry":
+            if current['video_id']:
+                entries.append(current)
+            current = None
+            elem.clear()
+
+    return entries
+
+class FeedService:
+    @staticmethod
+    def fetch_feed(channel_id, etag=None, last_modified=None):
+        """
+        Fetch a channel's feed with a conditional GET
+
+        Returns:
+            dict: {
+                'status': 'ok', 'not_modified' or 'error',
+                'entries': parsed entries (empty unless status is 'ok'),
+                'etag': ETag header of the response,
+                'last_modified': Last-Modified header of the response
+            }
+        """
+        result = {'status': 'error', 'entries': [], 'etag': None, 'last_modified': None}
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        try:
+            with youtube_http.get(YOUTUBE_FEED_URL, params={'channel_id': channel_id},
+                                  headers=headers or None, stream=True) as response:
+                if response.status_code == 304:
+                    result['status'] = 'not_modified'
+                    result['etag'] = etag
+                    result['last_modified'] = last_modified
+                    return result
+
+                if response.status_code != 200:
+                    logger.warning(f"Feed request for channel {channel_id} failed with status code {response.status_code}")
+                    return result
+
+                # Let urllib3 undo any gzip encoding while we stream
+                response.raw.decode_content = True
+                result['entries'] = parse_feed(response.raw)
+                result['etag'] = response.headers.get('ETag')
+                result['last_modified'] = response.headers.get('Last-Modified')
+                result['status'] = 'ok'
+                return result
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Feed request error for channel {channel_id}: {str(e)}")
+        except ET.ParseError as e:
+            logger.error(f"Could not parse feed for channel {channel_id}: {str(e)}")
+
+        return result
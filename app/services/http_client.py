@@ -0,0 +1,335 @@
+# app/services/http_client.py
+
+import os
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+class ConnectionStats:
+    """Thread-safe per-host counters for requests sent, connections opened and time spent opening them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host_entry(self, host):
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = {'requests': 0, 'connections': 0, 'errors': 0, 'connect_seconds': 0.0}
+            self._hosts[host] = entry
+        return entry
+
+    def record_connection(self, host, seconds=0.0):
+        with self._lock:
+            entry = self._host_entry(host)
+            entry['connections'] += 1
+            entry['connect_seconds'] += seconds
+
+    def record_request(self, host, error=False):
+        with self._lock:
+            entry = self._host_entry(host)
+            entry['requests'] += 1
+            if error:
+                entry['errors'] += 1
+
+    def snapshot(self):
+        """Return a copy of the counters with the reuse ratio and average handshake time for each host"""
+        with self._lock:
+            hosts = {host: dict(entry) for host, entry in self._hosts.items()}
+
+        for entry in hosts.values():
+            # Failed requests (e.g. connection refused) neither opened nor reused a connection
+            completed = entry['requests'] - entry['errors']
+            reused = max(completed - entry['connections'], 0)
+            entry['reused'] = reused
+            entry['reuse_ratio'] = round(reused / completed, 4) if completed > 0 else 0.0
+            # TCP connect plus the TLS handshake for https
+            connect_seconds = entry.pop('connect_seconds')
+            entry['avg_handshake_ms'] = round(connect_seconds * 1000 / entry['connections'], 1) if entry['connections'] else None
+        return hosts
+
+class _RequestConnectionStats(ConnectionStats):
+    """ConnectionStats that also collects the connections opened by the calling thread's current request"""
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def begin_request(self):
+        self._local.opened = []
+
+    def end_request(self):
+        """Handshake durations (seconds) of the connections opened since begin_request()"""
+        opened = getattr(self._local, 'opened', None) or []
+        self._local.opened = None
+        return opened
+
+    def record_connection(self, host, seconds=0.0):
+        super().record_connection(host, seconds)
+        opened = getattr(self._local, 'opened', None)
+        if opened is not None:
+            opened.append(seconds)
+
+def _tracking_connection_class(base_class, stats):
+    """Build a connection class that reports every new socket to the stats object"""
+
+    class TrackingConnection(base_class):
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            stats.record_connection(self.host, time.perf_counter() - started)
+
+    TrackingConnection.__name__ = f"Tracking{base_class.__name__}"
+    return TrackingConnection
+
+class _TrackingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools count the connections they open"""
+
+    def __init__(self, stats, **kwargs):
+        # Must be set before HTTPAdapter.__init__ calls init_poolmanager
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        stats = self._stats
+
+        class TrackingHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = _tracking_connection_class(HTTPConnection, stats)
+
+        class TrackingHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = _tracking_connection_class(HTTPSConnection, stats)
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TrackingHTTPConnectionPool,
+            'https': TrackingHTTPSConnectionPool
+        }
+
+class HttpClient:
+    """
+    Shared, thread-safe HTTP client with connection pooling and keep-alive.
+
+    One requests.Session is created lazily for the whole process, so every call
+    reuses already-open TCP/TLS connections instead of paying a new handshake.
+    """
+
+    def __init__(self, name='http'):
+        self.name = name
+        self.pool_size = int(os.environ.get('HTTP_POOL_SIZE', 20))
+        self.connect_timeout = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+        self.read_timeout = float(os.environ.get('HTTP_READ_TIMEOUT', 15))
+        self.stats = ConnectionStats()
+        self._session = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Apply pool and timeout settings from the app config"""
+        self.configure(
+            pool_size=app.config.get('HTTP_POOL_SIZE', self.pool_size),
+            connect_timeout=app.config.get('HTTP_CONNECT_TIMEOUT', self.connect_timeout),
+            read_timeout=app.config.get('HTTP_READ_TIMEOUT', self.read_timeout)
+        )
+
+    def configure(self, pool_size=None, connect_timeout=None, read_timeout=None):
+        """Update settings; the session is rebuilt if the pool size changes"""
+        with self._lock:
+            if connect_timeout is not None:
+                self.connect_timeout = float(connect_timeout)
+            if read_timeout is not None:
+                self.read_timeout = float(read_timeout)
+            if pool_size is not None and int(pool_size) != self.pool_size:
+                self.pool_size = int(pool_size)
+                if self._session is not None:
+                    self._session.close()
+                    self._session = None
+
+        logger.info(f"HTTP client '{self.name}' configured: pool_size={self.pool_size}, "
+                    f"timeouts=({self.connect_timeout}s connect, {self.read_timeout}s read)")
+
+    @property
+    def session(self):
+        """The shared session, created on first use"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = _TrackingAdapter(
+            self.stats,
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            pool_block=False
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the pooled session with the default timeouts"""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).hostname or 'unknown'
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.stats.record_request(host, error=True)
+            raise
+
+        self.stats.record_request(host)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self):
+        """Connection reuse counters per host plus the current settings"""
+        return {
+            'pool_size': self.pool_size,
+            'connect_timeout': self.connect_timeout,
+            'read_timeout': self.read_timeout,
+            'hosts': self.stats.snapshot()
+        }
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+class WebhookSessions:
+    """
+    Keep-alive sessions for webhook receivers, one per destination (scheme + host)
+
+    Every receiver gets its own session with at most pool_size open connections, so
+    notifications to the same receiver reuse a connection instead of paying a new
+    TCP/TLS handshake each time. Sessions unused for idle_seconds are closed.
+    Connection reuse and handshake time are counted per host and per webhook.
+    """
+
+    def __init__(self):
+        self.pool_size = int(os.environ.get('WEBHOOK_POOL_SIZE', 4))
+        self.idle_seconds = int(os.environ.get('WEBHOOK_SESSION_IDLE_SECONDS', 300))
+        self.stats = _RequestConnectionStats()
+        self.webhook_stats = ConnectionStats()
+        # (scheme, host) -> [session, monotonic time of last use]
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        with self._lock:
+            self.pool_size = int(app.config.get('WEBHOOK_POOL_SIZE', self.pool_size))
+            self.idle_seconds = int(app.config.get('WEBHOOK_SESSION_IDLE_SECONDS', self.idle_seconds))
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = _TrackingAdapter(
+            self.stats,
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            pool_block=False
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def _session_for(self, url):
+        parts = urlsplit(url)
+        key = (parts.scheme.lower(), parts.netloc.lower())
+        now = time.monotonic()
+        idle = []
+
+        with self._lock:
+            for other_key, (session, last_used) in list(self._sessions.items()):
+                if other_key != key and now - last_used >= self.idle_seconds:
+                    idle.append(session)
+                    del self._sessions[other_key]
+
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = [self._create_session(), now]
+                self._sessions[key] = entry
+            entry[1] = now
+
+        for session in idle:
+            session.close()
+        if idle:
+            logger.debug(f"Closed {len(idle)} idle webhook sessions")
+        return entry[0]
+
+    def request(self, method, url, webhook_id=None, **kwargs):
+        """Send a request through the destination's session; webhook_id attributes it in the stats"""
+        session = self._session_for(url)
+        host = urlsplit(url).hostname or 'unknown'
+        webhook_key = str(webhook_id) if webhook_id is not None else host
+
+        self.stats.begin_request()
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.stats.record_request(host, error=True)
+            self._record_webhook(webhook_key, self.stats.end_request(), error=True)
+            raise
+
+        self.stats.record_request(host)
+        self._record_webhook(webhook_key, self.stats.end_request())
+        return response
+
+    def _record_webhook(self, webhook_key, opened, error=False):
+        for seconds in opened:
+            self.webhook_stats.record_connection(webhook_key, seconds)
+        self.webhook_stats.record_request(webhook_key, error=error)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self):
+        """Open sessions and connection reuse / handshake time per host and per webhook ID"""
+        with self._lock:
+            sessions = [f"{scheme}://{netloc}" for scheme, netloc in self._sessions]
+        return {
+            'pool_size': self.pool_size,
+            'idle_seconds': self.idle_seconds,
+            'sessions': sessions,
+            'hosts': self.stats.snapshot(),
+            'webhooks': self.webhook_stats.snapshot()
+        }
+
+    def close(self):
+        """Close every session and its pooled connections"""
+        with self._lock:
+            sessions = [session for session, _ in self._sessions.values()]
+            self._sessions = {}
+        for session in sessions:
+            session.close()
+        if sessions:
+            logger.info(f"Closed {len(sessions)} webhook sessions")
+
+# Shared client used for all YouTube Data API calls
+youtube_http = HttpClient('youtube')
+
+# Per-receiver sessions used for webhook notifications
+webhook_http = WebhookSessions()
+
+# Client for WebSub hub (un)subscribe requests, kept apart from the YouTube API stats
+websub_http = HttpClient('websub')
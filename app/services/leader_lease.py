@@ -0,0 +1,207 @@
+# app/services/leader_lease.py
+
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app import mongo
+
+logger = logging.getLogger(__name__)
+
+class LeaderLease:
+    """
+    Mongo-backed lease that elects one process to run a singleton task
+
+    The holder keeps a document in the leases collection whose expires_at it pushes
+    forward every LEADER_HEARTBEAT_SECONDS. Other processes try to take the lease
+    on the same heartbeat and succeed once it has expired, so a dead holder is
+    replaced within LEADER_LEASE_SECONDS plus one heartbeat. The TTL index on
+    expires_at removes leases nobody renews.
+
+    Followers pass requests to the leader through the lease document (see request());
+    the leader picks them up with its next renewal.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.enabled = True
+        self.lease_seconds = 15
+        self.heartbeat_seconds = 5
+        # Monotonic time until which this process may act as leader without a renewal
+        self._valid_until = None
+        self._on_change = None
+        self._on_request = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = bool(config.get('LEADER_ELECTION', True))
+        self.lease_seconds = max(int(config.get('LEADER_LEASE_SECONDS', 15)), 2)
+        self.heartbeat_seconds = min(max(float(config.get('LEADER_HEARTBEAT_SECONDS', 5)), 0.5), self.lease_seconds / 2)
+
+    @property
+    def is_leader(self):
+        if not self.enabled:
+            return True
+        valid_until = self._valid_until
+        return valid_until is not None and time.monotonic() < valid_until
+
+    def try_acquire(self):
+        """
+        Take or renew the lease
+
+        Returns:
+            bool: True if this process holds the lease
+        """
+        if mongo.db is None:
+            # Nothing to coordinate through; behave like a single process
+            self._set_valid(time.monotonic() + self.lease_seconds)
+            return True
+
+        started = time.monotonic()
+        now = datetime.utcnow()
+        try:
+            # Matches only if we hold the lease or it has expired; otherwise the upsert
+            # collides with the live holder's _id and raises DuplicateKeyError
+            previous = mongo.db.leases.find_one_and_update(
+                {'_id': self.name, '$or': [{'holder': self.holder_id}, {'expires_at': {'$lt': now}}]},
+                {
+                    '$set': {'holder': self.holder_id, 'renewed_at': now,
+                             'expires_at': now + timedelta(seconds=self.lease_seconds)},
+                    '$unset': {'requests': ''}
+                },
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            self._set_valid(None)
+            return False
+        except Exception as e:
+            # Keep leading until the lease we already have runs out
+            logger.error(f"Error renewing {self.name} lease: {str(e)}")
+            return self.is_leader
+
+        # Measured from before the write, so we stop before anyone else can take over
+        self._set_valid(started + self.lease_seconds)
+
+        if not previous or previous.get('holder') != self.holder_id:
+            try:
+                mongo.db.leases.update_one({'_id': self.name, 'holder': self.holder_id}, {'$set': {'acquired_at': now}})
+            except Exception as e:
+                logger.error(f"Error recording {self.name} lease takeover: {str(e)}")
+
+        requests = (previous or {}).get('requests')
+        if requests and self._on_request:
+            try:
+                self._on_request(sorted(requests))
+            except Exception as e:
+                logger.error(f"Error handling {self.name} lease requests: {str(e)}")
+        return True
+
+    def _set_valid(self, valid_until):
+        with self._lock:
+            was_leader = self.is_leader
+            self._valid_until = valid_until
+            is_leader = self.is_leader
+
+        if was_leader != is_leader:
+            if is_leader:
+                logger.info(f"Acquired {self.name} lease as {self.holder_id}")
+            else:
+                logger.info(f"Lost {self.name} lease, {self.holder_id} is now a follower")
+            if self._on_change:
+                try:
+                    self._on_change(is_leader)
+                except Exception as e:
+                    logger.error(f"Error handling {self.name} lease change: {str(e)}")
+
+    def request(self, action):
+        """
+        Ask the current leader to perform an action on its next heartbeat
+
+        Returns:
+            bool: True if a live lease was there to carry the request
+        """
+        if mongo.db is None:
+            return False
+
+        try:
+            now = datetime.utcnow()
+            result = mongo.db.leases.update_one(
+                {'_id': self.name, 'expires_at': {'$gte': now}},
+                {'$set': {f"requests.{action}": now}}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"Error passing '{action}' to the {self.name} leader: {str(e)}")
+            return False
+
+    def release(self):
+        """Give up the lease so another process can take over right away"""
+        with self._lock:
+            self._valid_until = None
+
+        if not self.enabled or mongo.db is None:
+            return
+
+        try:
+            mongo.db.leases.delete_one({'_id': self.name, 'holder': self.holder_id})
+        except Exception as e:
+            logger.error(f"Error releasing {self.name} lease: {str(e)}")
+
+    def start(self, app, on_change=None, on_request=None):
+        """
+        Contend for the lease on a heartbeat thread
+
+        on_change(is_leader) is called when leadership changes and, while leading,
+        on_request(actions) with the actions followers asked for.
+        """
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self._on_change = on_change
+        self._on_request = on_request
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._heartbeat_loop, args=(app,), name=f"{self.name}-lease")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.release()
+
+    def _heartbeat_loop(self, app):
+        while not self._stop_event.is_set():
+            with app.app_context():
+                self.try_acquire()
+            if self._stop_event.wait(self.heartbeat_seconds):
+                break
+
+    def get_holder(self):
+        """The live lease document ({holder, acquired_at, renewed_at, expires_at}), or None"""
+        if not self.enabled or mongo.db is None:
+            return None
+
+        try:
+            doc = mongo.db.leases.find_one({'_id': self.name, 'expires_at': {'$gte': datetime.utcnow()}})
+        except Exception as e:
+            logger.error(f"Error reading {self.name} lease: {str(e)}")
+            return None
+
+        if doc:
+            doc.pop('_id', None)
+            doc.pop('requests', None)
+        return doc
+
+# Lease the monitor loop runs under (one leader per deployment)
+monitor_lease = LeaderLease('monitor')
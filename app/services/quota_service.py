@@ -0,0 +1,380 @@
+# app/services/quota_service.py
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from app import mongo
+
+logger = logging.getLogger(__name__)
+
+# YouTube quota days start at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+# Unit cost per YouTube Data API endpoint (read calls); anything not listed costs 1 unit
+ENDPOINT_COSTS = {
+    'search': 100
+}
+
+# Cost per channel check assumed until enough checks have been recorded today
+DEFAULT_COST_PER_CHECK = 2
+MIN_CHECKS_FOR_ESTIMATE = 20
+
+# Floor for the observed cost; RSS-probed checks are often free
+MIN_COST_PER_CHECK = 0.01
+
+def endpoint_cost(endpoint):
+    return ENDPOINT_COSTS.get(endpoint, 1)
+
+def quota_day(now=None):
+    """The quota day (Pacific date, 'YYYY-MM-DD') that a UTC time falls in"""
+    now = now or datetime.utcnow()
+    return now.replace(tzinfo=timezone.utc).astimezone(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+def next_quota_reset(now=None):
+    """The next Pacific midnight, as a naive UTC datetime like the rest of the app uses"""
+    now = now or datetime.utcnow()
+    local_now = now.replace(tzinfo=timezone.utc).astimezone(QUOTA_TIMEZONE)
+    next_midnight = datetime.combine(local_now.date() + timedelta(days=1), datetime.min.time(), tzinfo=QUOTA_TIMEZONE)
+    return next_midnight.astimezone(timezone.utc).replace(tzinfo=None)
+
+class QuotaLedger:
+    """
+    Persistent record of YouTube API units spent per quota day
+
+    One quota_usage document per Pacific day holds the total units, calls and units
+    per endpoint and per API key, and the number of channel checks. Increments are buffered in memory
+    and written with a single $inc every few seconds, so recording a call doesn't
+    cost a database round-trip and several processes can share the same ledger.
+    """
+
+    FLUSH_INTERVAL = 10  # Seconds between writes of buffered usage
+
+    def __init__(self, daily_quota=10000):
+        self.daily_quota = daily_quota
+        self._lock = threading.Lock()
+        self._pending = self._empty_pending()
+        self._last_flush = time.monotonic()
+        self._cached_doc = None
+        self._cached_at = 0
+
+    def init_app(self, app):
+        self.daily_quota = app.config.get('YOUTUBE_DAILY_QUOTA', self.daily_quota)
+
+    @staticmethod
+    def _empty_pending():
+        return {'day': quota_day(), 'units': 0, 'channel_checks': 0, 'endpoints': {}, 'keys': {}}
+
+    def record(self, endpoint, units=None, key_id=None):
+        """Record one API call to an endpoint, optionally charged to an API key (by key ID)"""
+        units = endpoint_cost(endpoint) if units is None else units
+
+        with self._lock:
+            self._roll_over_if_needed()
+            self._pending['units'] += units
+            entry = self._pending['endpoints'].setdefault(endpoint, {'calls': 0, 'units': 0})
+            entry['calls'] += 1
+            entry['units'] += units
+            if key_id:
+                key_entry = self._pending['keys'].setdefault(key_id, {'calls': 0, 'units': 0})
+                key_entry['calls'] += 1
+                key_entry['units'] += units
+            flush_due = time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL
+
+        if flush_due:
+            self.flush()
+
+    def record_channel_checks(self, count):
+        """Record how many channel checks a cycle ran, for the cost-per-check estimate"""
+        if count <= 0:
+            return
+        with self._lock:
+            self._roll_over_if_needed()
+            self._pending['channel_checks'] += count
+
+    def _roll_over_if_needed(self):
+        """Start a new bucket when the quota day changes, writing the old day's usage first (called with the lock held)"""
+        today = quota_day()
+        if self._pending['day'] != today:
+            stale = self._pending
+            self._pending = self._empty_pending()
+            self._write(stale)
+
+    def flush(self):
+        """Write buffered usage to the database"""
+        with self._lock:
+            pending = self._pending
+            self._pending = self._empty_pending()
+            self._last_flush = time.monotonic()
+
+        if self._write(pending):
+            # The cached ledger document no longer includes everything we've spent
+            self._cached_doc = None
+        else:
+            # Put the usage back so it is written with the next flush
+            with self._lock:
+                if self._pending['day'] == pending['day']:
+                    self._merge(self._pending, pending)
+
+    @staticmethod
+    def _merge(target, source):
+        target['units'] += source['units']
+        target['channel_checks'] += source['channel_checks']
+        for field in ('endpoints', 'keys'):
+            for name, usage in source[field].items():
+                entry = target[field].setdefault(name, {'calls': 0, 'units': 0})
+                entry['calls'] += usage['calls']
+                entry['units'] += usage['units']
+
+    @staticmethod
+    def _write(pending):
+        if not pending['units'] and not pending['channel_checks']:
+            return True
+
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available, cannot record quota usage")
+            return False
+
+        increments = {'units': pending['units'], 'channel_checks': pending['channel_checks']}
+        for field in ('endpoints', 'keys'):
+            for name, usage in pending[field].items():
+                increments[f"{field}.{name}.calls"] = usage['calls']
+                increments[f"{field}.{name}.units"] = usage['units']
+
+        try:
+            mongo.db.quota_usage.update_one(
+                {'_id': pending['day']},
+                {'$inc': increments, '$set': {'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error recording quota usage: {str(e)}")
+            return False
+
+    def mark_key_exhausted(self, key_id, until):
+        """Record in today's ledger document that a key is out of quota, so every process skips it"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available, key exhaustion is local to this process")
+            return False
+
+        try:
+            mongo.db.quota_usage.update_one(
+                {'_id': quota_day()},
+                {'$max': {f"keys.{key_id}.exhausted_until": until}, '$set': {'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+            self._cached_doc = None
+            return True
+        except Exception as e:
+            logger.error(f"Error recording exhausted API key: {str(e)}")
+            return False
+
+    def _load_doc(self, day, max_age):
+        """Read a day's ledger document, reusing the last read if it is at most max_age seconds old"""
+        cached = self._cached_doc
+        if max_age and cached is not None and cached['_id'] == day and time.monotonic() - self._cached_at <= max_age:
+            return cached
+
+        if mongo.db is None:
+            return None
+
+        try:
+            doc = mongo.db.quota_usage.find_one({'_id': day}) or {'_id': day}
+        except Exception as e:
+            logger.error(f"Error reading quota usage: {str(e)}")
+            return None
+
+        self._cached_doc = doc
+        self._cached_at = time.monotonic()
+        return doc
+
+    def get_usage(self, day=None, max_age=0):
+        """
+        Units spent on a quota day (today by default), including usage not yet flushed
+
+        Args:
+            max_age: accept a cached read of the ledger up to this many seconds old
+
+        Returns:
+            dict: day, units, daily_quota, remaining, channel_checks, cost_per_check,
+                  endpoints, keys and resets_at
+        """
+        day = day or quota_day()
+        usage = {'day': day, 'units': 0, 'channel_checks': 0, 'endpoints': {}, 'keys': {}}
+
+        doc = self._load_doc(day, max_age)
+        if doc:
+            usage['units'] = doc.get('units', 0)
+            usage['channel_checks'] = doc.get('channel_checks', 0)
+            usage['endpoints'] = {name: dict(entry) for name, entry in doc.get('endpoints', {}).items()}
+            # A key entry may only hold exhausted_until (see mark_key_exhausted)
+            usage['keys'] = {name: dict({'calls': 0, 'units': 0}, **entry) for name, entry in doc.get('keys', {}).items()}
+
+        with self._lock:
+            if self._pending['day'] == day:
+                self._merge(usage, self._pending)
+
+        usage['daily_quota'] = self.daily_quota
+        usage['remaining'] = max(self.daily_quota - usage['units'], 0)
+        usage['cost_per_check'] = self._cost_per_check(usage)
+        usage['resets_at'] = next_quota_reset()
+        return usage
+
+    @staticmethod
+    def _cost_per_check(usage):
+        """Observed units per channel check today, or the default until there is enough data"""
+        if usage['channel_checks'] < MIN_CHECKS_FOR_ESTIMATE:
+            return DEFAULT_COST_PER_CHECK
+        return max(usage['units'] / usage['channel_checks'], MIN_COST_PER_CHECK)
+
+    def plan_cycle(self, polling_interval, remaining=None):
+        """
+        Work out how many channels the next cycle can check
+
+        The remaining budget is spread evenly over the cycles left before the quota
+        resets, and divided by the observed cost per channel check.
+
+        Args:
+            remaining: units left today if known better than daily_quota - spent
+                       (e.g. the key pool excluding exhausted keys)
+
+        Returns:
+            dict: max_channels (channel_allowance unrounded) plus the numbers it was derived from
+        """
+        self.flush()
+        usage = self.get_usage()
+        if remaining is None:
+            remaining = usage['remaining']
+
+        seconds_to_reset = max((usage['resets_at'] - datetime.utcnow()).total_seconds(), 0)
+        cycles_left = max(int(seconds_to_reset // max(polling_interval, 1)) + 1, 1)
+        cycle_budget = remaining / cycles_left
+        max_channels = int(cycle_budget / usage['cost_per_check'])
+
+        return {
+            'max_channels': max_channels,
+            'channel_allowance': cycle_budget / usage['cost_per_check'],
+            'remaining': remaining,
+            'cycles_left': cycles_left,
+            'cycle_budget': round(cycle_budget, 1),
+            'cost_per_check': round(usage['cost_per_check'], 2)
+        }
+
+class QuotaCircuitOpen(Exception):
+    """Raised instead of calling the YouTube API while the quota circuit breaker is open"""
+
+class QuotaCircuitBreaker:
+    """
+    Stops every YouTube API call once the quota is exhausted on all keys
+
+    The breaker opens until the next quota reset and closes on its own after that.
+    Its state is stored in the circuit_breakers collection so all processes stop
+    together; each process re-reads it at most every CACHE_SECONDS.
+    """
+
+    STATE_ID = 'youtube_quota'
+    CACHE_SECONDS = 15
+
+    def __init__(self):
+        self._open_until = None
+        self._opened_at = None
+        self._reason = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def open(self, reason, until=None):
+        """Open the breaker until the given time (the next quota reset by default)"""
+        until = until or next_quota_reset()
+        now = datetime.utcnow()
+
+        with self._lock:
+            already_open = self._open_until is not None and self._open_until >= until
+            self._open_until = until
+            self._opened_at = self._opened_at if already_open else now
+            self._reason = reason
+
+        if already_open:
+            return
+
+        logger.warning(f"YouTube quota circuit breaker opened until {until.isoformat()} UTC: {reason}")
+
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available, breaker state is local to this process")
+            return
+
+        try:
+            mongo.db.circuit_breakers.update_one(
+                {'_id': self.STATE_ID},
+                {'$set': {'open_until': until, 'opened_at': now, 'reason': reason}},
+                upsert=True
+            )
+            mongo.db.system_events.insert_one({
+                'type': 'QUOTA_BREAKER_OPEN',
+                'level': 'WARNING',
+                'message': f"YouTube API calls paused until {until.isoformat()} UTC: {reason}",
+                'timestamp': now
+            })
+        except Exception as e:
+            logger.error(f"Error saving quota circuit breaker state: {str(e)}")
+
+    def close(self):
+        """Close the breaker early, e.g. after a new API key was added"""
+        with self._lock:
+            self._open_until = None
+            self._opened_at = None
+            self._reason = None
+
+        if mongo.db is None:
+            return
+
+        try:
+            mongo.db.circuit_breakers.delete_one({'_id': self.STATE_ID})
+        except Exception as e:
+            logger.error(f"Error clearing quota circuit breaker state: {str(e)}")
+
+    def _refresh(self):
+        """Pick up the breaker state written by other processes"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.CACHE_SECONDS:
+            return
+        self._checked_at = now
+
+        if mongo.db is None:
+            return
+
+        try:
+            doc = mongo.db.circuit_breakers.find_one({'_id': self.STATE_ID})
+        except Exception as e:
+            logger.error(f"Error reading quota circuit breaker state: {str(e)}")
+            return
+
+        with self._lock:
+            if doc and doc.get('open_until') and (self._open_until is None or doc['open_until'] > self._open_until):
+                self._open_until = doc['open_until']
+                self._opened_at = doc.get('opened_at')
+                self._reason = doc.get('reason')
+            elif not doc and self._open_until is not None and self._opened_at is not None:
+                # Closed by another process
+                self._open_until = None
+                self._opened_at = None
+                self._reason = None
+
+    def is_open(self):
+        self._refresh()
+        open_until = self._open_until
+        return open_until is not None and open_until > datetime.utcnow()
+
+    def get_state(self):
+        is_open = self.is_open()
+        return {
+            'state': 'open' if is_open else 'closed',
+            'open_until': self._open_until if is_open else None,
+            'opened_at': self._opened_at if is_open else None,
+            'reason': self._reason if is_open else None
+        }
+
+# Shared ledger and breaker for the process
+quota_ledger = QuotaLedger()
+quota_breaker = QuotaCircuitBreaker()
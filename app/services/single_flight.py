@@ -0,0 +1,132 @@
+# app/services/single_flight.py
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'finished_at')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one
+
+    The first caller for a key runs the function; callers arriving while it runs
+    wait for it and get the same result, and so do callers within fresh_for seconds
+    after it finished. Results are kept per process only.
+    """
+
+    # Completed results kept before stale ones are swept
+    MAX_COMPLETED = 1024
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = {'calls': 0, 'executed': 0, 'joined': 0, 'fresh': 0}
+
+    def do(self, key, function, fresh_for=0):
+        """
+        Run function() for key unless a call for key is in flight or finished within fresh_for seconds
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result came from another call
+        """
+        flight, owner = self.begin(key, fresh_for)
+        if not owner:
+            return self.wait(key, flight), True
+
+        try:
+            result = function()
+        except BaseException as e:
+            self.end(key, flight, error=e, fresh_for=fresh_for)
+            raise
+        self.end(key, flight, result, fresh_for=fresh_for)
+        return result, False
+
+    def begin(self, key, fresh_for=0):
+        """
+        Join the call for key that is in flight or finished within fresh_for seconds, or start one
+
+        For callers that can't run the call as one function (the asyncio check engine).
+        The owner must hand the flight to end() however the call turns out; other callers
+        get the result from wait().
+
+        Returns:
+            tuple: (flight, owner) where owner is True if this caller has to make the call
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            flight = self._flights.get(key)
+            if flight is not None and flight.done.is_set():
+                if fresh_for > 0 and time.monotonic() - flight.finished_at < fresh_for:
+                    self._stats['fresh'] += 1
+                    return flight, False
+                flight = None
+
+            if flight is not None:
+                self._stats['joined'] += 1
+                return flight, False
+
+            flight = _Flight()
+            self._flights[key] = flight
+            self._stats['executed'] += 1
+            return flight, True
+
+    def wait(self, key, flight):
+        """Wait for a flight joined with begin() and return its result (or raise its error)"""
+        if not flight.done.is_set():
+            logger.debug(f"Waiting for the {self.name} of {key} already in flight")
+            flight.done.wait()
+        return self._outcome(flight)
+
+    def end(self, key, flight, result=None, error=None, fresh_for=0):
+        """Record the outcome of a flight started with begin() and release its waiters"""
+        with self._lock:
+            flight.result = result
+            flight.error = error
+            flight.finished_at = time.monotonic()
+            flight.done.set()
+            if error is not None or fresh_for <= 0:
+                # Failures and uncached results are only shared with callers already waiting
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            elif len(self._flights) > self.MAX_COMPLETED:
+                self._sweep(fresh_for)
+
+    @staticmethod
+    def _outcome(flight):
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _sweep(self, fresh_for):
+        """Drop completed flights older than fresh_for (called with the lock held)"""
+        now = time.monotonic()
+        for key in [key for key, flight in self._flights.items()
+                    if flight.done.is_set() and now - flight.finished_at >= fresh_for]:
+            del self._flights[key]
+
+    def forget(self, key):
+        """Make the next call for key run again, even within the freshness window"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.done.is_set():
+                del self._flights[key]
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = sum(1 for flight in self._flights.values() if not flight.done.is_set())
+        return stats
+
+# Channel checks, keyed by channel ID (used by YouTubeService.check_channel)
+channel_checks = SingleFlight('channel check')
@@ -0,0 +1,322 @@
+# app/services/video_index.py
+
+import bisect
+import hashlib
+import heapq
+import logging
+import math
+import threading
+import time
+from array import array
+from app import mongo
+
+logger = logging.getLogger(__name__)
+
+def video_fingerprint(video_id):
+    """64-bit fingerprint of a video ID"""
+    digest = hashlib.blake2b(video_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+def merge_sorted(*sequences):
+    """Merge ascending fingerprint sequences into a new array('Q'), dropping duplicates"""
+    merged = array('Q')
+    last = None
+    for fingerprint in heapq.merge(*sequences):
+        if fingerprint != last:
+            merged.append(fingerprint)
+            last = fingerprint
+    return merged
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit fingerprints (double hashing on the two 32-bit halves)"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint):
+        h1 = fingerprint & 0xFFFFFFFF
+        h2 = (fingerprint >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, fingerprint):
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, fingerprint):
+        for position in self._positions(fingerprint):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def expected_false_positive_rate(self):
+        """Theoretical false-positive rate at the current fill level"""
+        if not self.count:
+            return 0.0
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+class KnownVideoIndex:
+    """
+    Process-local index of video IDs that are already stored in the videos collection
+
+    Lookups go through a Bloom filter first; a possible hit is confirmed against a
+    sorted table of 64-bit fingerprints (8 bytes per video), so memory stays around
+    10 bytes per video even at millions of videos. A wrong "known" answer would need
+    a 64-bit fingerprint collision.
+
+    The index is built with one projected scan of the videos collection and updated
+    on insert. New fingerprints collect in a small set that is periodically merged
+    into a new table; the merge and any Bloom filter resize run outside the lock
+    and are swapped in, so lookups never wait on work proportional to the index. Until it is built, contains() returns None and callers fall back to
+    the database. Because other processes can insert videos too, a "not known"
+    answer should still be confirmed against the database (it's the rare case).
+    """
+
+    # Fingerprints added since the last merge are kept in a set until there are this many
+    MERGE_THRESHOLD = 4096
+    # The scan in build() is sorted in chunks of this many fingerprints, then merged
+    BUILD_CHUNK = 262144
+
+    def __init__(self, capacity=1000000, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ready = False
+        self.building = False
+        self.built_at = None
+        self.build_seconds = None
+        self._bloom = None
+        self._fingerprints = array('Q')
+        self._recent = set()
+        # Fingerprints being merged into the table by _maintain() (still searched by lookups)
+        self._merging = frozenset()
+        # Fingerprints added while _maintain() builds a new Bloom filter, added to it at the swap
+        self._added_during = None
+        self._maintaining = False
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._bloom_rejects = 0
+        self._false_positives = 0
+
+    def init_app(self, app):
+        self.capacity = app.config.get('VIDEO_INDEX_CAPACITY', self.capacity)
+        self.error_rate = app.config.get('VIDEO_INDEX_ERROR_RATE', self.error_rate)
+
+    def build(self):
+        """Load all stored video IDs with one projected scan"""
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available, cannot build video index")
+            return False
+
+        with self._lock:
+            if self.building or self._maintaining:
+                return False
+            self.building = True
+            # Keeps add() from starting a merge into the table this build replaces
+            self._maintaining = True
+
+        start = time.time()
+        try:
+            # Sorted chunks keep the transient memory to one chunk of Python ints
+            chunks = []
+            chunk = []
+            cursor = mongo.db.videos.find({}, {'video_id': 1, '_id': 0}, batch_size=10000)
+            for doc in cursor:
+                video_id = doc.get('video_id')
+                if video_id:
+                    chunk.append(video_fingerprint(video_id))
+                    if len(chunk) >= self.BUILD_CHUNK:
+                        chunks.append(array('Q', sorted(chunk)))
+                        chunk = []
+            chunks.append(array('Q', sorted(chunk)))
+            del chunk
+
+            fingerprints = merge_sorted(*chunks)
+            del chunks
+            bloom = self._new_bloom(fingerprints, len(fingerprints) + len(self._recent))
+
+            with self._lock:
+                # _recent keeps anything added while the scan was running
+                for fingerprint in self._recent:
+                    bloom.add(fingerprint)
+                self._fingerprints = fingerprints
+                self._bloom = bloom
+                self.ready = True
+                self.built_at = time.time()
+                self.build_seconds = round(self.built_at - start, 3)
+
+            logger.info(f"Known-video index built with {len(self)} videos in {self.build_seconds}s "
+                        f"({self.memory_bytes() / 1048576:.1f} MB)")
+            return True
+        except Exception as e:
+            logger.error(f"Error building known-video index: {str(e)}")
+            return False
+        finally:
+            with self._lock:
+                self.building = False
+                self._maintaining = False
+
+    def build_in_background(self, app):
+        """Build the index on a daemon thread so startup isn't blocked"""
+        def _build():
+            with app.app_context():
+                self.build()
+
+        thread = threading.Thread(target=_build, name='video-index-build')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _new_bloom(self, fingerprints, total):
+        """A Bloom filter sized for total entries, filled with fingerprints"""
+        bloom = BloomFilter(max(self.capacity, total * 2), self.error_rate)
+        for fingerprint in fingerprints:
+            bloom.add(fingerprint)
+        return bloom
+
+    def add(self, video_id):
+        """Record a video ID as stored"""
+        if not video_id:
+            return
+
+        fingerprint = video_fingerprint(video_id)
+        with self._lock:
+            if self._has_fingerprint(fingerprint):
+                return
+            self._recent.add(fingerprint)
+            if self._bloom is not None:
+                self._bloom.add(fingerprint)
+            if self._added_during is not None:
+                self._added_during.append(fingerprint)
+
+            bloom_full = self._bloom is not None and self._bloom.count > self._bloom.capacity
+            maintain = (self.ready and not self._maintaining
+                        and (len(self._recent) >= self.MERGE_THRESHOLD or bloom_full))
+            if maintain:
+                # Hand the recent set to the merge; new adds start a fresh one
+                self._maintaining = True
+                self._merging = frozenset(self._recent)
+                self._recent = set()
+                if bloom_full:
+                    self._added_during = []
+                table, merging = self._fingerprints, self._merging
+
+        if maintain:
+            self._maintain(table, merging, bloom_full)
+
+    def _maintain(self, table, merging, rebuild_bloom):
+        """
+        Merge fingerprints into a new sorted table (and resize the Bloom filter) without the lock
+
+        table is never modified in place (it is only replaced), so it can be read while
+        other threads look up and add. Only the final swap takes the lock.
+        """
+        try:
+            merged = merge_sorted(table, sorted(merging))
+            bloom = None
+            if rebuild_bloom:
+                bloom = self._new_bloom(merged, len(merged) + len(self._recent))
+
+            with self._lock:
+                if bloom is not None:
+                    # Fingerprints added during the rebuild are in _recent, not in merged
+                    for fingerprint in self._added_during:
+                        bloom.add(fingerprint)
+                    self._bloom = bloom
+                self._fingerprints = merged
+                self._merging = frozenset()
+        except Exception as e:
+            logger.error(f"Error merging the known-video index: {str(e)}")
+            with self._lock:
+                # Keep the fingerprints searchable; the next merge picks them up
+                self._recent.update(self._merging)
+                self._merging = frozenset()
+        finally:
+            with self._lock:
+                self._added_during = None
+                self._maintaining = False
+
+    def add_many(self, video_ids):
+        for video_id in video_ids:
+            self.add(video_id)
+
+    def _has_fingerprint(self, fingerprint):
+        if fingerprint in self._recent or fingerprint in self._merging:
+            return True
+        position = bisect.bisect_left(self._fingerprints, fingerprint)
+        return position < len(self._fingerprints) and self._fingerprints[position] == fingerprint
+
+    def contains(self, video_id):
+        """
+        Returns:
+            True if the video is known, False if it isn't, None if the index isn't built yet
+        """
+        if not self.ready:
+            return None
+
+        fingerprint = video_fingerprint(video_id)
+        with self._lock:
+            self._lookups += 1
+            if fingerprint not in self._bloom:
+                self._bloom_rejects += 1
+                return False
+
+            if self._has_fingerprint(fingerprint):
+                return True
+
+            # The Bloom filter said "maybe" but the fingerprint table says no
+            self._false_positives += 1
+            return False
+
+    def is_known(self, video_id):
+        """
+        Check whether a video is stored, touching the database only when the index can't answer
+
+        Known videos are answered from memory. Misses (and every lookup before the index
+        is built) are confirmed with one query, since another process may have stored it.
+        """
+        if self.contains(video_id):
+            return True
+
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return False
+
+        exists = mongo.db.videos.count_documents({'video_id': video_id}, limit=1) > 0
+        if exists:
+            self.add(video_id)
+        return exists
+
+    def __len__(self):
+        return len(self._fingerprints) + len(self._recent) + len(self._merging)
+
+    def memory_bytes(self):
+        """Approximate memory used by the index"""
+        bloom_bytes = len(self._bloom.bits) if self._bloom is not None else 0
+        # A set entry costs roughly 60 bytes (int object plus hash slot)
+        recent = len(self._recent) + len(self._merging)
+        return bloom_bytes + self._fingerprints.itemsize * len(self._fingerprints) + 60 * recent
+
+    def get_stats(self):
+        with self._lock:
+            negatives = self._bloom_rejects + self._false_positives
+            return {
+                'ready': self.ready,
+                'videos': len(self),
+                'memory_bytes': self.memory_bytes(),
+                'bloom_bits': self._bloom.num_bits if self._bloom is not None else 0,
+                'bloom_hashes': self._bloom.num_hashes if self._bloom is not None else 0,
+                'expected_false_positive_rate': float(f"{self._bloom.expected_false_positive_rate():.3g}") if self._bloom is not None else None,
+                'observed_false_positive_rate': float(f"{self._false_positives / negatives:.3g}") if negatives else 0.0,
+                'lookups': self._lookups,
+                'build_seconds': self.build_seconds
+            }
+
+# Shared index for the process
+known_videos = KnownVideoIndex()
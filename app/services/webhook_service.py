@@ -1,24 +1,197 @@
 # app/services/webhook_service.py
 
 import requests
+import hashlib
 import json
 import logging
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from app import mongo
+from app.services.http_client import webhook_http
 from flask import current_app
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
 import time
 from bson.objectid import ObjectId
 import traceback
 
 logger = logging.getLogger(__name__)
 
+# Optional fields added to videos by YouTubeService.enrich_videos
+ENRICHMENT_FIELDS = ('duration', 'view_count', 'like_count', 'comment_count')
+
+# Fields every payload carries, with the placeholders used when a video lacks them
+REQUIRED_FIELDS = ('video_id', 'channel_id', 'title', 'description', 'published_at', 'thumbnail_url')
+MISSING_THUMBNAIL_URL = 'https://via.placeholder.com/480x360.png?text=Missing+Thumbnail'
+
+# Stored payload bodies are removed this long after they were last sent (expires_at TTL index)
+PAYLOAD_RETENTION = timedelta(days=30)
+
+class NotificationPayload:
+    """
+    A notification body serialized once and shared by every webhook it is sent to
+
+    body is the canonical JSON as immutable bytes. render() only splices in the fields
+    that differ per send (notification_time, notification_count) instead of copying
+    the video and serializing it again for every webhook. payload_id (a hash of body)
+    is what delivery logs store in place of the request body.
+    """
+
+    __slots__ = ('video_id', 'title', 'thumbnail_url', 'is_manual', 'is_test', 'body', 'payload_id', 'stored')
+
+    def __init__(self, video_data, is_test=False):
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in video_data]
+        if missing_fields:
+            logger.warning(f"Missing required fields in video_data: {missing_fields}")
+
+        def field(name):
+            if name in video_data:
+                return video_data[name]
+            # Placeholder values for missing fields to prevent errors
+            if name == 'published_at':
+                return datetime.utcnow()
+            if name == 'thumbnail_url':
+                return MISSING_THUMBNAIL_URL
+            return f"MISSING_{name}"
+
+        self.video_id = field('video_id')
+        self.title = field('title')
+        self.thumbnail_url = field('thumbnail_url')
+        self.is_manual = video_data.get('is_manual_notification', False)
+        self.is_test = is_test
+
+        payload = {
+            'video_id': self.video_id,
+            'channel_id': field('channel_id'),
+            'title': self.title,
+            'description': field('description'),
+            'published_at': field('published_at').isoformat() + 'Z',
+            'thumbnail_url': self.thumbnail_url,
+            'video_url': f"https://www.youtube.com/watch?v={self.video_id}",
+            'is_manual_notification': self.is_manual
+        }
+
+        # Add duration and statistics if the video has been enriched
+        for name in ENRICHMENT_FIELDS:
+            if video_data.get(name) is not None:
+                payload[name] = video_data[name]
+
+        # Add test flag for test notifications
+        if is_test:
+            payload['is_test'] = True
+
+        self.body = json.dumps(payload, default=str).encode('utf-8')
+        self.payload_id = hashlib.sha1(self.body).hexdigest()
+        self.stored = False
+
+    def render(self, notification_count=None):
+        """The request body: the shared bytes with this send's notification_time (and count) appended"""
+        extra = f', "notification_time": "{datetime.utcnow().isoformat()}Z"'
+        if notification_count is not None:
+            extra += f', "notification_count": {json.dumps(notification_count, default=str)}'
+        # One copy of the shared bytes (a memoryview slice doesn't copy)
+        return b''.join((memoryview(self.body)[:-1], extra.encode('utf-8'), b'}'))
+
+class PayloadCache:
+    """Recently built payloads by (video_id, is_manual), so outbox jobs for one video share one body"""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._payloads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, video_data):
+        key = (video_data.get('video_id'), video_data.get('is_manual_notification', False))
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None:
+                self._payloads.move_to_end(key)
+                return payload
+
+        payload = NotificationPayload(video_data)
+        with self._lock:
+            self._payloads[key] = payload
+            while len(self._payloads) > self.max_size:
+                self._payloads.popitem(last=False)
+        return payload
+
+notification_payloads = PayloadCache()
+
 class WebhookService:
     @staticmethod
-    def send_notification(webhook, video_data, is_test=False):
+    def send_notification(webhook, video_data, is_test=False, payload=None):
         """
         Send a notification to a webhook endpoint
+        
+        payload is the video's NotificationPayload when it is sent to several webhooks;
+        it is built from video_data otherwise. The result includes latency_ms, the time
+        spent on the request (also stored in the delivery log and as the webhook's
+        last_latency_ms).
         """
+        try:
+            # Serialized once per video; only the per-send fields are added here
+            if payload is None:
+                payload = NotificationPayload(video_data, is_test=is_test)
+            body = payload.render(video_data.get('notification_count'))
+        except Exception as e:
+            logger.error(f"Unexpected error sending webhook notification: {str(e)}")
+            logger.error(traceback.format_exc())
+            log_fields = {
+                'video_id': video_data.get('video_id'),
+                'video_title': video_data.get('title', 'Unknown'),
+                'video_thumbnail': video_data.get('thumbnail_url', 'Unknown'),
+                'is_manual_notification': video_data.get('is_manual_notification', False)
+            }
+            return WebhookService._handle_webhook_error(webhook, log_fields, is_test, e, "Unexpected error")
+        
+        log_fields = {
+            'video_id': payload.video_id,
+            'video_title': payload.title,
+            'video_thumbnail': payload.thumbnail_url,
+            'is_manual_notification': payload.is_manual,
+            # The body is stored once per payload in webhook_payloads (see _store_payload)
+            'payload_id': WebhookService._store_payload(payload)
+        }
+        return WebhookService._post(webhook, body, log_fields, is_test)
+    
+    @staticmethod
+    def send_digest(webhook, videos, batch_id=None):
+        """
+        Send several videos to a webhook in one request (digest mode)
+        
+        The body is {"is_digest": true, "video_count": n, "notification_time": ..., "videos": [...]}
+        where each entry is the video's regular notification payload, reused from
+        notification_payloads. One delivery log covers the whole batch.
+        """
+        try:
+            payloads = [notification_payloads.get(video) for video in videos]
+            header = (f'{{"is_digest": true, "video_count": {len(payloads)}, '
+                      f'"notification_time": "{datetime.utcnow().isoformat()}Z", "videos": [')
+            body = b''.join((header.encode('utf-8'), b', '.join(payload.body for payload in payloads), b']}'))
+        except Exception as e:
+            logger.error(f"Unexpected error building webhook digest: {str(e)}")
+            logger.error(traceback.format_exc())
+            log_fields = {'video_ids': [video.get('video_id') for video in videos], 'batch_id': batch_id,
+                          'video_title': f"Digest of {len(videos)} videos"}
+            return WebhookService._handle_webhook_error(webhook, log_fields, False, e, "Unexpected error")
+        
+        log_fields = {
+            'video_id': payloads[0].video_id if payloads else None,
+            'video_ids': [payload.video_id for payload in payloads],
+            'batch_id': batch_id,
+            'batch_size': len(payloads),
+            'video_title': f"Digest of {len(payloads)} videos",
+            'video_thumbnail': payloads[0].thumbnail_url if payloads else None,
+            'is_manual_notification': any(payload.is_manual for payload in payloads),
+            'payload_ids': [WebhookService._store_payload(payload) for payload in payloads]
+        }
+        logger.info(f"Sending a digest of {len(payloads)} videos to {webhook.get('url')}")
+        return WebhookService._post(webhook, body, log_fields)
+    
+    @staticmethod
+    def _post(webhook, body, log_fields, is_test=False):
+        """POST a serialized body to a webhook and log the delivery (log_fields describe what was sent)"""
+        started = time.perf_counter()
         try:
             # Debug log at start
             logger.info(f"Starting webhook notification to {webhook.get('url')} (Test: {is_test})")
@@ -44,64 +217,26 @@ class WebhookService:
             # Add custom headers if defined
             if webhook.get('headers'):
                 headers.update(webhook['headers'])
-            
-            # Extract manual notification flag if present
-            is_manual = video_data.get('is_manual_notification', False)
-            
-            # Debug log video data
-            logger.debug(f"Video data keys: {video_data.keys()}")
-            
-            # Check for required fields
-            required_fields = ['video_id', 'channel_id', 'title', 'description', 'published_at', 'thumbnail_url']
-            missing_fields = [field for field in required_fields if field not in video_data]
-            
-            if missing_fields:
-                logger.warning(f"Missing required fields in video_data: {missing_fields}")
-                # Add placeholder values for missing fields to prevent errors
-                for field in missing_fields:
-                    if field == 'published_at':
-                        video_data[field] = datetime.utcnow()
-                    elif field == 'thumbnail_url':
-                        video_data[field] = 'https://via.placeholder.com/480x360.png?text=Missing+Thumbnail'
-                    else:
-                        video_data[field] = f"MISSING_{field}"
-            
-            # Prepare payload
-            payload = {
-                'video_id': video_data['video_id'],
-                'channel_id': video_data['channel_id'],
-                'title': video_data['title'],
-                'description': video_data['description'],
-                'published_at': video_data['published_at'].isoformat() + 'Z',
-                'thumbnail_url': video_data['thumbnail_url'],
-                'video_url': f"https://www.youtube.com/watch?v={video_data['video_id']}",
-                'notification_time': datetime.utcnow().isoformat() + 'Z',
-                'is_manual_notification': is_manual
-            }
-            
-            # Add notification count if available
-            if 'notification_count' in video_data:
-                payload['notification_count'] = video_data['notification_count']
-            
-            # Add test flag for test notifications
-            if is_test:
-                payload['is_test'] = True
                 
             # Debug log request details
             logger.info(f"Preparing webhook request to {webhook_url}")
             logger.debug(f"Headers: {headers}")
-            logger.debug(f"Payload: {json.dumps(payload, default=str)[:500]}")  # Truncate if too large
+            logger.debug(f"Payload: {body[:500]}")  # Truncate if too large
             
             # Send the request
-            response = requests.post(
-                webhook_url, 
+            started = time.perf_counter()
+            # Connections to the same receiver are kept alive and reused
+            response = webhook_http.post(
+                webhook_url,
+                webhook_id=webhook.get('_id'),
                 headers=headers, 
-                data=json.dumps(payload, default=str),
+                data=body,
                 timeout=10
             )
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
             
             # Debug log response
-            logger.info(f"Webhook response: {response.status_code} {response.reason}")
+            logger.info(f"Webhook response: {response.status_code} {response.reason} ({latency_ms} ms)")
             
             if response.text:
                 logger.debug(f"Response body: {response.text[:500]}") # Truncate if too large
@@ -109,19 +244,16 @@ class WebhookService:
             # Log the delivery attempt
             delivery_log = {
                 'webhook_id': webhook['_id'],
-                'video_id': video_data['video_id'],
                 'timestamp': datetime.utcnow(),
                 'success': response.status_code >= 200 and response.status_code < 300,
                 'response_code': response.status_code,
                 'response_message': response.reason,
-                'video_title': video_data['title'],
-                'video_thumbnail': video_data['thumbnail_url'],
                 'is_test_notification': is_test,
-                'is_manual_notification': is_manual,
                 'request_headers': json.dumps(headers),
-                'request_body': json.dumps(payload, default=str)[:1000],
-                'response_body': response.text[:1000] if response.text else None
+                'response_body': response.text[:1000] if response.text else None,
+                'latency_ms': latency_ms
             }
+            delivery_log.update(log_fields)
             
             try:
                 mongo.db.webhook_deliveries.insert_one(delivery_log)
@@ -133,7 +265,7 @@ class WebhookService:
             try:
                 mongo.db.webhooks.update_one(
                     {'_id': webhook['_id']},
-                    {'$set': {'last_delivery': datetime.utcnow()}}
+                    {'$set': {'last_delivery': datetime.utcnow(), 'last_latency_ms': latency_ms}}
                 )
                 logger.debug("Updated webhook's last_delivery timestamp")
             except Exception as update_error:
@@ -142,40 +274,70 @@ class WebhookService:
             return {
                 'success': response.status_code >= 200 and response.status_code < 300,
                 'status_code': response.status_code,
-                'message': response.reason
+                'message': response.reason,
+                'latency_ms': latency_ms
             }
         except requests.exceptions.ConnectionError as ce:
             logger.error(f"Connection error sending webhook notification: {str(ce)}")
-            return WebhookService._handle_webhook_error(webhook, video_data, is_test, ce, "Connection error")
+            return WebhookService._handle_webhook_error(webhook, log_fields, is_test, ce, "Connection error", started)
         except requests.exceptions.Timeout as te:
             logger.error(f"Timeout error sending webhook notification: {str(te)}")
-            return WebhookService._handle_webhook_error(webhook, video_data, is_test, te, "Timeout error")
+            return WebhookService._handle_webhook_error(webhook, log_fields, is_test, te, "Timeout error", started)
         except requests.exceptions.RequestException as re:
             logger.error(f"Request error sending webhook notification: {str(re)}")
-            return WebhookService._handle_webhook_error(webhook, video_data, is_test, re, "Request error")
+            return WebhookService._handle_webhook_error(webhook, log_fields, is_test, re, "Request error", started)
         except Exception as e:
             logger.error(f"Unexpected error sending webhook notification: {str(e)}")
             logger.error(traceback.format_exc())
-            return WebhookService._handle_webhook_error(webhook, video_data, is_test, e, "Unexpected error")
+            return WebhookService._handle_webhook_error(webhook, log_fields, is_test, e, "Unexpected error", started)
+    
+    @staticmethod
+    def _store_payload(payload):
+        """
+        Store the payload body once (keyed by payload_id) for the delivery logs that reference it
+        
+        Every payload object that is sent pushes expires_at back, so a body is kept for
+        PAYLOAD_RETENTION after its last use.
+        """
+        if not payload.stored:
+            now = datetime.utcnow()
+            try:
+                mongo.db.webhook_payloads.update_one(
+                    {'_id': payload.payload_id},
+                    {
+                        '$setOnInsert': {
+                            'body': payload.body.decode('utf-8'),
+                            'video_id': payload.video_id,
+                            'created_at': now
+                        },
+                        '$set': {'last_used_at': now, 'expires_at': now + PAYLOAD_RETENTION}
+                    },
+                    upsert=True
+                )
+                payload.stored = True
+            except Exception as e:
+                logger.error(f"Error storing webhook payload: {str(e)}")
+        return payload.payload_id
     
     @staticmethod
-    def _handle_webhook_error(webhook, video_data, is_test, exception, error_type):
+    def _handle_webhook_error(webhook, log_fields, is_test, exception, error_type, started=None):
         """Helper method to handle webhook errors consistently"""
+        latency_ms = round((time.perf_counter() - started) * 1000, 1) if started is not None else None
         try:
             # Log the failed delivery attempt
             delivery_log = {
                 'webhook_id': webhook['_id'],
-                'video_id': video_data['video_id'],
                 'timestamp': datetime.utcnow(),
                 'success': False,
                 'response_code': 0,
                 'response_message': f"{error_type}: {str(exception)}",
-                'video_title': video_data.get('title', 'Unknown'),
-                'video_thumbnail': video_data.get('thumbnail_url', 'Unknown'),
+                'video_title': 'Unknown',
+                'video_thumbnail': 'Unknown',
                 'is_test_notification': is_test,
-                'is_manual_notification': video_data.get('is_manual_notification', False),
-                'error_details': traceback.format_exc()
+                'error_details': traceback.format_exc(),
+                'latency_ms': latency_ms
             }
+            delivery_log.update(log_fields)
             
             mongo.db.webhook_deliveries.insert_one(delivery_log)
         except Exception as log_error:
@@ -184,7 +346,8 @@ class WebhookService:
         return {
             'success': False,
             'status_code': 0,
-            'message': f"{error_type}: {str(exception)}"
+            'message': f"{error_type}: {str(exception)}",
+            'latency_ms': latency_ms
         }
     
     @staticmethod
@@ -192,9 +355,16 @@ class WebhookService:
         """
         Send notifications to all active webhooks
         
+        Webhooks are notified in parallel on a bounded thread pool (WEBHOOK_CONCURRENCY
+        workers, 1 = one after another), so a slow receiver only delays itself.
+        
         Args:
             video_data: Dictionary containing video information
             is_manual: Boolean flag indicating if this is a manual notification
+        
+        Returns:
+            dict: webhook_count, success_count, errors, all_succeeded and deliveries
+                  (url, success and latency_ms of each webhook, in webhook order)
         """
         try:
             # Get all active webhooks
@@ -211,38 +381,32 @@ class WebhookService:
                     'message': 'No active webhooks found'
                 }
             
-            success_count = 0
-            errors = []
+            # Add manual flag to video data
+            video_data_with_flags = dict(video_data)
+            video_data_with_flags['is_manual_notification'] = is_manual
+            
+            if 'notification_count' in video_data:
+                video_data_with_flags['previous_notification_count'] = video_data['notification_count']
+            
+            # One body for every webhook
+            payload = NotificationPayload(video_data_with_flags)
+            
+            concurrency = max(int(current_app.config.get('WEBHOOK_CONCURRENCY', 8) or 1), 1)
+            concurrency = min(concurrency, webhook_count)
+            app = current_app._get_current_object()
+            
+            def deliver(webhook):
+                return WebhookService._deliver(app, webhook, video_data_with_flags, payload)
             
-            # Process each webhook directly (no threading) for better reliability and error reporting
-            for webhook in active_webhooks:
-                try:
-                    # Log webhook details
-                    logger.info(f"Sending notification to webhook: {webhook.get('url')}")
-                    
-                    # Add manual flag to video data
-                    video_data_with_flags = dict(video_data)
-                    video_data_with_flags['is_manual_notification'] = is_manual
-                    
-                    if 'notification_count' in video_data:
-                        video_data_with_flags['previous_notification_count'] = video_data['notification_count']
-                    
-                    # Send notification directly rather than in a thread
-                    result = WebhookService.send_notification(webhook, video_data_with_flags)
-                    
-                    if result['success']:
-                        logger.info(f"Successfully sent notification to {webhook.get('url')}")
-                        success_count += 1
-                    else:
-                        error_msg = f"Failed to send notification to {webhook.get('url')}: {result.get('message')}"
-                        logger.error(error_msg)
-                        errors.append(error_msg)
-                        
-                except Exception as webhook_error:
-                    error_msg = f"Error sending to webhook {webhook.get('url')}: {str(webhook_error)}"
-                    logger.error(error_msg)
-                    logger.error(traceback.format_exc())
-                    errors.append(error_msg)
+            if concurrency == 1:
+                results = [deliver(webhook) for webhook in active_webhooks]
+            else:
+                with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='webhook') as executor:
+                    # map keeps the webhook order, so errors are reported as they were sequentially
+                    results = list(executor.map(deliver, active_webhooks))
+            
+            success_count = sum(1 for result in results if result['success'])
+            errors = [result['error'] for result in results if result.get('error')]
             
             # Log the results
             logger.info(f"Notification complete. Success: {success_count}/{webhook_count}")
@@ -252,7 +416,11 @@ class WebhookService:
                 'webhook_count': webhook_count,
                 'success_count': success_count,
                 'errors': errors,
-                'all_succeeded': success_count == webhook_count
+                'all_succeeded': success_count == webhook_count,
+                'deliveries': [
+                    {'url': result['url'], 'success': result['success'], 'latency_ms': result['latency_ms']}
+                    for result in results
+                ]
             }
         except Exception as e:
             logger.error(f"Error in notify_all_webhooks: {str(e)}")
@@ -265,34 +433,30 @@ class WebhookService:
             }
     
     @staticmethod
-    def _send_with_retry(webhook, video_data):
-        """
-        Send a webhook notification with retry logic
-        """
-        max_retries = current_app.config.get('MAX_RETRIES', 3)
-        retry_delay = current_app.config.get('RETRY_DELAY', 300)  # seconds
+    def _deliver(app, webhook, video_data, payload=None):
+        """Send one webhook notification (on a fan-out worker) and describe the outcome"""
+        url = webhook.get('url')
+        started = time.perf_counter()
         
-        logger.info(f"Starting webhook delivery with retry (max_retries={max_retries}, delay={retry_delay}s)")
+        try:
+            with app.app_context():
+                logger.info(f"Sending notification to webhook: {url}")
+                result = WebhookService.send_notification(webhook, video_data, payload=payload)
+        except Exception as webhook_error:
+            error_msg = f"Error sending to webhook {url}: {str(webhook_error)}"
+            logger.error(error_msg)
+            logger.error(traceback.format_exc())
+            return {'url': url, 'success': False, 'error': error_msg,
+                    'latency_ms': round((time.perf_counter() - started) * 1000, 1)}
         
-        for attempt in range(max_retries + 1):
-            logger.info(f"Webhook delivery attempt {attempt+1}/{max_retries+1} to {webhook.get('url')}")
-            
-            result = WebhookService.send_notification(webhook, video_data)
-            
-            if result['success']:
-                logger.info(f"Webhook notification sent successfully to {webhook['url']}")
-                return
-            
-            logger.warning(f"Webhook delivery failed (attempt {attempt+1}/{max_retries+1}): {result['message']}")
-            
-            # If we've reached max retries, give up
-            if attempt >= max_retries:
-                logger.error(f"Max retries reached for webhook {webhook['_id']}, giving up")
-                return
-            
-            # Wait before retrying
-            logger.info(f"Waiting {retry_delay} seconds before retry...")
-            time.sleep(retry_delay)
+        latency_ms = result.get('latency_ms')
+        if result['success']:
+            logger.info(f"Successfully sent notification to {url} ({latency_ms} ms)")
+            return {'url': url, 'success': True, 'error': None, 'latency_ms': latency_ms}
+        
+        error_msg = f"Failed to send notification to {url}: {result.get('message')}"
+        logger.error(error_msg)
+        return {'url': url, 'success': False, 'error': error_msg, 'latency_ms': latency_ms}
     
     @staticmethod
     def send_test_notification(webhook_id, custom_message=None):
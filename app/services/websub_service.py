@@ -0,0 +1,419 @@
+# app/services/websub_service.py
+
+import hashlib
+import hmac
+import io
+import logging
+import os
+import secrets
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import requests
+from flask import current_app
+from app import mongo
+from app.models.channel import Channel
+from app.models.video import Video
+from app.services.feed_service import parse_feed
+from app.services.http_client import websub_http
+from app.services.youtube_service import YouTubeService
+
+logger = logging.getLogger(__name__)
+
+# Topic YouTube publishes upload notifications under, one per channel
+WEBSUB_TOPIC_URL = os.environ.get('WEBSUB_TOPIC_URL', 'https://www.youtube.com/xml/feeds/videos.xml')
+
+# Pushes also arrive when an old video's title or description changes; videos
+# published longer ago than this are not announced as new
+PUSH_MAX_VIDEO_AGE = timedelta(days=2)
+
+# How long to wait for the hub to verify a subscription before asking again
+PENDING_RETRY_SECONDS = 3600
+
+SIGNATURE_ALGORITHMS = {
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+    'sha384': hashlib.sha384,
+    'sha512': hashlib.sha512
+}
+
+class PushProcessor:
+    """
+    Bounded pool that processes WebSub pushes after the hub has been answered
+
+    At most WEBSUB_PUSH_WORKERS pushes run at once and at most WEBSUB_PUSH_QUEUE wait;
+    beyond that a push is refused so the hub delivers it again later.
+    """
+
+    def __init__(self):
+        self.workers = int(os.environ.get('WEBSUB_PUSH_WORKERS', 4))
+        self.queue_limit = int(os.environ.get('WEBSUB_PUSH_QUEUE', 100))
+        self._executor = None
+        self._pending = 0
+        self._refused = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        with self._lock:
+            self.workers = max(int(app.config.get('WEBSUB_PUSH_WORKERS', self.workers)), 1)
+            self.queue_limit = max(int(app.config.get('WEBSUB_PUSH_QUEUE', self.queue_limit)), 1)
+
+    def submit(self, function, *args):
+        """
+        Run function(*args) on the pool
+
+        Returns:
+            bool: False if too many pushes are already waiting
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self._refused += 1
+                return False
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='websub-push')
+            executor = self._executor
+
+        future = executor.submit(function, *args)
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def get_stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'pending': self._pending, 'refused': self._refused}
+
+# Shared pool for incoming pushes
+websub_pushes = PushProcessor()
+
+class WebSubService:
+    """
+    WebSub (PubSubHubbub) push notifications for channel uploads
+
+    Every active channel is subscribed at the hub with its own callback URL
+    (WEBSUB_CALLBACK_URL/<channel_id>) and its own random secret, stored on the
+    channel. The hub verifies the subscription with a GET challenge and then POSTs
+    an Atom entry signed with that secret whenever the channel uploads; unsigned
+    or badly signed pushes are ignored. Subscription state is kept on the channel
+    document under 'websub' and renewed before the lease runs out.
+    """
+
+    @staticmethod
+    def enabled():
+        config = current_app.config
+        return bool(config.get('WEBSUB_ENABLED') and config.get('WEBSUB_CALLBACK_URL'))
+
+    @staticmethod
+    def topic_url(channel_id):
+        return f"{WEBSUB_TOPIC_URL}?channel_id={quote(channel_id)}"
+
+    @staticmethod
+    def callback_url(channel_id):
+        return f"{current_app.config['WEBSUB_CALLBACK_URL'].rstrip('/')}/{quote(channel_id)}"
+
+    @staticmethod
+    def subscribe(channel_id, mode='subscribe'):
+        """
+        Ask the hub to (un)subscribe a channel's callback
+
+        The hub answers 202 and verifies the request asynchronously by calling the
+        callback; the channel only counts as subscribed once that has happened.
+
+        Returns:
+            bool: True if the hub accepted the request
+        """
+        config = current_app.config
+        channel = Channel.get_by_id(channel_id) if mode == 'subscribe' else None
+        data = {
+            'hub.callback': WebSubService.callback_url(channel_id),
+            'hub.topic': WebSubService.topic_url(channel_id),
+            'hub.mode': mode,
+            'hub.verify': 'async'
+        }
+        if mode == 'subscribe':
+            data['hub.lease_seconds'] = str(config.get('WEBSUB_LEASE_SECONDS', 432000))
+            # Renewals keep the channel's secret; it becomes current once the hub verifies
+            websub = (channel or {}).get('websub') or {}
+            secret = websub.get('secret') or websub.get('pending_secret') or secrets.token_hex(32)
+            data['hub.secret'] = secret
+            # Recorded before sending: the hub may call back before it has answered us
+            Channel.update_websub(channel_id, {'requested_at': datetime.utcnow(), 'error': None, 'pending_secret': secret})
+
+        try:
+            response = websub_http.post(config.get('WEBSUB_HUB_URL'), data=data)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"WebSub {mode} request for channel {channel_id} failed: {str(e)}")
+            Channel.update_websub(channel_id, {'error': str(e)})
+            return False
+
+        if response.status_code not in (202, 204):
+            logger.error(f"WebSub hub rejected {mode} for channel {channel_id}: "
+                         f"{response.status_code} {response.text[:200]}")
+            Channel.update_websub(channel_id, {'error': f"{response.status_code}: {response.text[:200]}"})
+            return False
+
+        logger.info(f"WebSub {mode} requested for channel {channel_id}")
+        return True
+
+    @staticmethod
+    def unsubscribe(channel_id):
+        return WebSubService.subscribe(channel_id, mode='unsubscribe')
+
+    @staticmethod
+    def is_healthy(channel, now=None):
+        """True if the channel has a verified subscription whose lease hasn't run out"""
+        now = now or datetime.utcnow()
+        websub = channel.get('websub') or {}
+        lease_expires = websub.get('lease_expires')
+        return websub.get('state') == 'subscribed' and lease_expires is not None and lease_expires > now
+
+    @staticmethod
+    def _state(channel):
+        """'subscribed', 'pending' (requested, not verified yet), 'denied', 'unsubscribed' or 'none'"""
+        websub = channel.get('websub') or {}
+        state = websub.get('state')
+        if state in ('subscribed', 'denied'):
+            return state
+        return 'pending' if websub.get('requested_at') else (state or 'none')
+
+    @staticmethod
+    def _needs_subscribe(channel, now):
+        """No subscription yet, lease about to expire, or a request the hub never verified"""
+        websub = channel.get('websub') or {}
+        requested_at = websub.get('requested_at')
+        recently_requested = requested_at is not None and requested_at + timedelta(seconds=PENDING_RETRY_SECONDS) > now
+
+        if websub.get('state') == 'subscribed':
+            renew_before = current_app.config.get('WEBSUB_RENEW_BEFORE', 86400)
+            lease_expires = websub.get('lease_expires')
+            expiring = lease_expires is None or lease_expires - timedelta(seconds=renew_before) <= now
+            return expiring and not recently_requested
+
+        return not recently_requested
+
+    @staticmethod
+    def renew_subscriptions(channels):
+        """
+        Subscribe the given (active) channels that have no live subscription and renew
+        the ones whose lease expires within WEBSUB_RENEW_BEFORE seconds
+
+        Returns:
+            int: number of subscribe requests the hub accepted
+        """
+        now = datetime.utcnow()
+        due = [channel for channel in channels if WebSubService._needs_subscribe(channel, now)]
+        if not due:
+            return 0
+
+        logger.info(f"Requesting WebSub subscriptions for {len(due)} channels")
+        return sum(1 for channel in due if WebSubService.subscribe(channel['channel_id']))
+
+    @staticmethod
+    def verify_intent(channel_id, args):
+        """
+        Answer the hub's verification request for a channel's callback
+
+        Returns:
+            str: the challenge to echo back, or None to refuse (answered with 404)
+        """
+        mode = args.get('hub.mode')
+        topic = args.get('hub.topic')
+
+        if topic != WebSubService.topic_url(channel_id):
+            logger.warning(f"WebSub verification for channel {channel_id} with unexpected topic {topic}")
+            return None
+
+        channel = Channel.get_by_id(channel_id)
+
+        if mode == 'denied':
+            logger.warning(f"WebSub subscription for channel {channel_id} denied by the hub: {args.get('hub.reason')}")
+            if channel:
+                Channel.update_websub(channel_id, {'state': 'denied', 'error': args.get('hub.reason')})
+            return args.get('hub.challenge', '')
+
+        challenge = args.get('hub.challenge')
+        if not challenge:
+            return None
+
+        if mode == 'subscribe':
+            if not channel or not channel.get('active', True):
+                logger.warning(f"Refusing WebSub subscription for unknown or paused channel {channel_id}")
+                return None
+
+            try:
+                lease_seconds = int(args.get('hub.lease_seconds'))
+            except (TypeError, ValueError):
+                lease_seconds = current_app.config.get('WEBSUB_LEASE_SECONDS', 432000)
+
+            now = datetime.utcnow()
+            websub = channel.get('websub') or {}
+            Channel.update_websub(channel_id, {
+                'state': 'subscribed',
+                'verified_at': now,
+                'lease_expires': now + timedelta(seconds=lease_seconds),
+                'requested_at': None,
+                'error': None,
+                # The hub signs with the secret of the subscription it just verified
+                'secret': websub.get('pending_secret') or websub.get('secret'),
+                'pending_secret': None
+            })
+            logger.info(f"WebSub subscription verified for channel {channel_id}, lease {lease_seconds}s")
+            return challenge
+
+        if mode == 'unsubscribe':
+            # Only confirm unsubscribing channels we no longer want pushes for
+            if channel and channel.get('active', True):
+                return None
+            if channel:
+                Channel.update_websub(channel_id, {'state': 'unsubscribed', 'lease_expires': None, 'requested_at': None})
+            logger.info(f"WebSub unsubscribe verified for channel {channel_id}")
+            return challenge
+
+        return None
+
+    @staticmethod
+    def _secrets(channel):
+        """
+        Secrets a push for the channel may be signed with
+
+        The verified subscription's secret, or WEBSUB_SECRET for subscriptions made
+        before secrets were per channel, plus a renewal's secret the hub may already use.
+        """
+        websub = channel.get('websub') or {}
+        candidates = [websub.get('secret') or current_app.config.get('WEBSUB_SECRET'), websub.get('pending_secret')]
+        return [secret for secret in candidates if secret]
+
+    @staticmethod
+    def verify_signature(channel, body, signature_header):
+        """
+        Check the X-Hub-Signature header ('<algorithm>=<hex digest>') of a push for a channel
+
+        Unsigned pushes are rejected, as are all pushes for a channel without a secret.
+        """
+        if not signature_header or '=' not in signature_header:
+            return False
+
+        algorithm, _, digest = signature_header.partition('=')
+        hash_function = SIGNATURE_ALGORITHMS.get(algorithm.lower())
+        if hash_function is None:
+            return False
+
+        digest = digest.strip().lower()
+        return any(
+            hmac.compare_digest(hmac.new(secret.encode('utf-8'), body, hash_function).hexdigest(), digest)
+            for secret in WebSubService._secrets(channel)
+        )
+
+    @staticmethod
+    def accept_notification(channel_id, body, signature_header):
+        """
+        Decide whether a push may be processed: it must be for an active monitored
+        channel and signed with that channel's secret
+
+        Returns:
+            bool: True if the push should be processed
+        """
+        channel = Channel.get_by_id(channel_id)
+        if not channel or not channel.get('active', True):
+            logger.warning(f"Ignoring WebSub notification for unknown or paused channel {channel_id}")
+            return False
+
+        if not WebSubService.verify_signature(channel, body, signature_header):
+            logger.warning(f"Ignoring WebSub notification for channel {channel_id} with a missing or invalid signature")
+            return False
+
+        return True
+
+    @staticmethod
+    def handle_notification(channel_id, body):
+        """
+        Store and announce the new videos in a pushed Atom document
+
+        Pushed IDs go through the same dedup and insert path as a polled check;
+        only IDs that aren't stored yet cost a (batched) videos.list call.
+
+        Returns:
+            list: newly stored videos
+        """
+        try:
+            entries = parse_feed(io.BytesIO(body))
+        except ET.ParseError as e:
+            logger.error(f"Could not parse WebSub notification for channel {channel_id}: {str(e)}")
+            return []
+
+        Channel.update_websub(channel_id, {'last_push_at': datetime.utcnow()})
+
+        # Entries that name another channel are dropped before they cost a videos.list call
+        video_ids = [entry['video_id'] for entry in entries if entry.get('channel_id') in (None, channel_id)]
+        if not video_ids:
+            # Deleted-entry notifications carry no video
+            return []
+
+        try:
+            unknown_ids = Video.unknown_ids(video_ids)
+        except Exception as e:
+            logger.error(f"Error looking up pushed videos for channel {channel_id}: {str(e)}")
+            return []
+
+        if not unknown_ids:
+            logger.info(f"WebSub notification for channel {channel_id} has no new videos")
+            return []
+
+        cutoff = datetime.utcnow() - PUSH_MAX_VIDEO_AGE
+        videos = [
+            video for video in YouTubeService.get_videos_by_id(unknown_ids)
+            if video['channel_id'] == channel_id and video['published_at'] >= cutoff
+        ]
+        if not videos:
+            return []
+
+        new_videos = YouTubeService._store_new_videos(channel_id, videos, enrich=False)
+        if new_videos:
+            # Imported here: the monitor task imports this module for the polling split
+            from app.tasks.monitor_task import notify_new_videos
+            channel = Channel.get_by_id(channel_id) or {'channel_id': channel_id}
+            # get_videos_by_id already fetched duration and statistics
+            notify_new_videos([(channel, video) for video in new_videos], enrich=False)
+        return new_videos
+
+    @staticmethod
+    def handle_notification_in_background(app, channel_id, body):
+        """
+        Process a push on the bounded push pool so the hub gets its 2xx right away
+
+        Returns:
+            bool: False if the pool is full (the hub should be asked to retry)
+        """
+        def _process():
+            with app.app_context():
+                try:
+                    WebSubService.handle_notification(channel_id, body)
+                except Exception as e:
+                    logger.error(f"Error processing WebSub notification for channel {channel_id}: {str(e)}")
+
+        return websub_pushes.submit(_process)
+
+    @staticmethod
+    def get_stats():
+        """Subscription counts by state for the active channels"""
+        stats = {'enabled': WebSubService.enabled(), 'states': {}, 'healthy': 0, 'pushes': websub_pushes.get_stats(),
+                 'hub_http': websub_http.get_stats()}
+
+        if mongo.db is None:
+            return stats
+
+        try:
+            now = datetime.utcnow()
+            for channel in mongo.db.channels.find({'active': True}, {'websub': 1}):
+                state = WebSubService._state(channel)
+                stats['states'][state] = stats['states'].get(state, 0) + 1
+                if WebSubService.is_healthy(channel, now):
+                    stats['healthy'] += 1
+        except Exception as e:
+            logger.error(f"Error reading WebSub subscription stats: {str(e)}")
+        return stats
@@ -7,20 +7,84 @@ from datetime import datetime
 from app.models.video import Video
 from app.models.channel import Channel
 from app import mongo
+from app.services.http_client import youtube_http
+from app.services.quota_service import quota_ledger, quota_breaker, QuotaCircuitOpen
+from app.services.api_key_pool import youtube_keys, key_id, NoApiKeyAvailable
+from app.services.feed_service import FeedService
+from app.services.single_flight import channel_checks
+from pymongo import UpdateOne
 from flask import current_app
 import os
 
 logger = logging.getLogger(__name__)
 
+YOUTUBE_API_BASE_URL = os.environ.get('YOUTUBE_API_BASE_URL', 'https://www.googleapis.com/youtube/v3')
+
+# videos.list and channels.list accept at most 50 IDs per request
+VIDEOS_PER_REQUEST = 50
+
 class YouTubeService:
+    @staticmethod
+    def _api_get(endpoint, params, api_key=None, headers=None):
+        """
+        Send a GET request to a YouTube Data API endpoint
+        All API calls go through the shared pooled client so connections are reused,
+        and every call that gets a response is charged to the quota ledger
+        
+        Without an explicit api_key the key pool picks the key with the most budget
+        left. A pooled key that answers quotaExceeded leaves the rotation and the call
+        is retried with the next key; the 403 is returned once no key is left, and the
+        quota circuit breaker opens so no further calls are made until the reset.
+        
+        Raises:
+            QuotaCircuitOpen: the quota circuit breaker is open
+            NoApiKeyAvailable: no key is configured or every key is out of quota
+        """
+        if quota_breaker.is_open():
+            raise QuotaCircuitOpen("YouTube API quota exhausted, calls are paused until the quota resets")
+        
+        url = f"{YOUTUBE_API_BASE_URL}/{endpoint}"
+        logger.debug(f"Making API request to: {url} with params {params}")
+        
+        pooled = api_key is None
+        if pooled:
+            api_key = youtube_keys.acquire()
+            if not api_key:
+                if youtube_keys.has_keys():
+                    quota_breaker.open("Every YouTube API key is out of quota")
+                raise NoApiKeyAvailable("No YouTube API key with quota left")
+        
+        query = dict(params)
+        while True:
+            query['key'] = api_key
+            response = youtube_http.get(url, params=query, headers=headers)
+            quota_ledger.record(endpoint, key_id=key_id(api_key))
+            
+            if response.status_code == 403 and YouTubeService._error_reason(response) == 'quotaExceeded':
+                youtube_keys.report_quota_exceeded(api_key)
+                next_key = youtube_keys.acquire() if pooled else None
+                if next_key:
+                    api_key = next_key
+                    continue
+                if pooled:
+                    quota_breaker.open("Every YouTube API key is out of quota")
+            return response
+    
+    @staticmethod
+    def _error_reason(response):
+        """The 'reason' of a YouTube API error response, or None"""
+        try:
+            return response.json().get('error', {}).get('errors', [{}])[0].get('reason')
+        except Exception:
+            return None
+    
     @staticmethod
     def get_channel_info(channel_input):
         """
         Fetch channel information from YouTube API
         Handles different input formats: channel ID, channel username, or full URL
         """
-        api_key = current_app.config.get('YOUTUBE_API_KEY')
-        if not api_key:
+        if not youtube_keys.has_keys():
             logger.error("YouTube API key is not set")
             return None
         
@@ -32,12 +96,12 @@ class YouTubeService:
         logger.info(f"Looking up channel with ID: {channel_id}")
         
         # Try looking up by ID first
-        channel_info = YouTubeService._get_channel_by_id(channel_id, api_key)
+        channel_info = YouTubeService._get_channel_by_id(channel_id)
         
         # If not found, try looking up by username
         if not channel_info and len(channel_id) < 24:  # Channel IDs are typically 24 chars
             logger.info(f"Channel not found by ID, trying as username: {channel_id}")
-            channel_info = YouTubeService._get_channel_by_username(channel_id, api_key)
+            channel_info = YouTubeService._get_channel_by_username(channel_id)
         
         return channel_info
     
@@ -64,12 +128,10 @@ class YouTubeService:
         return None
     
     @staticmethod
-    def _get_channel_by_id(channel_id, api_key):
+    def _get_channel_by_id(channel_id, api_key=None):
         """Get channel info using direct channel ID"""
-        url = f"https://www.googleapis.com/youtube/v3/channels?part=snippet&id={channel_id}&key={api_key}"
-        
         try:
-            response = requests.get(url)
+            response = YouTubeService._api_get('channels', {'part': 'snippet,contentDetails', 'id': channel_id}, api_key)
             response.raise_for_status()
             data = response.json()
             
@@ -82,7 +144,8 @@ class YouTubeService:
                 'channel_id': channel_id,
                 'channel_name': channel_info['snippet']['title'],
                 'description': channel_info['snippet'].get('description', ''),
-                'thumbnail_url': channel_info['snippet']['thumbnails'].get('default', {}).get('url', '')
+                'thumbnail_url': channel_info['snippet']['thumbnails'].get('default', {}).get('url', ''),
+                'uploads_playlist_id': YouTubeService._uploads_playlist_from_item(channel_info)
             }
         except requests.exceptions.RequestException as e:
             logger.error(f"API request error when fetching channel by ID: {str(e)}")
@@ -92,12 +155,10 @@ class YouTubeService:
             return None
     
     @staticmethod
-    def _get_channel_by_username(username, api_key):
+    def _get_channel_by_username(username, api_key=None):
         """Get channel info using username/handle"""
-        url = f"https://www.googleapis.com/youtube/v3/channels?part=snippet&forUsername={username}&key={api_key}"
-        
         try:
-            response = requests.get(url)
+            response = YouTubeService._api_get('channels', {'part': 'snippet,contentDetails', 'forUsername': username}, api_key)
             response.raise_for_status()
             data = response.json()
             
@@ -110,7 +171,8 @@ class YouTubeService:
                 'channel_id': channel_info['id'],
                 'channel_name': channel_info['snippet']['title'],
                 'description': channel_info['snippet'].get('description', ''),
-                'thumbnail_url': channel_info['snippet']['thumbnails'].get('default', {}).get('url', '')
+                'thumbnail_url': channel_info['snippet']['thumbnails'].get('default', {}).get('url', ''),
+                'uploads_playlist_id': YouTubeService._uploads_playlist_from_item(channel_info)
             }
         except requests.exceptions.RequestException as e:
             logger.error(f"API request error when fetching channel by username: {str(e)}")
@@ -124,31 +186,23 @@ class YouTubeService:
         """
         Fetch the latest videos from a channel
         """
-        # Try to get API key from app config first
-        try:
-            api_key = current_app.config.get('YOUTUBE_API_KEY')
-            logger.info(f"Using API key from current_app.config: {'Available' if api_key else 'Not available'}")
-        except RuntimeError:
-            # We might be outside of app context
-            api_key = None
-        
-        # If not available in app config, try environment variables
-        if not api_key:
-            api_key = os.environ.get('YOUTUBE_API_KEY')
-            logger.info(f"Using API key from os.environ: {'Available' if api_key else 'Not available'}")
-        
-        if not api_key:
+        if not youtube_keys.has_keys():
             logger.error("YouTube API key is not set in either app config or environment variables")
             return []
         
         logger.info(f"Fetching latest videos for channel {channel_id}, max_results={max_results}")
         
         # The search endpoint is used to find videos by channel
-        search_url = f"https://www.googleapis.com/youtube/v3/search?part=snippet&channelId={channel_id}&maxResults={max_results}&order=date&type=video&key={api_key}"
-        logger.debug(f"Making API request to: {search_url.replace(api_key, 'API_KEY_HIDDEN')}")
+        search_params = {
+            'part': 'snippet',
+            'channelId': channel_id,
+            'maxResults': max_results,
+            'order': 'date',
+            'type': 'video'
+        }
         
         try:
-            response = requests.get(search_url)
+            response = YouTubeService._api_get('search', search_params)
             
             # Handle specific error cases with more descriptive messages
             if response.status_code == 400:
@@ -161,7 +215,7 @@ class YouTubeService:
                     
                     # Try alternative approach - use channels endpoint to get uploads playlist
                     logger.info(f"Trying alternative method to fetch videos for channel {channel_id}")
-                    return YouTubeService._get_videos_from_uploads_playlist(channel_id, max_results, api_key)
+                    return YouTubeService._get_videos_from_uploads_playlist(channel_id, max_results)
                 except Exception as e:
                     logger.error(f"Error parsing 400 response: {str(e)}")
                     return []
@@ -229,119 +283,299 @@ class YouTubeService:
             return []
     
     @staticmethod
-    def _get_videos_from_uploads_playlist(channel_id, max_results=5, api_key=None):
+    def _get_videos_from_uploads_playlist(channel_id, max_results=5, api_key=None, uploads_playlist_id=None):
         """
         Alternative method to get videos using the channel's uploads playlist
+        The playlist ID is read from the channel document and only resolved through
+        channels.list when it has never been stored or the stored one returns 404
         """
-        if not api_key:
-            try:
-                api_key = current_app.config.get('YOUTUBE_API_KEY')
-                logger.info(f"Using API key from current_app.config: {'Available' if api_key else 'Not available'}")
-            except RuntimeError:
-                # We might be outside of app context
-                api_key = os.environ.get('YOUTUBE_API_KEY')
-                logger.info(f"Using API key from os.environ: {'Available' if api_key else 'Not available'}")
-            
-            if not api_key:
-                logger.error("YouTube API key is not set in either app config or environment variables")
-                return []
+        result = YouTubeService._fetch_uploads_playlist(channel_id, max_results, api_key, uploads_playlist_id)
+        return result['videos']
+    
+    @staticmethod
+    def _fetch_uploads_playlist(channel_id, max_results=5, api_key=None, uploads_playlist_id=None, etag=None):
+        """
+        Fetch the first page of a channel's uploads playlist
+        
+        If an ETag from a previous response is given it is sent as If-None-Match; a 304
+        reply means the playlist is unchanged and nothing is downloaded or parsed.
+        
+        Returns:
+            dict: {'videos': list, 'etag': ETag of the response or None, 'not_modified': bool}
+        """
+        result = {'videos': [], 'etag': None, 'not_modified': False}
+        
+        if not api_key and not youtube_keys.has_keys():
+            logger.error("YouTube API key is not set in either app config or environment variables")
+            return result
         
         try:
-            # Step 1: Get the uploads playlist ID for the channel
-            channels_url = f"https://www.googleapis.com/youtube/v3/channels?part=contentDetails&id={channel_id}&key={api_key}"
-            logger.debug(f"Making API request to: {channels_url.replace(api_key, 'API_KEY_HIDDEN')}")
-            
-            response = requests.get(channels_url)
-            if response.status_code != 200:
-                logger.error(f"API request failed with status code {response.status_code}")
-                if response.status_code == 403:
-                    error_data = response.json()
-                    error_reason = error_data.get('error', {}).get('errors', [{}])[0].get('reason', 'unknown')
-                    logger.error(f"API returned 403 error. Reason: {error_reason}")
-                return []
-                
-            response.raise_for_status()
-            
-            data = response.json()
-            if 'items' not in data or len(data['items']) == 0:
-                logger.warning(f"No channel found with ID: {channel_id}")
-                return []
-            
-            # Get the uploads playlist ID
-            uploads_playlist_id = data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-            logger.info(f"Found uploads playlist ID for channel {channel_id}: {uploads_playlist_id}")
+            # Step 1: Use the stored uploads playlist ID, resolving it via channels.list only when missing
+            resolved_now = False
+            if not uploads_playlist_id:
+                channel = Channel.get_by_id(channel_id)
+                uploads_playlist_id = channel.get('uploads_playlist_id') if channel else None
+            
+            if not uploads_playlist_id:
+                uploads_playlist_id = YouTubeService._resolve_uploads_playlist_id(channel_id, api_key)
+                resolved_now = True
+                if not uploads_playlist_id:
+                    return result
             
             # Step 2: Get videos from the uploads playlist
-            playlist_url = f"https://www.googleapis.com/youtube/v3/playlistItems?part=snippet&maxResults={max_results}&playlistId={uploads_playlist_id}&key={api_key}"
-            logger.debug(f"Making API request to: {playlist_url.replace(api_key, 'API_KEY_HIDDEN')}")
+            playlist_params = {
+                'part': 'snippet',
+                'maxResults': max_results,
+                'playlistId': uploads_playlist_id
+            }
+            headers = {'If-None-Match': etag} if etag else None
+            response = YouTubeService._api_get('playlistItems', playlist_params, api_key, headers=headers)
+            
+            if response.status_code == 304:
+                logger.info(f"Uploads playlist for channel {channel_id} not modified since last check")
+                result['etag'] = etag
+                result['not_modified'] = True
+                return result
+            
+            # A 404 means the stored playlist ID is stale - refresh it once and retry
+            if response.status_code == 404 and not resolved_now:
+                logger.warning(f"Uploads playlist {uploads_playlist_id} not found for channel {channel_id}, refreshing playlist ID")
+                uploads_playlist_id = YouTubeService._resolve_uploads_playlist_id(channel_id, api_key)
+                if not uploads_playlist_id:
+                    return result
+                
+                playlist_params['playlistId'] = uploads_playlist_id
+                response = YouTubeService._api_get('playlistItems', playlist_params, api_key)
             
-            response = requests.get(playlist_url)
             if response.status_code != 200:
                 logger.error(f"Playlist API request failed with status code {response.status_code}")
-                return []
+                return result
                 
             response.raise_for_status()
             
             data = response.json()
-            videos = []
+            result['etag'] = response.headers.get('ETag') or data.get('etag')
+            result['videos'] = YouTubeService._parse_playlist_items(data.get('items', []), channel_id)
             
-            if 'items' in data:
-                logger.info(f"Found {len(data['items'])} videos in uploads playlist")
+            logger.info(f"Returning {len(result['videos'])} videos from uploads playlist for channel {channel_id}")
+            return result
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"API request error when fetching uploads playlist: {str(e)}")
+            return result
+        except Exception as e:
+            logger.error(f"Error fetching videos from uploads playlist for channel {channel_id}: {str(e)}")
+            return result
+    
+    @staticmethod
+    def _parse_playlist_items(items, channel_id):
+        """Convert playlistItems API items into video dicts"""
+        videos = []
+        
+        if items:
+            logger.info(f"Found {len(items)} videos in uploads playlist")
+        
+        for item in items:
+            try:
+                snippet = item['snippet']
+                video_id = snippet['resourceId']['videoId']
+                published_at = datetime.strptime(snippet['publishedAt'], "%Y-%m-%dT%H:%M:%SZ")
                 
-                for item in data['items']:
-                    try:
+                # Create video object
+                video = {
+                    'video_id': video_id,
+                    'channel_id': channel_id,
+                    'title': snippet['title'],
+                    'description': snippet.get('description', ''),
+                    'published_at': published_at,
+                    'thumbnail_url': YouTubeService._best_thumbnail(snippet.get('thumbnails', {})),
+                    'detected_at': datetime.utcnow()
+                }
+                
+                videos.append(video)
+                logger.debug(f"Added video to results from uploads playlist: {video['title']} ({video_id})")
+            except Exception as e:
+                logger.error(f"Error processing video from uploads playlist: {str(e)}")
+        
+        return videos
+    
+    @staticmethod
+    def _best_thumbnail(thumbnails):
+        """URL of the highest quality thumbnail in a snippet's thumbnails"""
+        for quality in ['maxres', 'high', 'standard', 'medium', 'default']:
+            if quality in thumbnails and 'url' in thumbnails[quality]:
+                return thumbnails[quality]['url']
+        return None
+    
+    @staticmethod
+    def get_videos_by_id(video_ids, api_key=None):
+        """
+        Fetch video dicts (in the same shape as the uploads playlist check produces) for
+        the given IDs with batched videos.list calls, including duration and statistics
+        
+        Returns:
+            list: video dicts; IDs YouTube doesn't return (private, deleted) are left out
+        """
+        return list(YouTubeService._list_videos(video_ids, with_snippet=True, api_key=api_key).values())
+    
+    @staticmethod
+    def _list_videos(video_ids, with_snippet=False, api_key=None):
+        """
+        Fetch and parse videos with videos.list, up to 50 IDs (1 quota unit) per request
+        
+        Returns:
+            dict: video_id -> {'duration', 'view_count', 'like_count', 'comment_count'}, plus the
+            snippet fields of a video dict with with_snippet; IDs YouTube doesn't return are left out
+        """
+        videos = {}
+        video_ids = [video_id for video_id in dict.fromkeys(video_ids) if video_id]
+        if not video_ids:
+            return videos
+        
+        if not api_key and not youtube_keys.has_keys():
+            logger.error("YouTube API key is not set in either app config or environment variables")
+            return videos
+        
+        part = 'snippet,contentDetails,statistics' if with_snippet else 'contentDetails,statistics'
+        for start in range(0, len(video_ids), VIDEOS_PER_REQUEST):
+            batch = video_ids[start:start + VIDEOS_PER_REQUEST]
+            try:
+                response = YouTubeService._api_get('videos', {
+                    'part': part,
+                    'id': ','.join(batch),
+                    'maxResults': len(batch)
+                }, api_key)
+                response.raise_for_status()
+                items = response.json().get('items', [])
+            except Exception as e:
+                logger.error(f"Error fetching {len(batch)} videos by ID: {str(e)}")
+                continue
+            
+            for item in items:
+                try:
+                    statistics = item.get('statistics', {})
+                    video = {
+                        'duration': item.get('contentDetails', {}).get('duration'),
+                        'view_count': int(statistics.get('viewCount', 0)),
+                        'like_count': int(statistics.get('likeCount', 0)),
+                        'comment_count': int(statistics.get('commentCount', 0))
+                    }
+                    if with_snippet:
                         snippet = item['snippet']
-                        video_id = snippet['resourceId']['videoId']
-                        published_at = datetime.strptime(snippet['publishedAt'], "%Y-%m-%dT%H:%M:%SZ")
-                        
-                        # Get thumbnail
-                        thumbnail_url = None
-                        thumbnails = snippet.get('thumbnails', {})
-                        
-                        for quality in ['maxres', 'high', 'standard', 'medium', 'default']:
-                            if quality in thumbnails and 'url' in thumbnails[quality]:
-                                thumbnail_url = thumbnails[quality]['url']
-                                break
-                        
-                        if not thumbnail_url and 'default' in thumbnails:
-                            thumbnail_url = thumbnails['default'].get('url', '')
-                        
-                        # Create video object
-                        video = {
-                            'video_id': video_id,
-                            'channel_id': channel_id,
+                        video.update({
+                            'video_id': item['id'],
+                            'channel_id': snippet['channelId'],
                             'title': snippet['title'],
                             'description': snippet.get('description', ''),
-                            'published_at': published_at,
-                            'thumbnail_url': thumbnail_url,
+                            'published_at': datetime.strptime(snippet['publishedAt'], "%Y-%m-%dT%H:%M:%SZ"),
+                            'thumbnail_url': YouTubeService._best_thumbnail(snippet.get('thumbnails', {})),
                             'detected_at': datetime.utcnow()
-                        }
-                        
-                        videos.append(video)
-                        logger.debug(f"Added video to results from uploads playlist: {video['title']} ({video_id})")
-                    except Exception as e:
-                        logger.error(f"Error processing video from uploads playlist: {str(e)}")
+                        })
+                    videos[item['id']] = video
+                except Exception as e:
+                    logger.error(f"Error processing video {item.get('id')}: {str(e)}")
+        
+        return videos
+    
+    @staticmethod
+    def _uploads_playlist_from_item(channel_item):
+        """Extract the uploads playlist ID from a channels.list item with contentDetails"""
+        return channel_item.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+    
+    @staticmethod
+    def _resolve_uploads_playlist_id(channel_id, api_key=None):
+        """
+        Look up the uploads playlist ID for a channel and store it on the channel document
+        """
+        response = YouTubeService._api_get('channels', {'part': 'contentDetails', 'id': channel_id}, api_key)
+        if response.status_code != 200:
+            logger.error(f"API request failed with status code {response.status_code}")
+            if response.status_code == 403:
+                error_data = response.json()
+                error_reason = error_data.get('error', {}).get('errors', [{}])[0].get('reason', 'unknown')
+                logger.error(f"API returned 403 error. Reason: {error_reason}")
+            return None
+        
+        data = response.json()
+        if 'items' not in data or len(data['items']) == 0:
+            logger.warning(f"No channel found with ID: {channel_id}")
+            return None
+        
+        uploads_playlist_id = YouTubeService._uploads_playlist_from_item(data['items'][0])
+        if not uploads_playlist_id:
+            logger.warning(f"Channel {channel_id} has no uploads playlist")
+            return None
+        
+        logger.info(f"Found uploads playlist ID for channel {channel_id}: {uploads_playlist_id}")
+        Channel.set_uploads_playlist_id(channel_id, uploads_playlist_id)
+        return uploads_playlist_id
+    
+    @staticmethod
+    def backfill_uploads_playlist_ids(api_key=None, batch_size=50):
+        """
+        Resolve and store the uploads playlist ID for every channel that doesn't have one yet
+        Sends up to 50 channel IDs per channels.list request (1 quota unit per batch)
+        
+        Returns:
+            dict: counts of channels updated, missing (not found on YouTube) and failed batches
+        """
+        results = {'updated': 0, 'missing': 0, 'failed_batches': 0}
+        
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return results
+        
+        if not api_key and not youtube_keys.has_keys():
+            logger.error("YouTube API key is not set in either app config or environment variables")
+            return results
+        
+        batch_size = max(1, min(batch_size, 50))
+        cursor = mongo.db.channels.find(
+            {'$or': [{'uploads_playlist_id': {'$exists': False}}, {'uploads_playlist_id': None}]},
+            {'channel_id': 1}
+        )
+        channel_ids = [doc['channel_id'] for doc in cursor if doc.get('channel_id')]
+        logger.info(f"Backfilling uploads playlist IDs for {len(channel_ids)} channels")
+        
+        for start in range(0, len(channel_ids), batch_size):
+            batch = channel_ids[start:start + batch_size]
+            try:
+                response = YouTubeService._api_get('channels', {
+                    'part': 'contentDetails',
+                    'id': ','.join(batch),
+                    'maxResults': batch_size
+                }, api_key)
+                response.raise_for_status()
+                items = response.json().get('items', [])
+            except Exception as e:
+                logger.error(f"Error resolving uploads playlists for batch starting at {start}: {str(e)}")
+                results['failed_batches'] += 1
+                continue
             
-            logger.info(f"Returning {len(videos)} videos from uploads playlist for channel {channel_id}")
-            return videos
+            playlists = {}
+            for item in items:
+                uploads_playlist_id = YouTubeService._uploads_playlist_from_item(item)
+                if uploads_playlist_id:
+                    playlists[item['id']] = uploads_playlist_id
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request error when fetching uploads playlist: {str(e)}")
-            return []
-        except Exception as e:
-            logger.error(f"Error fetching videos from uploads playlist for channel {channel_id}: {str(e)}")
-            return []
+            updated = Channel.set_uploads_playlist_ids(playlists)
+            results['updated'] += updated
+            results['missing'] += len(batch) - len(playlists)
+        
+        logger.info(f"Uploads playlist backfill complete: {results}")
+        return results
     
     @staticmethod
     def get_video_details(video_id):
         """
         Fetch detailed information about a specific video
         """
-        api_key = current_app.config['YOUTUBE_API_KEY']
-        url = f"https://www.googleapis.com/youtube/v3/videos?part=snippet,contentDetails,statistics&id={video_id}&key={api_key}"
+        if not youtube_keys.has_keys():
+            logger.error("YouTube API key is not set in either app config or environment variables")
+            return None
         
         try:
-            response = requests.get(url)
+            response = YouTubeService._api_get('videos', {'part': 'snippet,contentDetails,statistics', 'id': video_id})
             response.raise_for_status()
             data = response.json()
             
@@ -372,60 +606,160 @@ class YouTubeService:
             return None
     
     @staticmethod
-    def check_channel_for_new_videos(channel_id):
+    def get_videos_enrichment(video_ids, api_key=None):
+        """
+        Fetch duration and statistics for many videos with batched videos.list calls
+        Sends up to 50 IDs per request, so enrichment costs 1 quota unit per 50 videos
+        
+        Returns:
+            dict: video_id -> {'duration', 'view_count', 'like_count', 'comment_count'}
+        """
+        video_ids = [video_id for video_id in dict.fromkeys(video_ids) if video_id]
+        details = YouTubeService._list_videos(video_ids, api_key=api_key)
+        if not video_ids:
+            return details
+        
+        logger.info(f"Fetched enrichment for {len(details)}/{len(video_ids)} videos "
+                    f"in {(len(video_ids) + VIDEOS_PER_REQUEST - 1) // VIDEOS_PER_REQUEST} requests")
+        return details
+    
+    @staticmethod
+    def enrich_videos(videos, api_key=None):
+        """
+        Attach duration and view/like/comment counts to the given video dicts
+        and to their stored documents
+        
+        Returns:
+            int: number of videos enriched
+        """
+        if not videos:
+            return 0
+        
+        details = YouTubeService.get_videos_enrichment([video.get('video_id') for video in videos], api_key)
+        if not details:
+            return 0
+        
+        operations = []
+        for video in videos:
+            video_details = details.get(video.get('video_id'))
+            if video_details:
+                video.update(video_details)
+                operations.append(UpdateOne({'video_id': video['video_id']}, {'$set': video_details}))
+        
+        if operations and mongo.db is not None:
+            try:
+                mongo.db.videos.bulk_write(operations, ordered=False)
+            except Exception as e:
+                logger.error(f"Error saving video enrichment: {str(e)}")
+        
+        return len(operations)
+    
+    @staticmethod
+    def check_channel_for_new_videos(channel_id, enrich=True):
         """
         Check a channel for new videos and return any found
+        
+        The caller owns the returned videos and must announce them (notify_new_videos);
+        the monitor doesn't announce videos of a check it shared.
+        
+        Args:
+            channel_id: YouTube channel ID
+            enrich: Fetch duration/statistics for new videos right away. The monitor
+                    passes False and enriches the whole cycle's videos in batches instead.
         """
+        return YouTubeService.check_channel(channel_id, enrich=enrich)['new_videos']
+    
+    @staticmethod
+    def check_channel(channel_id, enrich=True):
+        """
+        Check a channel for new videos
+        
+        Concurrent checks of the same channel (monitor, manual checks, page views) share
+        one run, and a check finished less than CHECK_FRESHNESS_SECONDS ago is reused
+        instead of repeated.
+        
+        Returns:
+            dict: {
+                'channel_id': the channel checked,
+                'new_videos': list of newly stored videos,
+                'not_modified': True if the uploads playlist returned 304 (nothing parsed or looked up),
+                                or, in RSS mode, the feed showed nothing new,
+                'error': error message or None,
+                'shared': True if the result came from another caller's check (that caller
+                          announces the new videos; every caller that isn't the monitor
+                          does so through notify_new_videos)
+            }
+        """
+        fresh_for = current_app.config.get('CHECK_FRESHNESS_SECONDS', 60)
+        result, shared = channel_checks.do(
+            channel_id,
+            lambda: YouTubeService._check_channel(channel_id, enrich),
+            fresh_for=fresh_for
+        )
+        return dict(result, shared=shared)
+    
+    @staticmethod
+    def _check_channel(channel_id, enrich):
+        """Run one check of a channel (see check_channel)"""
+        result = {
+            'channel_id': channel_id,
+            'new_videos': [],
+            'not_modified': False,
+            'error': None
+        }
         logger.info(f"Checking channel {channel_id} for new videos")
         
         try:
             # Update the channel's last checked timestamp IMMEDIATELY
             # This ensures we always update the timestamp, even if we encounter errors later
-            current_time = datetime.utcnow()
-            if mongo.db is not None:
-                try:
-                    update_result = mongo.db.channels.update_one(
-                        {'channel_id': channel_id},
-                        {'$set': {'last_checked': current_time}}
-                    )
-                    if update_result.modified_count > 0:
-                        logger.info(f"Updated last_checked timestamp for channel {channel_id} to {current_time}")
-                    else:
-                        logger.warning(f"Failed to update last_checked timestamp for channel {channel_id}")
-                except Exception as e:
-                    logger.error(f"Error updating last_checked timestamp: {str(e)}")
+            YouTubeService._mark_checked(channel_id)
             
             # First check when the last successful check was
             channel = None
             if mongo.db is not None:
                 channel = mongo.db.channels.find_one({'channel_id': channel_id})
             
+            # RSS mode: probe the channel's feed first. It costs no quota and usually shows
+            # nothing new, in which case the Data API isn't called at all
+            feed_probe = None
+            if YouTubeService._detection_mode() == 'rss':
+                feed_probe = YouTubeService._probe_feed(channel_id, channel)
+                if not feed_probe['call_api']:
+                    result['not_modified'] = True
+                    return result
+            
             # Get the latest videos from the API (increased to 15 to get more videos initially)
             logger.debug(f"Fetching latest videos for channel {channel_id}")
             
-            # Try to get the API key directly from environment since we're having issues with current_app
-            api_key = os.environ.get('YOUTUBE_API_KEY')
-            logger.info(f"Using API key from environment: {'Available' if api_key else 'Not available'}")
-            
-            if not api_key:
-                try:
-                    api_key = current_app.config.get('YOUTUBE_API_KEY')
-                    logger.info(f"Using API key from config: {'Available' if api_key else 'Not available'}")
-                except Exception as e:
-                    logger.error(f"Error getting API key from config: {str(e)}")
-            
-            if not api_key:
+            # Keys come from the key pool, one per API call
+            if not youtube_keys.has_keys():
                 logger.error("YouTube API key is not available from any source")
-                return []
+                result['error'] = "YouTube API key is not available"
+                return result
             
             # Try uploads playlist method first (uses less quota and more reliable)
+            playlist_etag = None
             try:
                 logger.info(f"Using uploads playlist method for channel {channel_id}")
-                latest_videos = YouTubeService._get_videos_from_uploads_playlist(channel_id, max_results=15, api_key=api_key)
+                playlist = YouTubeService._fetch_uploads_playlist(
+                    channel_id,
+                    max_results=15,
+                    uploads_playlist_id=channel.get('uploads_playlist_id') if channel else None,
+                    etag=channel.get('uploads_etag') if channel else None
+                )
+                
+                # Unchanged playlist - nothing to parse, look up or insert
+                if playlist['not_modified']:
+                    result['not_modified'] = True
+                    return result
+                
+                latest_videos = playlist['videos']
+                playlist_etag = playlist['etag']
                 
                 # If that fails, fall back to the search API
                 if not latest_videos:
                     logger.info(f"Uploads playlist method returned no videos, falling back to search API for channel {channel_id}")
+                    playlist_etag = None
                     latest_videos = YouTubeService.get_latest_videos(channel_id, max_results=15)
             except Exception as e:
                 logger.error(f"Error fetching videos with uploads playlist method: {str(e)}")
@@ -439,58 +773,142 @@ class YouTubeService:
             
             if not latest_videos:
                 logger.info(f"No videos found for channel {channel_id}")
-                return []
-            
-            logger.info(f"Retrieved {len(latest_videos)} videos from API for channel {channel_id}")
+                return result
             
-            # Check if mongo.db is available
-            if mongo.db is None:
-                logger.error("MongoDB connection is not available")
-                return latest_videos  # Return videos anyway even if we can't save them
+            result['new_videos'] = YouTubeService._store_new_videos(
+                channel_id, latest_videos, playlist_etag=playlist_etag, enrich=enrich
+            )
             
-            # Store new videos in the database
-            new_videos = []
-            for video in latest_videos:
-                try:
-                    video_id = video.get('video_id')
-                    if not video_id:
-                        logger.warning(f"Video missing video_id, skipping: {video}")
-                        continue
-                        
-                    # Check if video already exists
-                    existing = mongo.db.videos.find_one({'video_id': video_id})
-                    if existing:
-                        logger.debug(f"Video {video_id} already exists in database, skipping")
-                        continue
-                        
-                    # This is a new video
-                    logger.info(f"Found new video: {video['title']} ({video_id})")
-                    
-                    # Add notification tracking fields to the video
-                    video['notification_sent'] = False
-                    video['notification_count'] = 0
-                    video['last_notification_time'] = None
-                    
-                    # Try to insert the video in the database
-                    insert_result = mongo.db.videos.insert_one(video)
-                    if insert_result.inserted_id:
-                        logger.info(f"✓ Successfully added video {video_id} to database")
-                        new_videos.append(video)
-                        logger.info(f"→ This video will trigger webhook notifications: {video['title']}")
-                    else:
-                        logger.warning(f"Failed to insert video {video_id} into database")
-                except Exception as e:
-                    logger.error(f"Error processing video {video.get('video_id', 'unknown')}: {str(e)}")
-            
-            if new_videos:
-                logger.info(f"Found {len(new_videos)} new videos for channel {channel_id} that will trigger notifications")
-            else:
-                logger.info(f"No new videos found for channel {channel_id} that require notifications")
-                
-            return new_videos
+            if feed_probe:
+                YouTubeService._save_feed_validators_if_caught_up(channel_id, feed_probe)
+            return result
         except Exception as e:
             logger.error(f"Error checking channel {channel_id} for new videos: {str(e)}")
-            return []
+            result['error'] = str(e)
+            return result
+    
+    @staticmethod
+    def _detection_mode():
+        """'api' (Data API only) or 'rss' (probe the channel feed first)"""
+        try:
+            return current_app.config.get('DETECTION_MODE', 'api')
+        except RuntimeError:
+            # We might be outside of app context
+            return os.environ.get('DETECTION_MODE', 'api')
+    
+    @staticmethod
+    def _probe_feed(channel_id, channel=None):
+        """
+        First-stage check against the channel's RSS feed, which costs no API quota
+        
+        Returns:
+            dict: {
+                'call_api': True if the Data API should be asked (the feed shows a video
+                            we haven't stored, or the feed couldn't be read),
+                'video_ids': video IDs listed in the feed,
+                'etag', 'last_modified': validators of the feed response
+            }
+        """
+        channel = channel or {}
+        feed = FeedService.fetch_feed(channel_id, channel.get('feed_etag'), channel.get('feed_last_modified'))
+        probe = {'call_api': True, 'video_ids': [], 'etag': feed['etag'], 'last_modified': feed['last_modified']}
+        
+        if feed['status'] == 'not_modified':
+            logger.info(f"Feed for channel {channel_id} not modified since last check")
+            probe['call_api'] = False
+            return probe
+        
+        if feed['status'] != 'ok':
+            logger.warning(f"Feed probe failed for channel {channel_id}, falling back to the Data API")
+            return probe
+        
+        probe['video_ids'] = [entry['video_id'] for entry in feed['entries']]
+        try:
+            unknown_ids = Video.unknown_ids(probe['video_ids'])
+        except Exception as e:
+            logger.error(f"Error looking up feed videos for channel {channel_id}: {str(e)}")
+            return probe
+        
+        if unknown_ids:
+            logger.info(f"Feed for channel {channel_id} shows {len(unknown_ids)} unseen videos, checking with the Data API")
+            return probe
+        
+        # Nothing new - remember the feed so the next probe can be answered with a 304
+        Channel.set_feed_validators(channel_id, feed['etag'], feed['last_modified'])
+        probe['call_api'] = False
+        return probe
+    
+    @staticmethod
+    def _save_feed_validators_if_caught_up(channel_id, feed_probe):
+        """
+        Store the feed validators once every video the feed listed is stored
+        Until then the next probe gets a full response again and still sees the unseen videos
+        """
+        try:
+            if not Video.unknown_ids(feed_probe['video_ids']):
+                Channel.set_feed_validators(channel_id, feed_probe['etag'], feed_probe['last_modified'])
+        except Exception as e:
+            logger.error(f"Error saving feed validators for channel {channel_id}: {str(e)}")
+    
+    @staticmethod
+    def _mark_checked(channel_id):
+        """Set the channel's last_checked timestamp to now"""
+        if mongo.db is None:
+            return
+        
+        current_time = datetime.utcnow()
+        try:
+            update_result = mongo.db.channels.update_one(
+                {'channel_id': channel_id},
+                {'$set': {'last_checked': current_time}}
+            )
+            if update_result.modified_count > 0:
+                logger.info(f"Updated last_checked timestamp for channel {channel_id} to {current_time}")
+            else:
+                logger.warning(f"Failed to update last_checked timestamp for channel {channel_id}")
+        except Exception as e:
+            logger.error(f"Error updating last_checked timestamp: {str(e)}")
+    
+    @staticmethod
+    def _store_new_videos(channel_id, latest_videos, playlist_etag=None, enrich=True, api_key=None):
+        """
+        Store the videos that aren't in the database yet and return them
+        
+        Shared by the sync check and the async engine so both produce the same results.
+        If playlist_etag is given it is saved once every video has been stored.
+        """
+        logger.info(f"Retrieved {len(latest_videos)} videos from API for channel {channel_id}")
+        
+        # Check if mongo.db is available
+        if mongo.db is None:
+            logger.error("MongoDB connection is not available")
+            return latest_videos  # Return videos anyway even if we can't save them
+        
+        # Add notification tracking fields to the videos
+        for video in latest_videos:
+            video['notification_sent'] = False
+            video['notification_queued'] = False
+            video['notification_count'] = 0
+            video['last_notification_time'] = None
+        
+        # One $in lookup plus one insert_many for the whole page
+        new_videos, store_failed = Video.insert_new(latest_videos)
+        for video in new_videos:
+            logger.info(f"✓ Found new video {video['video_id']}: {video['title']} - this video will trigger webhook notifications")
+        
+        # Remember the ETag only once everything on this page has been stored,
+        # otherwise a 304 on the next check would hide the videos we failed to save
+        if playlist_etag and not store_failed:
+            Channel.set_uploads_etag(channel_id, playlist_etag)
+        
+        if new_videos:
+            logger.info(f"Found {len(new_videos)} new videos for channel {channel_id} that will trigger notifications")
+            if enrich:
+                YouTubeService.enrich_videos(new_videos, api_key)
+        else:
+            logger.info(f"No new videos found for channel {channel_id} that require notifications")
+        
+        return new_videos
     
     @staticmethod
     def batch_import_channels(channel_ids):
@@ -536,6 +954,7 @@ class YouTubeService:
             channel = {
                 'channel_id': channel_id,
                 'channel_name': channel_info['channel_name'],
+                'uploads_playlist_id': channel_info.get('uploads_playlist_id'),
                 'active': True,
                 'added_at': datetime.utcnow(),
                 'last_checked': None
@@ -1,26 +1,38 @@
 from .monitor_task import monitor
+from .delivery_task import delivery_workers
+
+# Time the cron job spends delivering queued webhook notifications after its check cycle
+CRON_DELIVERY_SECONDS = 20
 
 def check_channels_for_updates():
     """
     Function that checks all channels for updates.
     Used by the cron job for Vercel deployment.
     
+    Runs the same check cycle as the monitor (including the CHECK_ENGINE switch),
+    inside an application context. With ADAPTIVE_POLLING only the channels whose
+    stored next_check_at has passed are checked. No delivery workers run here, so the
+    webhook outbox is then drained for up to CRON_DELIVERY_SECONDS.
+    
     Returns:
-        list: A list of new videos found during the check
+        dict: the cycle summary from MonitorTask._check_channels (plus 'deliveries',
+              the number of outbox jobs processed), or None on failure
     """
     try:
-        # Use the existing _check_channels method from the monitor instance
-        # Create a list to store any new videos found
-        new_videos = []
+        app = monitor.app
+        if app is None:
+            # The monitor isn't set up in serverless environments, so build the app here
+            from app import create_app
+            app = create_app()
+            monitor.app = app
         
-        # Execute the channel check using monitor's method
-        if monitor and hasattr(monitor, '_check_channels'):
-            monitor._check_channels()
-            # Note: Since _check_channels doesn't return data directly,
-            # we can just return an empty list or None here
-            
-        return new_videos
+        with app.app_context():
+            summary = monitor._check_channels(due_only=bool(app.config.get('ADAPTIVE_POLLING')))
+            deliveries = delivery_workers.drain(CRON_DELIVERY_SECONDS)
+            if summary is not None:
+                summary['deliveries'] = deliveries
+            return summary
     except Exception as e:
         import logging
         logging.getLogger(__name__).error(f"Error in check_channels_for_updates: {str(e)}")
-        return []
+        return None
@@ -0,0 +1,107 @@
+# app/tasks/claimer.py
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from app import mongo
+from app.models.channel import Channel
+
+logger = logging.getLogger(__name__)
+
+class ChannelClaimer:
+    """
+    Work claiming for sharded checks (CHECK_SHARDING)
+
+    Every worker process claims batches of due channels with an atomic
+    find_one_and_update that sets claimed_by and lease_until, checks them and
+    releases them with their next_check_at moved on. A claim left behind by a
+    dead worker expires after CLAIM_LEASE_SECONDS and the channel is claimed
+    again. Workers also register in check_workers so the quota budget can be
+    shared between the live ones; the registration is renewed by a heartbeat
+    thread every third of a lease, however long the check loop waits.
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def lease_seconds():
+        return max(int(current_app.config.get('CLAIM_LEASE_SECONDS', 300)), 10)
+
+    @staticmethod
+    def batch_size():
+        return max(int(current_app.config.get('CLAIM_BATCH_SIZE', 10)), 1)
+
+    def claim(self, limit):
+        """Claim up to limit due channels, most overdue first"""
+        return Channel.claim_due(self.worker_id, min(limit, self.batch_size()), self.lease_seconds())
+
+    def release(self, channel_ids):
+        return Channel.release_claims(channel_ids, self.worker_id)
+
+    def start(self, app):
+        """Send heartbeats on a background thread until stop()"""
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._heartbeat_loop, args=(app,), name='check-worker-heartbeat')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the heartbeats and unregister this worker"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.retire()
+
+    def _heartbeat_loop(self, app):
+        while not self._stop_event.is_set():
+            with app.app_context():
+                self.heartbeat()
+                interval = self.lease_seconds() / 3
+            if self._stop_event.wait(interval):
+                break
+
+    def heartbeat(self):
+        """Record that this worker is alive (for one claim lease)"""
+        if mongo.db is None:
+            return
+
+        now = datetime.utcnow()
+        try:
+            mongo.db.check_workers.update_one(
+                {'_id': self.worker_id},
+                {'$set': {'seen_at': now, 'expires_at': now + timedelta(seconds=self.lease_seconds())}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error recording check worker heartbeat: {str(e)}")
+
+    def live_workers(self):
+        """Number of workers that sent a heartbeat within the last claim lease (at least 1)"""
+        if mongo.db is None:
+            return 1
+
+        try:
+            return max(mongo.db.check_workers.count_documents({'expires_at': {'$gte': datetime.utcnow()}}), 1)
+        except Exception as e:
+            logger.error(f"Error counting check workers: {str(e)}")
+            return 1
+
+    def retire(self):
+        """Unregister this worker; its share of the quota goes to the others"""
+        if mongo.db is None:
+            return
+
+        try:
+            mongo.db.check_workers.delete_one({'_id': self.worker_id})
+        except Exception as e:
+            logger.error(f"Error unregistering check worker: {str(e)}")
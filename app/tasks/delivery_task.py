@@ -0,0 +1,335 @@
+# app/tasks/delivery_task.py
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from app.models.outbox import OutboxJob
+from app.models.video import Video
+from app.models.webhook import Webhook
+from app.services.webhook_service import WebhookService, notification_payloads
+from app.services.http_client import webhook_http
+
+logger = logging.getLogger(__name__)
+
+# New videos whose delivery jobs are still missing after this long were lost by a
+# crash between storing them and queueing their notifications
+RECOVERY_GRACE_SECONDS = 300
+RECOVERY_SWEEP_SECONDS = 60
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+class DeliveryWorkers:
+    """
+    Webhook delivery from the outbox (see OutboxJob)
+
+    Detection only writes delivery jobs; WEBHOOK_CONCURRENCY worker threads claim
+    due jobs atomically and send them, so several processes can deliver side by
+    side. A failed delivery is retried up to MAX_RETRIES times, the first after
+    about RETRY_DELAY seconds and each later one after twice as long (capped at
+    OUTBOX_MAX_BACKOFF), with random jitter so retries to a receiver that was down
+    don't all arrive together.
+
+    Webhooks in digest mode get one request for several videos: in 'window' mode
+    the first new video opens a window of window_seconds and every video queued
+    before it closes is sent with it; in 'cycle' mode jobs are held under the
+    check cycle open in this process (open_cycle) until the monitor closes it
+    (close_cycle), or at the latest until the cycle's deadline. Without an open
+    cycle (e.g. a web process with RUN_MONITOR=False) jobs join the current
+    POLLING_INTERVAL-aligned slot instead, delivered when the slot ends. The
+    worker that claims the first due job of such a webhook gathers up to max_batch
+    of its unsent jobs into a batch, which is logged, retried and finished as one
+    delivery.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.app = None
+        self.threads = []
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop_event = threading.Event()
+        # Set by enqueue() so idle workers pick up new jobs without waiting for their next poll
+        self._wake_event = threading.Event()
+        self._last_sweep = None
+        # Check cycles open in this process, innermost last: [(cycle_id, deadline)]
+        self._cycles = []
+        self._cycles_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'delivered': 0, 'retried': 0, 'failed': 0, 'cancelled': 0, 'recovered': 0}
+
+    def start(self, app):
+        if self.running:
+            return
+
+        self.app = app
+        self.running = True
+        self._stop_event.clear()
+        count = max(int(app.config.get('WEBHOOK_CONCURRENCY', 8) or 1), 1)
+        self.threads = [
+            threading.Thread(target=self._worker_loop, args=(index,), name=f"webhook-delivery-{index}", daemon=True)
+            for index in range(count)
+        ]
+        for thread in self.threads:
+            thread.start()
+        logger.info(f"Started {count} webhook delivery workers")
+
+    def stop(self):
+        """Stop the workers; deliveries in progress finish (or their claims expire)"""
+        if not self.running:
+            return
+
+        self.running = False
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self.threads:
+            thread.join(timeout=15)
+        self.threads = []
+        # Close the kept-alive connections to webhook receivers
+        webhook_http.close()
+        logger.info("Webhook delivery workers stopped")
+
+    def enqueue(self, videos, is_manual=False):
+        """
+        Queue notifications of videos to every active webhook
+
+        Returns:
+            int: the number of delivery jobs written, or None if they couldn't be written
+        """
+        if not videos:
+            return 0
+
+        webhooks = Webhook.get_active()
+        written = OutboxJob.enqueue(videos, webhooks, is_manual=is_manual, plans=self._digest_plans(webhooks))
+        if written is None:
+            # Left for the recovery sweep
+            return None
+
+        Video.mark_queued([video['video_id'] for video in videos])
+        if written:
+            logger.info(f"Queued {written} webhook deliveries for {len(videos)} videos")
+            self._wake_event.set()
+        return written
+
+    def _digest_plans(self, webhooks):
+        """Initial status, due time and cycle of the new jobs of digest webhooks"""
+        now = datetime.utcnow()
+        plans = {}
+        for webhook in webhooks:
+            digest = Webhook.digest_settings(webhook)
+            if digest['mode'] == 'cycle':
+                cycle_id, deadline = self.current_cycle(now)
+                plans[webhook['_id']] = ('held', deadline, cycle_id)
+            elif digest['mode'] == 'window':
+                # Join the window already open for this webhook, or open one
+                due = OutboxJob.window_due(webhook['_id'])
+                plans[webhook['_id']] = ('pending', due or now + timedelta(seconds=int(digest['window_seconds'])), None)
+        return plans
+
+    def open_cycle(self, max_seconds):
+        """
+        Start a check cycle in this process; cycle digests queued until it closes go out together
+
+        Args:
+            max_seconds: deadline after which its held jobs are delivered even if the
+                         cycle is never closed (e.g. the process dies)
+
+        Returns:
+            str: the cycle ID to pass to close_cycle()
+        """
+        cycle_id = f"{self.worker_id}:{uuid.uuid4().hex[:12]}"
+        with self._cycles_lock:
+            self._cycles.append((cycle_id, datetime.utcnow() + timedelta(seconds=max_seconds)))
+        return cycle_id
+
+    def close_cycle(self, cycle_id):
+        """End a check cycle and release the digest jobs held for it"""
+        with self._cycles_lock:
+            self._cycles = [cycle for cycle in self._cycles if cycle[0] != cycle_id]
+
+        released = OutboxJob.release_cycle(cycle_id)
+        if released:
+            logger.info(f"Released {released} webhook deliveries held for check cycle {cycle_id}")
+            self._wake_event.set()
+        return released
+
+    def current_cycle(self, now=None):
+        """(cycle_id, deadline) that cycle digest jobs queued now belong to"""
+        now = now or datetime.utcnow()
+        with self._cycles_lock:
+            open_cycles = [cycle for cycle in self._cycles if cycle[1] > now]
+        if open_cycles:
+            return open_cycles[-1]
+
+        # No monitor cycle here: use the polling-interval slot, shared by every such process
+        interval = max(int(self._config('POLLING_INTERVAL', 3600)), 60)
+        slot = int((now - UNIX_EPOCH).total_seconds()) // interval
+        return f"slot:{interval}:{slot}", UNIX_EPOCH + timedelta(seconds=(slot + 1) * interval)
+
+    def _config(self, name, default):
+        try:
+            return current_app.config.get(name, default)
+        except RuntimeError:
+            # Outside an app context
+            return self.app.config.get(name, default) if self.app else default
+
+    def _worker_loop(self, index):
+        with self.app.app_context():
+            while not self._stop_event.is_set():
+                try:
+                    if index == 0:
+                        self._maybe_recover()
+
+                    if self.deliver_next():
+                        continue
+                except Exception as e:
+                    logger.error(f"Error in webhook delivery worker: {str(e)}")
+
+                poll = max(float(current_app.config.get('OUTBOX_POLL_SECONDS', 5)), 0.1)
+                self._wake_event.wait(poll)
+                self._wake_event.clear()
+
+    def deliver_next(self):
+        """
+        Claim one due job and deliver it (in the current app context)
+
+        Returns:
+            bool: False if no job was due
+        """
+        lease_seconds = max(int(current_app.config.get('OUTBOX_LEASE_SECONDS', 60)), 15)
+        job = OutboxJob.claim(self.worker_id, lease_seconds)
+        if job is None:
+            return False
+
+        webhook = Webhook.get_by_id(job['webhook_id'])
+        if not webhook or not webhook.get('active'):
+            self._finish(job, 'cancelled', 'Webhook was deleted or deactivated')
+            return True
+
+        digest = Webhook.digest_settings(webhook)
+        if job.get('batch_id') is not None or digest['mode'] != 'off':
+            return self._deliver_batch(job, webhook, digest)
+
+        # The stored video carries the enrichment done after detection
+        video = Video.get_by_id(job['video_id'])
+        if not video:
+            self._finish(job, 'cancelled', 'Video no longer exists')
+            return True
+
+        video['is_manual_notification'] = job.get('is_manual', False)
+        # The jobs of one video to its other webhooks reuse the same serialized body
+        payload = notification_payloads.get(video)
+        result = WebhookService.send_notification(webhook, video, payload=payload)
+
+        self._settle(job, webhook, result, job['video_id'])
+        return True
+
+    def _deliver_batch(self, job, webhook, digest):
+        """Deliver a claimed job together with the webhook's other unsent jobs as one digest"""
+        members = OutboxJob.gather_batch(job, max(int(digest['max_batch']), 1))
+        job['batch_id'] = job['_id']
+        jobs = [job] + members
+
+        videos_by_id = Video.get_by_ids([member['video_id'] for member in jobs])
+        videos = []
+        for member in jobs:
+            video = videos_by_id.get(member['video_id'])
+            if video:
+                video = dict(video, is_manual_notification=member.get('is_manual', False))
+                videos.append(video)
+        if not videos:
+            self._finish(job, 'cancelled', 'Videos no longer exist')
+            return True
+
+        result = WebhookService.send_digest(webhook, videos, batch_id=str(job['_id']))
+        self._settle(job, webhook, result, f"a digest of {len(videos)} videos", batch_size=len(jobs))
+        return True
+
+    def _settle(self, job, webhook, result, what, batch_size=1):
+        """Finish a sent job (and its batch) or schedule its retry"""
+        if result['success']:
+            self._finish(job, 'delivered', amount=batch_size)
+            return
+
+        error = result.get('message')
+        max_retries = int(current_app.config.get('MAX_RETRIES', 3))
+        if job['attempts'] > max_retries:
+            logger.error(f"Giving up on webhook delivery of {what} to {webhook.get('url')} "
+                         f"after {job['attempts']} attempts: {error}")
+            self._finish(job, 'failed', error, amount=batch_size)
+            return
+
+        delay = self.backoff(job['attempts'])
+        OutboxJob.retry_at(job, self.worker_id, datetime.utcnow() + timedelta(seconds=delay), error)
+        self._count('retried')
+        logger.warning(f"Webhook delivery of {what} to {webhook.get('url')} failed "
+                       f"(attempt {job['attempts']}/{max_retries + 1}), retrying in {delay:.0f}s: {error}")
+
+    @staticmethod
+    def backoff(attempts):
+        """Seconds before retry number attempts: exponential, capped, with jitter over its upper half"""
+        base = max(float(current_app.config.get('RETRY_DELAY', 300)), 1)
+        cap = max(float(current_app.config.get('OUTBOX_MAX_BACKOFF', 21600)), base)
+        delay = min(base * 2 ** max(attempts - 1, 0), cap)
+        return random.uniform(delay / 2, delay)
+
+    def _finish(self, job, status, error=None, amount=1):
+        OutboxJob.finish(job, self.worker_id, status, error)
+        self._count(status, amount)
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _maybe_recover(self):
+        now = time.monotonic()
+        if self._last_sweep is not None and now - self._last_sweep < RECOVERY_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        self.recover()
+
+    def recover(self):
+        """
+        Queue the notifications of new videos stored without delivery jobs (the process died in between)
+
+        (Jobs held for a cycle digest whose cycle is never closed need no sweep: they
+        become claimable at the cycle's deadline.)
+        """
+        videos = Video.get_unqueued(datetime.utcnow() - timedelta(seconds=RECOVERY_GRACE_SECONDS))
+        if not videos:
+            return 0
+
+        logger.warning(f"Recovering webhook notifications of {len(videos)} videos that were never queued")
+        self.enqueue(videos)
+        self._count('recovered', len(videos))
+        return len(videos)
+
+    def drain(self, time_budget):
+        """
+        Deliver due jobs in the current app context until none is left or time_budget seconds pass
+
+        Used where no workers run (the Vercel cron job).
+
+        Returns:
+            int: the number of jobs processed
+        """
+        deadline = time.monotonic() + time_budget
+        processed = 0
+        self.recover()
+        while time.monotonic() < deadline and self.deliver_next():
+            processed += 1
+        return processed
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['workers'] = len(self.threads) if self.running else 0
+        stats['jobs'] = OutboxJob.get_counts()
+        return stats
+
+# Create a singleton instance
+delivery_workers = DeliveryWorkers()
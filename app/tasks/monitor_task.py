@@ -3,21 +3,55 @@
 import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from app import mongo, socketio
-from app.services.youtube_service import YouTubeService
-from app.services.webhook_service import WebhookService
+from app.services.youtube_service import YouTubeService, VIDEOS_PER_REQUEST
+from app.services.http_client import youtube_http
+from app.services.video_index import known_videos
+from app.services.quota_service import quota_ledger, quota_breaker
+from app.services.api_key_pool import youtube_keys
+from app.services.websub_service import WebSubService
+from app.services.leader_lease import monitor_lease
+from app.tasks.scheduler import CheckScheduler, due_channels, MIN_WAKE_INTERVAL
+from app.tasks.claimer import ChannelClaimer
+from app.tasks.delivery_task import delivery_workers
+from app.models.channel import Channel
 from flask import current_app
 import os
 import traceback
 
 logger = logging.getLogger(__name__)
 
+# Longest time between re-reads of the channel list (new channels are also picked up via wake())
+SCHEDULE_RELOAD_SECONDS = 300
+
 class MonitorTask:
     def __init__(self):
         self.running = False
         self.thread = None
         self.app = None
+        # Set by stop() so in-progress check cycles and sleeps end early
+        self._stop_event = threading.Event()
+        # Set by wake() so the scheduler re-evaluates right away instead of finishing its wait
+        self._wake_event = threading.Event()
+        self._reload_requested = True
+        self._check_all_requested = False
+        self._last_reload = None
+        self.scheduler = CheckScheduler()
+        # Quota allowance (in channel checks) that builds up between scheduled checks
+        self._allowance = 0.0
+        self._last_plan_at = None
+        # Totals of the scheduled checks since the current summary window started
+        self._window_summary = None
+        self._window_started = None
+        # Delivery cycle of the current window; 'cycle' digests queued in it go out together
+        self._window_cycle = None
+        # Whether the loop ran as leader last time round (see monitor_lease)
+        self._leading = False
+        # CHECK_SHARDING: every process claims due channels instead of one leader checking them all
+        self._sharded = False
+        self.claimer = ChannelClaimer()
     
     def start(self, app=None):
         """Start the monitoring task"""
@@ -30,17 +64,41 @@ class MonitorTask:
             self.app = app
         
         self.running = True
+        self._stop_event.clear()
+        self._wake_event.clear()
+        self._reload_requested = True
+        self._leading = False
+        self._sharded = bool(self.app and self.app.config.get('CHECK_SHARDING'))
         self.thread = threading.Thread(target=self._monitor_loop)
         self.thread.daemon = True
         self.thread.start()
+        
+        # Every web worker starts a monitor; only the one holding the lease checks channels
+        # (with sharding all of them check, and the leader only renews WebSub subscriptions)
+        if self.app:
+            monitor_lease.start(self.app, on_change=self._on_leadership_change, on_request=self._on_lease_requests)
+            if self._sharded:
+                # Keeps this worker counted in the quota split while the check loop waits
+                self.claimer.start(self.app)
+            # Every monitor process also delivers queued webhook notifications (claims keep them apart)
+            delivery_workers.start(self.app)
         logger.info("Monitor task started")
     
     def stop(self):
         """Stop the monitoring task"""
         self.running = False
+        self._stop_event.set()
+        self._wake_event.set()
         if self.thread:
             self.thread.join(timeout=5)
             self.thread = None
+        # Send the cycle digests held for this window instead of waiting for its deadline
+        self._close_window_cycle()
+        # Hand the lease over right away instead of letting it expire
+        monitor_lease.stop()
+        if self._sharded:
+            self.claimer.stop()
+        delivery_workers.stop()
         logger.info("Monitor task stopped")
     
     def restart(self, app=None):
@@ -49,79 +107,344 @@ class MonitorTask:
         self.start(app)
         logger.info("Monitor task restarted")
     
+    @property
+    def is_leader(self):
+        """True if this process runs the checks (it holds the monitor lease, or checks are sharded)"""
+        return self.running and (self._sharded or monitor_lease.is_leader)
+    
+    def _on_leadership_change(self, is_leader):
+        # A new leader starts checking right away; a former one stops at its next channel
+        self._wake_event.set()
+    
+    def _on_lease_requests(self, actions):
+        """wake() calls made in follower processes, delivered with the lease renewal"""
+        self.wake(reload='reload' in actions, check_all='check_all' in actions)
+    
+    def wake(self, reload=False, check_all=False):
+        """
+        Interrupt the scheduler's wait (in the leader process, wherever this is called)
+        
+        Args:
+            reload: re-read the channel list and settings (a channel was added or the polling interval changed)
+            check_all: check every active channel now
+        
+        Returns:
+            bool: False if no monitor is running anywhere to act on it
+        """
+        if not self.is_leader:
+            # Followers and web processes without a monitor (RUN_MONITOR=False) pass it to the lease holder
+            if not monitor_lease.enabled:
+                return False
+            actions = [action for action, wanted in (('reload', reload), ('check_all', check_all)) if wanted]
+            delivered = all([monitor_lease.request(action) for action in actions])
+            return delivered or self.running
+        
+        if reload:
+            self._reload_requested = True
+        if check_all:
+            self._check_all_requested = True
+        self._wake_event.set()
+        return True
+    
     def _monitor_loop(self):
-        """Main monitoring loop"""
+        """Main monitoring loop: check channels as they fall due, then wait for the next one or a wake()"""
         while self.running:
             try:
-                # Create an application context for this thread
-                if self.app:
-                    with self.app.app_context():
-                        logger.info("Checking channels with application context")
-                        
-                        # Add a system event to record the current check time
-                        current_time = datetime.utcnow()
-                        try:
-                            if mongo.db is not None:
-                                mongo.db.system_events.insert_one({
-                                    'level': 'INFO',
-                                    'message': 'Automatic channel check initiated',
-                                    'timestamp': current_time,
-                                    'type': 'CHANNEL_CHECK',
-                                    'details': {'automatic': True}
-                                })
-                                logger.info(f"Starting scheduled check at {current_time}")
-                        except Exception as e:
-                            logger.error(f"Error adding system event for scheduled check: {str(e)}")
-                            
-                        # Run the actual channel check
-                        self._check_channels()
-                        
-                        # Get polling interval directly from current app config first, then fall back to environment
-                        polling_interval = current_app.config.get('POLLING_INTERVAL')
-                        logger.info(f"Got polling interval from app config: {polling_interval}")
-                        
-                        # Double-check with environment variable as backup
-                        env_polling_interval = os.environ.get('POLLING_INTERVAL')
-                        if env_polling_interval and env_polling_interval.isdigit():
-                            env_interval = int(env_polling_interval)
-                            if env_interval != polling_interval:
-                                logger.warning(f"Environment polling interval ({env_interval}) differs from app config ({polling_interval})")
-                                polling_interval = env_interval  # Prefer environment variable if different
-                        
-                        if not polling_interval or polling_interval < 60:
-                            polling_interval = 3600  # Default to 1 hour if invalid
-                            logger.warning(f"Invalid polling interval ({polling_interval}), using default of 3600 seconds")
-                            
-                        next_check_time = datetime.utcnow() + timedelta(seconds=polling_interval)
-                        logger.info(f"Next check in {polling_interval} seconds (at {next_check_time.strftime('%Y-%m-%d %H:%M:%S')})")
-                else:
+                if not self.app:
                     logger.error("No Flask app reference available for creating context")
-                    self._check_channels()
-                    
-                    # Get polling interval directly from environment even without app context
-                    env_polling_interval = os.environ.get('POLLING_INTERVAL')
-                    if env_polling_interval and env_polling_interval.isdigit():
-                        polling_interval = int(env_polling_interval)
-                    else:
-                        polling_interval = 3600  # Default to 1 hour if no app context or env variable
-                    
-                    next_check_time = datetime.utcnow() + timedelta(seconds=polling_interval)
-                    logger.info(f"Next check in {polling_interval} seconds (at {next_check_time.strftime('%Y-%m-%d %H:%M:%S')})")
+                    if self._stop_event.wait(60):
+                        break
+                    continue
                 
-                # Sleep outside the context
-                logger.info(f"Monitor thread sleeping for {polling_interval} seconds")
-                time.sleep(polling_interval)
-                logger.info("Monitor thread woke up, starting next check cycle")
+                if self._sharded:
+                    with self.app.app_context():
+                        wait_seconds = self._run_claimed_checks()
+                    self._wake_event.wait(wait_seconds)
+                    self._wake_event.clear()
+                    continue
+                
+                if not monitor_lease.is_leader:
+                    if self._leading:
+                        logger.info("Monitor lease lost, waiting as a follower")
+                        self._leading = False
+                    # Woken by the lease heartbeat once this process takes over
+                    self._wake_event.wait(monitor_lease.lease_seconds)
+                    self._wake_event.clear()
+                    continue
+                
+                if not self._leading:
+                    # Start from the stored schedule: another process may have been checking
+                    logger.info(f"Monitor lease held by {monitor_lease.holder_id}, running channel checks")
+                    self.scheduler = CheckScheduler()
+                    self._reload_requested = True
+                    self._leading = True
+                
+                # Create an application context for this thread
+                with self.app.app_context():
+                    wait_seconds = self._run_due_checks()
+                
+                # Sleep outside the context (wake() and stop() interrupt the wait)
+                logger.debug(f"Scheduler waiting {wait_seconds:.0f} seconds for the next due check")
+                self._wake_event.wait(wait_seconds)
+                self._wake_event.clear()
             except Exception as e:
                 logger.error(f"Error in monitor loop: {str(e)}")
                 traceback.print_exc()
-                time.sleep(60)  # Sleep for a minute before retrying
+                self._stop_event.wait(60)  # Sleep for a minute before retrying
+    
+    def _get_polling_interval(self):
+        """POLLING_INTERVAL from the app config, or from the environment if that differs"""
+        polling_interval = current_app.config.get('POLLING_INTERVAL')
+        
+        # Double-check with environment variable as backup
+        env_polling_interval = os.environ.get('POLLING_INTERVAL')
+        if env_polling_interval and env_polling_interval.isdigit():
+            env_interval = int(env_polling_interval)
+            if env_interval != polling_interval:
+                logger.warning(f"Environment polling interval ({env_interval}) differs from app config ({polling_interval})")
+                polling_interval = env_interval  # Prefer environment variable if different
+        
+        if not polling_interval or polling_interval < 60:
+            logger.warning(f"Invalid polling interval ({polling_interval}), using default of 3600 seconds")
+            polling_interval = 3600  # Default to 1 hour if invalid
+        
+        return polling_interval
+    
+    def _run_due_checks(self):
+        """
+        One scheduler step: refresh the schedule if needed and check the channels that are due
+        
+        Returns:
+            float: seconds to wait before the next step
+        """
+        polling_interval = self._get_polling_interval()
+        
+        reload_due = self._last_reload is None or time.monotonic() - self._last_reload >= min(polling_interval, SCHEDULE_RELOAD_SECONDS)
+        if self._reload_requested or reload_due or self.scheduler.polling_interval != polling_interval:
+            self._reload_schedule(polling_interval)
+        
+        if self._check_all_requested:
+            self._check_all_requested = False
+            self._record_check_event('Manual channel check initiated', {'manual': True})
+            # Checked channels are rescheduled one interval from now
+            self._check_channels()
+        
+        due_ids = self.scheduler.pop_due()
+        if due_ids:
+            self._check_scheduled(due_ids, polling_interval)
+        
+        wait_seconds = self.scheduler.seconds_until_next()
+        if wait_seconds is None:
+            return polling_interval
+        return min(max(wait_seconds, MIN_WAKE_INTERVAL), polling_interval)
     
-    def _check_channels(self):
-        """Check all active channels for new videos"""
+    def _reload_schedule(self, polling_interval):
+        """Read the active channels into the scheduler and renew WebSub subscriptions that are due"""
+        self._reload_requested = False
+        self._last_reload = time.monotonic()
+        
         if mongo.db is None:
-            logger.error("MongoDB connection not available, skipping channel check")
+            logger.error("MongoDB connection not available, cannot load the check schedule")
             return
+        
+        channels = list(mongo.db.channels.find(
+            {'active': True},
+            {'channel_id': 1, 'next_check_at': 1, 'last_checked': 1, 'websub': 1}
+        ))
+        
+        if WebSubService.enabled():
+            WebSubService.renew_subscriptions(channels)
+        
+        previous_interval = self.scheduler.polling_interval
+        if previous_interval is None:
+            self.scheduler.load(channels, polling_interval)
+        elif previous_interval != polling_interval:
+            # A new interval applies right away: reschedule from each channel's last check
+            logger.info(f"Polling interval changed from {previous_interval} to {polling_interval} seconds, rescheduling")
+            self.scheduler.load(channels, polling_interval,
+                                reschedule=not current_app.config.get('ADAPTIVE_POLLING'))
+        else:
+            self.scheduler.sync(channels)
+    
+    def _check_scheduled(self, due_ids, polling_interval):
+        """Check channels popped from the scheduler, within the quota allowance"""
+        summary = self._summary_window(polling_interval)
+        now = datetime.utcnow()
+        
+        # Don't send requests we know will fail while the quota is exhausted
+        if quota_breaker.is_open():
+            breaker_state = quota_breaker.get_state()
+            logger.warning(f"YouTube quota circuit breaker is open until {breaker_state['open_until']} UTC, "
+                           f"deferring {len(due_ids)} channel checks")
+            resume_at = breaker_state['open_until'] or now + timedelta(seconds=MIN_WAKE_INTERVAL)
+            self.scheduler.defer(due_ids, resume_at, spread_seconds=polling_interval)
+            summary['skipped'] += len(due_ids)
+            return
+        
+        allowed, per_second = self._quota_allowance(polling_interval)
+        if allowed < len(due_ids):
+            deferred = due_ids[allowed:]
+            spread_seconds = min(len(deferred) / per_second, polling_interval) if per_second else polling_interval
+            logger.info(f"Quota allows {allowed} of {len(due_ids)} due channel checks now, "
+                        f"deferring the rest over {spread_seconds:.0f} seconds")
+            self.scheduler.defer(deferred, now + timedelta(seconds=MIN_WAKE_INTERVAL), spread_seconds=spread_seconds)
+            due_ids = due_ids[:allowed]
+        
+        if not due_ids:
+            return
+        self._allowance -= len(due_ids)
+        
+        # Most overdue first, as popped
+        order = {channel_id: position for position, channel_id in enumerate(due_ids)}
+        channels = list(mongo.db.channels.find({'active': True, 'channel_id': {'$in': due_ids}}))
+        channels.sort(key=lambda channel: order[channel['channel_id']])
+        
+        skipped_ids = self._run_checks(channels, summary)
+        if skipped_ids:
+            self.scheduler.defer(skipped_ids, datetime.utcnow() + timedelta(seconds=MIN_WAKE_INTERVAL))
+    
+    def _quota_allowance(self, polling_interval, share=1):
+        """
+        Add the quota budget for the time since the last scheduled checks to the allowance
+        
+        Args:
+            share: number of processes splitting the budget (sharded workers)
+        
+        Returns:
+            tuple: (channel checks allowed now, allowance gained per second)
+        """
+        now = time.monotonic()
+        if self._last_plan_at is None:
+            elapsed = polling_interval
+        else:
+            elapsed = min(now - self._last_plan_at, polling_interval)
+        self._last_plan_at = now
+        
+        # Size the budget from the quota left today and the observed cost per channel check
+        plan = quota_ledger.plan_cycle(polling_interval, remaining=youtube_keys.remaining_units())
+        per_second = plan['channel_allowance'] / max(share, 1) / polling_interval
+        
+        # Unused allowance carries over, up to one polling interval's worth
+        self._allowance = min(self._allowance + per_second * elapsed, per_second * polling_interval)
+        return max(int(self._allowance), 0), per_second
+    
+    def _run_claimed_checks(self):
+        """
+        One step of a sharded worker: claim a batch of due channels, check them and release them
+        
+        Returns:
+            float: seconds to wait before the next step (0 while there is more due work)
+        """
+        polling_interval = self._get_polling_interval()
+        
+        # Subscription upkeep needs only one process
+        reload_due = self._last_reload is None or time.monotonic() - self._last_reload >= min(polling_interval, SCHEDULE_RELOAD_SECONDS)
+        if (self._reload_requested or reload_due) and mongo.db is not None:
+            self._reload_requested = False
+            self._last_reload = time.monotonic()
+            if WebSubService.enabled() and monitor_lease.is_leader:
+                WebSubService.renew_subscriptions(list(mongo.db.channels.find({'active': True}, {'channel_id': 1, 'websub': 1})))
+        
+        if self._check_all_requested:
+            self._check_all_requested = False
+            self._record_check_event('Manual channel check initiated', {'manual': True})
+            # Every worker picks these up as due
+            Channel.mark_all_due()
+        
+        if quota_breaker.is_open():
+            open_until = quota_breaker.get_state()['open_until'] or datetime.utcnow()
+            logger.warning(f"YouTube quota circuit breaker is open until {open_until} UTC, not claiming channels")
+            return min(max((open_until - datetime.utcnow()).total_seconds(), MIN_WAKE_INTERVAL), polling_interval)
+        
+        allowed, per_second = self._quota_allowance(polling_interval, share=self.claimer.live_workers())
+        if allowed < 1:
+            # Wait until the allowance has grown by one check
+            return min(max(1 / per_second, MIN_WAKE_INTERVAL), polling_interval) if per_second else polling_interval
+        
+        claimed = self.claimer.claim(allowed)
+        if claimed:
+            self._allowance -= len(claimed)
+            summary = self._summary_window(polling_interval)
+            try:
+                self._run_checks(claimed, summary)
+            finally:
+                # Checked channels were rescheduled; skipped ones are claimable again right away
+                self.claimer.release([channel['channel_id'] for channel in claimed])
+            
+            if len(claimed) == min(allowed, self.claimer.batch_size()):
+                return 0
+        
+        next_due = Channel.next_due_at()
+        if next_due is None:
+            return polling_interval
+        return min(max((next_due - datetime.utcnow()).total_seconds(), MIN_WAKE_INTERVAL), polling_interval)
+    
+    def _summary_window(self, polling_interval):
+        """The summary scheduled checks add to; a window's totals are recorded once per polling interval"""
+        now = time.monotonic()
+        if self._window_summary is not None and now - self._window_started >= polling_interval:
+            self._record_cycle_summary(self._window_summary)
+            self._window_summary = None
+            self._close_window_cycle()
+        
+        if self._window_summary is None:
+            self._window_summary = self._new_summary()
+            self._window_started = now
+            self._window_cycle = delivery_workers.open_cycle(polling_interval)
+            self._record_check_event('Automatic channel check initiated', {'automatic': True})
+        
+        return self._window_summary
+    
+    def _close_window_cycle(self):
+        if self._window_cycle is not None:
+            delivery_workers.close_cycle(self._window_cycle)
+            self._window_cycle = None
+    
+    @staticmethod
+    def _new_summary():
+        return {
+            'channels_checked': 0,
+            'not_modified': 0,
+            'new_videos': 0,
+            'errors': 0,
+            'skipped': 0,
+            'push_subscribed': 0
+        }
+    
+    @staticmethod
+    def _record_check_event(message, details):
+        """Add a CHANNEL_CHECK system event (the dashboard shows the latest as the last check time)"""
+        current_time = datetime.utcnow()
+        try:
+            if mongo.db is not None:
+                mongo.db.system_events.insert_one({
+                    'level': 'INFO',
+                    'message': message,
+                    'timestamp': current_time,
+                    'type': 'CHANNEL_CHECK',
+                    'details': details
+                })
+                logger.info(f"Added system event for channel check at {current_time}")
+        except Exception as e:
+            logger.error(f"Error adding system event for channel check: {str(e)}")
+    
+    def _check_channels(self, due_only=False):
+        """
+        Check all active channels for new videos in one cycle
+        
+        The running monitor checks channels as they fall due (see _run_due_checks); a full
+        cycle is used for 'Check now' and by the cron job, where there is no scheduler.
+        
+        Args:
+            due_only: only check channels whose next_check_at has passed
+        
+        Returns:
+            dict: cycle summary (channels checked, unchanged, new videos, errors, skipped),
+                  or None if the check could not run
+        """
+        if mongo.db is None:
+            logger.error("MongoDB connection not available, skipping channel check")
+            return None
             
         # Get all active channels
         try:
@@ -130,17 +453,32 @@ class MonitorTask:
             
             # Sort channels by last checked time so we prioritize channels that haven't been checked in a while
             # This helps distribute the API quota more fairly
-            active_channels.sort(key=lambda channel: channel.get('last_checked', datetime(1970, 1, 1)))
+            active_channels.sort(key=lambda channel: channel.get('last_checked') or datetime(1970, 1, 1))
+            
+            summary = self._new_summary()
             
-            # Calculate quota limits - don't check all channels every time
-            # YouTube API has a daily quota limit, so we need to be careful
-            daily_quota_target = 10000  # Standard free quota
-            # Estimated units per channel check (search API costs 100 units)
-            estimated_units_per_check = 100
+            if WebSubService.enabled():
+                WebSubService.renew_subscriptions(active_channels)
             
-            # Calculate max channels we should check in one cycle to stay within quota
-            cycles_per_day = 86400 / current_app.config.get('POLLING_INTERVAL', 3600)
-            max_channels_per_cycle = int(daily_quota_target / (cycles_per_day * estimated_units_per_check))
+            if due_only:
+                active_channels = due_channels(active_channels)
+                logger.info(f"{len(active_channels)} channels are due for a check")
+            
+            # Don't send requests we know will fail while the quota is exhausted
+            if quota_breaker.is_open():
+                breaker_state = quota_breaker.get_state()
+                logger.warning(f"YouTube quota circuit breaker is open until {breaker_state['open_until']} UTC, skipping this cycle")
+                summary['skipped'] = len(active_channels)
+                return summary
+            
+            # Size the cycle from the quota left today and the observed cost per channel check
+            plan = quota_ledger.plan_cycle(
+                current_app.config.get('POLLING_INTERVAL', 3600),
+                remaining=youtube_keys.remaining_units()
+            )
+            max_channels_per_cycle = plan['max_channels']
+            logger.info(f"Quota plan: {plan['remaining']} units left over {plan['cycles_left']} cycles, "
+                        f"{plan['cycle_budget']} units this cycle at ~{plan['cost_per_check']} units per channel")
             
             # Limit the number of channels we check in one go
             if len(active_channels) > max_channels_per_cycle:
@@ -149,55 +487,258 @@ class MonitorTask:
             else:
                 channels_to_check = active_channels
             
-            for channel in channels_to_check:
-                try:
-                    logger.info(f"Checking channel: {channel.get('channel_name', 'Unknown')} ({channel['channel_id']})")
-                    
-                    # Check for new videos
-                    new_videos = YouTubeService.check_channel_for_new_videos(channel['channel_id'])
+            # 'cycle' digests of this run go out when it ends
+            cycle_id = delivery_workers.open_cycle(current_app.config.get('POLLING_INTERVAL', 3600))
+            try:
+                self._run_checks(channels_to_check, summary)
+            finally:
+                delivery_workers.close_cycle(cycle_id)
+            self._record_cycle_summary(summary)
+            return summary
+        except Exception as e:
+            logger.error(f"Error retrieving active channels: {str(e)}")
+            return None
+    
+    def _run_checks(self, channels, summary):
+        """
+        Check the given channels, announce their new videos and schedule their next checks
+        
+        Adds the results to summary.
+        
+        Returns:
+            list: IDs of channels that were skipped (monitor stopping or quota exhausted)
+        """
+        # New videos waiting for batched enrichment (videos.list takes 50 IDs per call)
+        pending_videos = []
+        checked_channels = []
+        skipped_ids = []
+        
+        # Channels are checked sequentially or by a worker pool (CHECK_CONCURRENCY);
+        # results are aggregated here on the monitor thread either way
+        for channel, result in self._iter_channel_checks(channels):
+            try:
+                if result.get('skipped'):
+                    summary['skipped'] += 1
+                    skipped_ids.append(channel['channel_id'])
+                    continue
+                
+                new_videos = result['new_videos']
+                
+                summary['channels_checked'] += 1
+                checked_channels.append(channel)
+                if result['not_modified']:
+                    summary['not_modified'] += 1
+                if result['error']:
+                    summary['errors'] += 1
+                summary['new_videos'] += len(new_videos)
+                
+                if new_videos:
+                    logger.info(f"Found {len(new_videos)} new videos for channel {channel.get('channel_name', 'Unknown')}")
+                    pending_videos.extend((channel, video) for video in new_videos)
                     
-                    if new_videos:
-                        logger.info(f"Found {len(new_videos)} new videos for channel {channel.get('channel_name', 'Unknown')}")
-                        
-                        # Process each new video
-                        for video in new_videos:
-                            # Emit socket event for real-time updates
-                            try:
-                                socketio.emit('new_video', {
-                                    'video_id': video['video_id'],
-                                    'channel_id': video['channel_id'],
-                                    'title': video['title'],
-                                    'thumbnail_url': video['thumbnail_url'],
-                                    'channel_name': channel.get('channel_name', 'Unknown')
-                                })
-                            except Exception as e:
-                                logger.error(f"Error emitting socket event: {str(e)}")
-                            
-                            # Send webhook notifications
-                            try:
-                                notification_result = WebhookService.notify_all_webhooks(video, is_manual=False)
-                                
-                                if notification_result['success_count'] > 0:
-                                    logger.info(f"Sent {notification_result['success_count']} webhook notifications for video: {video['title']}")
-                                    
-                                    if notification_result.get('errors'):
-                                        logger.warning(f"Some webhook notifications failed: {', '.join(notification_result['errors'][:3])}")
-                                        if len(notification_result['errors']) > 3:
-                                            logger.warning(f"...and {len(notification_result['errors']) - 3} more errors")
-                                else:
-                                    logger.warning(f"Failed to send webhook notifications for video: {video['title']}")
-                                    if notification_result.get('errors'):
-                                        logger.error(f"Webhook errors: {', '.join(notification_result['errors'][:3])}")
-                            except Exception as e:
-                                logger.error(f"Error sending webhook notifications: {str(e)}")
-                                logger.error(traceback.format_exc())
-                    else:
-                        logger.info(f"No new videos found for channel {channel.get('channel_name', 'Unknown')}")
+                    if len(pending_videos) >= VIDEOS_PER_REQUEST:
+                        self._process_new_videos(pending_videos)
+                        pending_videos = []
+                else:
+                    logger.info(f"No new videos found for channel {channel.get('channel_name', 'Unknown')}")
+            
+            except Exception as e:
+                summary['errors'] += 1
+                logger.error(f"Error checking channel {channel.get('channel_name', channel.get('channel_id', 'Unknown'))}: {str(e)}")
+        
+        # Enrich and notify whatever is left at the end of the run
+        self._process_new_videos(pending_videos)
+        
+        # Schedule each checked channel's next check (and store it so a restart resumes the schedule)
+        try:
+            summary['push_subscribed'] += self.scheduler.schedule_checked(checked_channels, track=not self._sharded)
+        except Exception as e:
+            logger.error(f"Error scheduling next channel checks: {str(e)}")
+        
+        # Feed the observed cost per channel check back into the next plan
+        quota_ledger.record_channel_checks(len(checked_channels))
+        quota_ledger.flush()
+        
+        return skipped_ids
+
+    def _iter_channel_checks(self, channels):
+        """
+        Check channels for new videos and yield (channel, result) as each check completes
+        
+        With CHECK_CONCURRENCY > 1 the checks run on a bounded thread pool; each worker gets
+        its own app context and shares the pooled HTTP client. Channels not yet started when
+        stop() is called are skipped.
+        """
+        if current_app.config.get('CHECK_ENGINE', 'sync') == 'async' and channels:
+            if current_app.config.get('DETECTION_MODE', 'api') == 'rss':
+                # The async engine talks to the Data API directly and has no feed probe
+                logger.warning("DETECTION_MODE=rss is not supported by the async engine, using thread-pool checks")
+            else:
+                try:
+                    yield from self._run_async_engine(channels)
+                    return
+                except ImportError as e:
+                    logger.error(f"Async check engine unavailable ({str(e)}), falling back to sync checks")
+        
+        concurrency = max(int(current_app.config.get('CHECK_CONCURRENCY', 1) or 1), 1)
+        
+        if concurrency == 1 or len(channels) <= 1:
+            for channel in channels:
+                yield channel, self._check_single_channel(channel)
+            return
+        
+        pool_size = current_app.config.get('HTTP_POOL_SIZE', 20)
+        if concurrency > pool_size:
+            logger.warning(f"CHECK_CONCURRENCY ({concurrency}) is larger than HTTP_POOL_SIZE ({pool_size}); "
+                           f"some connections will not be reused")
+        
+        app = current_app._get_current_object()
+        logger.info(f"Checking {len(channels)} channels with {concurrency} workers")
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='channel-check')
+        try:
+            futures = {
+                executor.submit(self._check_channel_in_context, app, channel): channel
+                for channel in channels
+            }
+            
+            for future in as_completed(futures):
+                channel = futures[future]
+                if future.cancelled():
+                    result = {'channel_id': channel.get('channel_id'), 'skipped': True}
+                else:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'channel_id': channel.get('channel_id'), 'new_videos': [],
+                                  'not_modified': False, 'error': str(e)}
+                
+                yield channel, result
                 
-                except Exception as e:
-                    logger.error(f"Error checking channel {channel.get('channel_name', channel.get('channel_id', 'Unknown'))}: {str(e)}")
+                if self._stop_event.is_set():
+                    # Drop queued checks; the ones already running finish normally
+                    for pending in futures:
+                        pending.cancel()
+        finally:
+            executor.shutdown(wait=True)
+    
+    def _run_async_engine(self, channels):
+        """Check all channels on one asyncio event loop (CHECK_ENGINE=async)"""
+        from app.services.async_check_engine import AsyncCheckEngine
+        
+        config = current_app.config
+        if not youtube_keys.has_keys():
+            logger.error("YouTube API key is not set in either app config or environment variables")
+            return []
+        
+        deadline = config.get('ASYNC_CYCLE_DEADLINE', 0)
+        engine = AsyncCheckEngine(
+            current_app._get_current_object(),
+            max_in_flight=config.get('ASYNC_MAX_IN_FLIGHT', 50),
+            deadline=deadline if deadline and deadline > 0 else None,
+            connect_timeout=config.get('HTTP_CONNECT_TIMEOUT', 5),
+            read_timeout=config.get('HTTP_READ_TIMEOUT', 15),
+            should_stop=self._stop_event.is_set,
+            fresh_for=config.get('CHECK_FRESHNESS_SECONDS', 60)
+        )
+        logger.info(f"Checking {len(channels)} channels with the async engine "
+                    f"({engine.max_in_flight} requests in flight, deadline: {engine.deadline or 'none'})")
+        # As in _check_single_channel, the caller that ran a shared check announces its new videos
+        return [
+            (channel, dict(result, new_videos=[]) if result.get('shared') else result)
+            for channel, result in engine.run(channels)
+        ]
+    
+    def _check_channel_in_context(self, app, channel):
+        """Run a single channel check on a worker thread"""
+        with app.app_context():
+            return self._check_single_channel(channel)
+    
+    def _check_single_channel(self, channel):
+        """Check one channel, returning the YouTubeService.check_channel result"""
+        # Skip the rest of the cycle once the monitor stops, loses its lease or the quota runs out
+        if self._stop_event.is_set() or quota_breaker.is_open() or (self.running and not self.is_leader):
+            return {'channel_id': channel.get('channel_id'), 'skipped': True}
+        
+        logger.info(f"Checking channel: {channel.get('channel_name', 'Unknown')} ({channel['channel_id']})")
+        
+        try:
+            # Enrichment is done by the monitor for the whole cycle
+            result = YouTubeService.check_channel(channel['channel_id'], enrich=False)
+            if result.get('shared'):
+                # Another caller ran this check and announces its new videos; don't announce them twice
+                result = dict(result, new_videos=[])
+            return result
         except Exception as e:
-            logger.error(f"Error retrieving active channels: {str(e)}")
+            logger.error(f"Error checking channel {channel.get('channel_name', channel.get('channel_id', 'Unknown'))}: {str(e)}")
+            return {'channel_id': channel.get('channel_id'), 'new_videos': [], 'not_modified': False, 'error': str(e)}
+    
+    def _record_cycle_summary(self, summary):
+        """Log the results of a check cycle and store them as a system event"""
+        logger.info(
+            f"Check cycle complete: {summary['channels_checked']} channels checked, "
+            f"{summary['not_modified']} unchanged (ETag cache hits), "
+            f"{summary['new_videos']} new videos, {summary['errors']} errors, "
+            f"{summary['skipped']} skipped, {summary.get('push_subscribed', 0)} left to WebSub push"
+        )
+        
+        try:
+            if mongo.db is not None:
+                mongo.db.system_events.insert_one({
+                    'level': 'INFO',
+                    'message': (f"Channel check completed: {summary['channels_checked']} checked, "
+                                f"{summary['not_modified']} unchanged, {summary['new_videos']} new videos"),
+                    'timestamp': datetime.utcnow(),
+                    'type': 'CHANNEL_CHECK_SUMMARY',
+                    'details': dict(summary)
+                })
+        except Exception as e:
+            logger.error(f"Error adding system event for check summary: {str(e)}")
+        
+        # Log connection reuse so we can confirm the pooled client is doing its job
+        for host, host_stats in youtube_http.get_stats()['hosts'].items():
+            logger.info(f"HTTP connection reuse for {host}: {host_stats['reused']}/{host_stats['requests']} requests "
+                        f"reused a connection ({host_stats['connections']} opened)")
+    
+    def _process_new_videos(self, pending_videos, enrich=True):
+        """
+        Enrich a batch of newly detected videos, then emit socket events and queue webhook notifications
+        
+        Args:
+            pending_videos: list of (channel, video) tuples
+            enrich: False if the videos already carry duration and statistics
+        """
+        if not pending_videos:
+            return
+        
+        if enrich:
+            try:
+                YouTubeService.enrich_videos([video for _, video in pending_videos])
+            except Exception as e:
+                logger.error(f"Error enriching new videos: {str(e)}")
+        
+        for channel, video in pending_videos:
+            # Emit socket event for real-time updates
+            try:
+                socketio.emit('new_video', {
+                    'video_id': video['video_id'],
+                    'channel_id': video['channel_id'],
+                    'title': video['title'],
+                    'thumbnail_url': video['thumbnail_url'],
+                    'channel_name': channel.get('channel_name', 'Unknown')
+                })
+            except Exception as e:
+                logger.error(f"Error emitting socket event: {str(e)}")
+        
+        # Queue webhook notifications; the delivery workers send them
+        try:
+            written = delivery_workers.enqueue([video for _, video in pending_videos])
+            if written is None:
+                logger.error(f"Could not queue webhook notifications for {len(pending_videos)} videos, "
+                             f"the recovery sweep will retry")
+        except Exception as e:
+            logger.error(f"Error queueing webhook notifications: {str(e)}")
+            logger.error(traceback.format_exc())
 
 # Create a singleton instance
 monitor = MonitorTask()
@@ -209,42 +750,37 @@ def setup_monitor(app):
     # Store the app reference for creating context
     monitor.app = app
     
+    # Load known video IDs in the background; checks fall back to the database until it's ready
+    if not known_videos.ready:
+        known_videos.build_in_background(app)
+    
     # Start the monitor immediately in all environments
     if not monitor.running:
         logger.info("Starting monitor task immediately")
+        # Channels that are due (or were never checked) are checked right away;
+        # the rest resume their stored schedule
         monitor.start(app)
-        
-        # Do an immediate check to ensure it's working
-        run_immediate_check(app)
     
     return monitor
 
+def notify_new_videos(pending_videos, enrich=True):
+    """Announce videos found outside a check run (WebSub pushes, checks from page views) the same way the monitor does"""
+    monitor._process_new_videos(pending_videos, enrich=enrich)
+
 def run_immediate_check(app):
-    """Run an immediate check for new videos"""
+    """Check every active channel now (the running monitor does it on its own thread)"""
     logger.info("Running immediate check for new videos")
     
-    # Create a new thread for immediate check
+    # Runs in whichever process holds the monitor lease (possibly a standalone worker)
+    if monitor.wake(check_all=True):
+        return
+    
+    # No monitor anywhere (e.g. Vercel): check on a thread of our own
     def _immediate_check():
         with app.app_context():
             try:
                 logger.info("Performing immediate channel check")
-                
-                # Add a system event to record the current check time
-                current_time = datetime.utcnow()
-                try:
-                    if mongo.db is not None:
-                        mongo.db.system_events.insert_one({
-                            'level': 'INFO',
-                            'message': 'Manual channel check initiated',
-                            'timestamp': current_time,
-                            'type': 'CHANNEL_CHECK',
-                            'details': {'manual': True}
-                        })
-                        logger.info(f"Added system event for channel check at {current_time}")
-                except Exception as e:
-                    logger.error(f"Error adding system event: {str(e)}")
-                
-                # Run the actual check
+                monitor._record_check_event('Manual channel check initiated', {'manual': True})
                 monitor._check_channels()
                 logger.info("Immediate check completed")
             except Exception as e:
@@ -0,0 +1,190 @@
+# app/tasks/scheduler.py
+
+import heapq
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from app.models.channel import Channel
+from app.services.cadence_service import CadenceService
+from app.services.websub_service import WebSubService
+
+logger = logging.getLogger(__name__)
+
+# Checks due within this many seconds of each other are run together
+MIN_WAKE_INTERVAL = 5
+
+class CheckScheduler:
+    """
+    Due-time heap of channel checks
+
+    Each active channel has one entry keyed by its next_check_at. After a check the
+    next one is scheduled one interval later (POLLING_INTERVAL, or the channel's
+    learned interval with ADAPTIVE_POLLING) with +/- SCHEDULE_JITTER so checks stay
+    spread out instead of lining up into bursts. next_check_at is stored on the
+    channel, so a restart resumes the schedule; overdue channels are spread
+    evenly over one polling interval when the schedule is loaded.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}  # channel_id -> due time of its live heap entry
+        self._counter = 0
+        self._lock = threading.Lock()
+        self.polling_interval = None
+
+    def __len__(self):
+        return len(self._due)
+
+    def _push(self, channel_id, due):
+        """Add or move a channel's entry (called with the lock held); stale entries are skipped on pop"""
+        self._due[channel_id] = due
+        self._counter += 1
+        heapq.heappush(self._heap, (due, self._counter, channel_id))
+
+    def push(self, channel_id, due):
+        with self._lock:
+            self._push(channel_id, due)
+
+    def load(self, channels, polling_interval, now=None, reschedule=False):
+        """
+        Rebuild the heap from channel documents
+
+        Channels that were never checked are due now. Channels with a stored
+        next_check_at keep it; overdue ones are spread evenly over one polling
+        interval so a restart after downtime doesn't check them all at once.
+        With reschedule (the polling interval changed), due times are worked out
+        from last_checked and the new interval instead.
+        """
+        now = now or datetime.utcnow()
+        overdue = []
+
+        with self._lock:
+            self._heap = []
+            self._due = {}
+            self.polling_interval = polling_interval
+
+            for channel in channels:
+                due = self._stored_due(channel, polling_interval, reschedule)
+                if due is None:
+                    self._push(channel['channel_id'], now)
+                elif due <= now:
+                    overdue.append((due, channel['channel_id']))
+                else:
+                    self._push(channel['channel_id'], due)
+
+            overdue.sort()
+            for position, (_, channel_id) in enumerate(overdue):
+                self._push(channel_id, now + timedelta(seconds=polling_interval * position / len(overdue)))
+
+        logger.info(f"Check schedule loaded: {len(self._due)} channels, {len(overdue)} overdue spread over {polling_interval}s")
+
+    def sync(self, channels, now=None):
+        """Add channels that aren't scheduled yet and drop the ones no longer active"""
+        now = now or datetime.utcnow()
+        active_ids = {channel['channel_id'] for channel in channels}
+
+        with self._lock:
+            for channel_id in [channel_id for channel_id in self._due if channel_id not in active_ids]:
+                del self._due[channel_id]
+
+            for channel in channels:
+                if channel['channel_id'] not in self._due:
+                    due = self._stored_due(channel, self.polling_interval or 3600)
+                    self._push(channel['channel_id'], max(due, now) if due else now)
+
+    @staticmethod
+    def _stored_due(channel, polling_interval, reschedule=False):
+        if channel.get('next_check_at') and not reschedule:
+            return channel['next_check_at']
+        if channel.get('last_checked'):
+            return channel['last_checked'] + timedelta(seconds=polling_interval)
+        return None
+
+    def pop_due(self, now=None):
+        """Remove and return the IDs of every channel that is due, most overdue first"""
+        now = now or datetime.utcnow()
+        due_ids = []
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due, _, channel_id = heapq.heappop(self._heap)
+                if self._due.get(channel_id) == due:
+                    del self._due[channel_id]
+                    due_ids.append(channel_id)
+        return due_ids
+
+    def defer(self, channel_ids, until, spread_seconds=MIN_WAKE_INTERVAL):
+        """Put channels back to be checked from the given time on, spread over spread_seconds"""
+        with self._lock:
+            for position, channel_id in enumerate(channel_ids):
+                self._push(channel_id, until + timedelta(seconds=spread_seconds * position / max(len(channel_ids), 1)))
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the earliest live entry is due, or None when nothing is scheduled"""
+        now = now or datetime.utcnow()
+
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return max((self._heap[0][0] - now).total_seconds(), 0)
+
+    def schedule_checked(self, channels, now=None, track=True):
+        """
+        Schedule and store the next check of channels that were just checked
+
+        With track=False the next checks are only stored (sharded workers claim them from the database).
+
+        Returns:
+            int: how many of them are covered by WebSub push (scheduled at the safety-net interval)
+        """
+        if not channels:
+            return 0
+
+        now = now or datetime.utcnow()
+        config = current_app.config
+        polling_interval = config.get('POLLING_INTERVAL', 3600)
+        jitter = min(max(config.get('SCHEDULE_JITTER', 0.1), 0), 0.5)
+
+        channel_ids = [channel['channel_id'] for channel in channels]
+        if CadenceService.enabled():
+            schedules = CadenceService.plan_intervals(channel_ids, now)
+        else:
+            schedules = {channel_id: {'check_interval': polling_interval} for channel_id in channel_ids}
+
+        push_covered = 0
+        websub = WebSubService.enabled()
+        safety_net = config.get('WEBSUB_SAFETY_NET_INTERVAL', 21600)
+
+        for channel in channels:
+            schedule = schedules[channel['channel_id']]
+            interval = schedule['check_interval']
+            if websub and WebSubService.is_healthy(channel, now) and safety_net > interval:
+                # Pushes cover this channel; poll it only as a safety net
+                interval = safety_net
+                push_covered += 1
+
+            interval *= 1 + random.uniform(-jitter, jitter)
+            schedule['next_check_at'] = now + timedelta(seconds=interval)
+
+        Channel.set_schedules(schedules)
+        if not track:
+            return push_covered
+
+        with self._lock:
+            for channel_id, schedule in schedules.items():
+                self._push(channel_id, schedule['next_check_at'])
+        return push_covered
+
+def due_channels(channels, now=None):
+    """
+    Channels whose next_check_at has passed (or that were never scheduled), most overdue first
+    Used where there is no running scheduler, e.g. the Vercel cron job
+    """
+    now = now or datetime.utcnow()
+    due = [channel for channel in channels if not channel.get('next_check_at') or channel['next_check_at'] <= now]
+    due.sort(key=lambda channel: channel.get('next_check_at') or datetime(1970, 1, 1))
+    return due
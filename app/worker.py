@@ -0,0 +1,54 @@
+# app/worker.py
+"""
+Standalone monitor worker: runs the check scheduler, detection and webhook delivery
+without serving any HTTP.
+
+    python -m app.worker
+
+Run the web processes with RUN_MONITOR=False so they only serve the UI/API, and
+point every process at the same SOCKETIO_MESSAGE_QUEUE so 'new_video' events
+emitted here reach the browsers connected to the web processes. Several workers
+can run side by side: one holds the monitor lease, or all of them share the
+checks with CHECK_SHARDING=True.
+"""
+
+import logging
+import os
+import signal
+import threading
+
+# Named explicitly: run with -m, __name__ is '__main__'
+logger = logging.getLogger('app.worker')
+
+def main():
+    # No eventlet here: the monitor uses plain threads, and emits only go to the message queue
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+
+    from app import create_app
+    from app.tasks.monitor_task import monitor, setup_monitor
+
+    app = create_app(start_monitor=False)
+    if not app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+        logger.warning("SOCKETIO_MESSAGE_QUEUE is not set; new-video events won't reach web clients")
+
+    stopping = threading.Event()
+
+    def _shutdown(signum, frame):
+        logger.info(f"Received signal {signum}, stopping the monitor worker")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    setup_monitor(app)
+    logger.info("Monitor worker running")
+
+    while monitor.running and not stopping.wait(1):
+        pass
+
+    # Releases the monitor lease so another worker takes over right away
+    monitor.stop()
+    logger.info("Monitor worker stopped")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_check_engines.py
+"""
+Compare the fetch throughput of the detection engines against a local fake YouTube API.
+
+    python -m benchmarks.bench_check_engines --sizes 100 1000 10000 --latency 0.02
+
+Only the HTTP fetch stage is measured (no MongoDB): the sync engine sequentially and
+with a thread pool (CHECK_CONCURRENCY), and the asyncio engine with a semaphore.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_youtube_server import FakeYouTubeServer, make_channels
+
+def bench_sync(channels, api_key, workers):
+    from app.services.youtube_service import YouTubeService
+
+    def fetch(channel):
+        return YouTubeService._fetch_uploads_playlist(
+            channel['channel_id'], 15, api_key, uploads_playlist_id=channel['uploads_playlist_id']
+        )
+
+    start = time.perf_counter()
+    if workers == 1:
+        for channel in channels:
+            fetch(channel)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fetch, channels))
+    return time.perf_counter() - start
+
+def bench_async(channels, api_key, max_in_flight):
+    from app.services.async_check_engine import AsyncCheckEngine
+
+    engine = AsyncCheckEngine(app=None, max_in_flight=max_in_flight)
+    start = time.perf_counter()
+    statuses = engine.fetch_playlists(channels, api_key)
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for status in statuses.values() if status != 200)
+    if failed:
+        print(f"  warning: {failed} async requests failed")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--latency', type=float, default=0.02, help='Artificial server latency in seconds')
+    parser.add_argument('--workers', type=int, default=16, help='Thread pool size for the sync engine')
+    parser.add_argument('--in-flight', type=int, default=100, help='Max requests in flight for the async engine')
+    parser.add_argument('--skip-sequential-above', type=int, default=1000,
+                        help='Skip the sequential run for larger sizes (it takes size x latency seconds)')
+    args = parser.parse_args()
+
+    server = FakeYouTubeServer(latency=args.latency).start()
+    os.environ['YOUTUBE_API_BASE_URL'] = server.base_url
+
+    from app.services import youtube_service
+    from app.services.http_client import youtube_http
+    youtube_service.YOUTUBE_API_BASE_URL = server.base_url
+    youtube_http.configure(pool_size=max(args.workers, 1))
+
+    api_key = 'benchmark-key'
+    print(f"Fake API at {server.base_url}, latency {args.latency * 1000:.0f} ms")
+    print(f"{'channels':>9} {'engine':<22} {'seconds':>9} {'channels/s':>11}")
+
+    for size in args.sizes:
+        channels = make_channels(size)
+        runs = []
+        if size <= args.skip_sequential_above:
+            runs.append(('sync sequential', lambda: bench_sync(channels, api_key, 1)))
+        runs.append((f"sync {args.workers} threads", lambda: bench_sync(channels, api_key, args.workers)))
+        runs.append((f"async {args.in_flight} in flight", lambda: bench_async(channels, api_key, args.in_flight)))
+
+        for name, run in runs:
+            elapsed = run()
+            print(f"{size:>9} {name:<22} {elapsed:>9.2f} {size / elapsed:>11.0f}")
+
+    server.stop()
+
+if __name__ == '__main__':
+    main()
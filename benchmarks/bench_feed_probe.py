@@ -0,0 +1,82 @@
+# benchmarks/bench_feed_probe.py
+"""
+Compare the RSS feed probe with the uploads-playlist fetch against a local fake YouTube.
+
+    python -m benchmarks.bench_feed_probe --sizes 100 1000 --latency 0.02
+
+Measures feed parse throughput, then per-channel checks with a thread pool: the
+playlistItems call (1 quota unit each), a full feed probe and a conditional (304)
+feed probe (no quota). Only the HTTP and parse stages are measured (no MongoDB).
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_youtube_server import FakeYouTubeServer, make_channels, make_feed
+
+def bench_parse(documents):
+    from app.services.feed_service import parse_feed
+
+    start = time.perf_counter()
+    for document in documents:
+        parse_feed(io.BytesIO(document))
+    return time.perf_counter() - start
+
+def bench_fetch(channels, workers, fetch):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(fetch, channels))
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--latency', type=float, default=0.02, help='Artificial server latency in seconds')
+    parser.add_argument('--workers', type=int, default=16, help='Thread pool size')
+    parser.add_argument('--parse-documents', type=int, default=2000, help='Feeds to parse for the parse benchmark')
+    args = parser.parse_args()
+
+    documents = [make_feed(f"UCparse{i:017d}").encode('utf-8') for i in range(args.parse_documents)]
+    elapsed = bench_parse(documents)
+    print(f"Parsed {len(documents)} feeds ({sum(map(len, documents)) // len(documents)} bytes each) "
+          f"in {elapsed:.2f}s: {len(documents) / elapsed:.0f} feeds/s")
+
+    server = FakeYouTubeServer(latency=args.latency).start()
+
+    from app.services import youtube_service, feed_service
+    from app.services.feed_service import FeedService
+    from app.services.youtube_service import YouTubeService
+    from app.services.http_client import youtube_http
+    youtube_service.YOUTUBE_API_BASE_URL = server.base_url
+    feed_service.YOUTUBE_FEED_URL = server.feed_url
+    youtube_http.configure(pool_size=max(args.workers, 1))
+
+    api_key = 'benchmark-key'
+    feed_etag = lambda channel: f'"{channel["channel_id"]}-feed-v1"'
+
+    runs = [
+        ('playlistItems', 1, lambda channel: YouTubeService._fetch_uploads_playlist(
+            channel['channel_id'], 15, api_key, uploads_playlist_id=channel['uploads_playlist_id'])),
+        ('feed (full)', 0, lambda channel: FeedService.fetch_feed(channel['channel_id'])['status']),
+        ('feed (304)', 0, lambda channel: FeedService.fetch_feed(channel['channel_id'], etag=feed_etag(channel))['status'])
+    ]
+
+    print(f"Fake YouTube at {server.base_url}, latency {args.latency * 1000:.0f} ms, {args.workers} threads")
+    print(f"{'channels':>9} {'check':<15} {'seconds':>9} {'channels/s':>11} {'quota units':>12}")
+
+    for size in args.sizes:
+        channels = make_channels(size)
+        for name, units, fetch in runs:
+            elapsed, _ = bench_fetch(channels, args.workers, fetch)
+            print(f"{size:>9} {name:<15} {elapsed:>9.2f} {size / elapsed:>11.0f} {size * units:>12}")
+
+    server.stop()
+
+if __name__ == '__main__':
+    main()
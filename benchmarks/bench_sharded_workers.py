@@ -0,0 +1,134 @@
+# benchmarks/bench_sharded_workers.py
+"""
+Measure sharded check throughput with 1..N worker processes claiming channels from MongoDB.
+
+    MONGO_URI=mongodb://localhost:27017/yt_monitor_bench python -m benchmarks.bench_sharded_workers \\
+        --channels 400 --workers 1 2 4 --latency 0.05
+
+Each worker process claims batches of due channels (CHECK_SHARDING), checks them
+against a local fake YouTube API and releases them with their next check moved an
+hour ahead, like the monitor does. The run reports channels checked per second
+and any channel checked twice. It needs a real MongoDB (claims rely on atomic
+find_one_and_update) and DROPS the channels, videos and check_workers
+collections of the database in MONGO_URI, so point it at a scratch database.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_youtube_server import FakeYouTubeServer, make_channels
+
+def run_worker(worker_id, batch_size, threads, barrier, results):
+    """Claim, check and release channels until none are due; report the IDs checked"""
+    from concurrent.futures import ThreadPoolExecutor
+    from app import create_app
+    from app.models.channel import Channel
+    from app.services.youtube_service import YouTubeService
+    from app.tasks.claimer import ChannelClaimer
+
+    app = create_app('production')
+    app.config['CLAIM_BATCH_SIZE'] = batch_size
+    checked = []
+
+    with app.app_context():
+        claimer = ChannelClaimer(worker_id)
+
+        def check(channel):
+            with app.app_context():
+                YouTubeService.check_channel(channel['channel_id'], enrich=False)
+            return channel['channel_id']
+
+        barrier.wait()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                claimed = claimer.claim(batch_size)
+                if not claimed:
+                    break
+                channel_ids = list(executor.map(check, claimed))
+                next_check_at = datetime.utcnow() + timedelta(hours=1)
+                Channel.set_schedules({channel_id: {'next_check_at': next_check_at} for channel_id in channel_ids})
+                claimer.release(channel_ids)
+                checked.extend(channel_ids)
+
+    results.put((worker_id, checked))
+
+def reset_database(channel_count):
+    from pymongo import MongoClient
+
+    client = MongoClient(os.environ['MONGO_URI'])
+    db = client.get_default_database()
+    for collection in ('channels', 'videos', 'check_workers'):
+        db.drop_collection(collection)
+    db.channels.insert_many([dict(channel, last_checked=None) for channel in make_channels(channel_count)])
+    db.channels.create_index([('active', 1), ('next_check_at', 1)], name='active_next_check')
+    db.videos.create_index('video_id', unique=True, name='video_id_unique')
+    client.close()
+
+def bench(workers, args, context):
+    reset_database(args.channels)
+    barrier = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_worker, args=(f"bench-{i}", args.batch_size, args.threads, barrier, results))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    # Time from the moment every worker has started up
+    barrier.wait()
+    start = time.perf_counter()
+    checked = {}
+    for _ in processes:
+        worker_id, channel_ids = results.get()
+        checked[worker_id] = channel_ids
+    elapsed = time.perf_counter() - start
+
+    for process in processes:
+        process.join()
+
+    all_ids = [channel_id for channel_ids in checked.values() for channel_id in channel_ids]
+    return elapsed, len(all_ids), len(all_ids) - len(set(all_ids)), sorted(len(ids) for ids in checked.values())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--channels', type=int, default=400)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--latency', type=float, default=0.05, help='Artificial server latency in seconds')
+    parser.add_argument('--batch-size', type=int, default=10, help='Channels claimed per batch (CLAIM_BATCH_SIZE)')
+    parser.add_argument('--threads', type=int, default=1, help='Checks run in parallel inside each worker')
+    args = parser.parse_args()
+
+    if not os.environ.get('MONGO_URI'):
+        parser.error("set MONGO_URI to a scratch database")
+
+    server = FakeYouTubeServer(latency=args.latency).start()
+    # Inherited by the worker processes
+    os.environ['YOUTUBE_API_BASE_URL'] = server.base_url
+    os.environ['YOUTUBE_API_KEY'] = 'benchmark-key'
+    os.environ['VERCEL'] = '1'  # No monitor thread in the workers
+    os.environ['CREATE_INDEXES_ON_STARTUP'] = 'False'
+    os.environ['LOG_LEVEL'] = 'WARNING'
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    context = multiprocessing.get_context('spawn')
+    print(f"Fake API at {server.base_url}, latency {args.latency * 1000:.0f} ms, {args.channels} channels")
+    print(f"{'workers':>8} {'seconds':>9} {'channels/s':>11} {'speedup':>8} {'duplicates':>11}  per worker")
+
+    baseline = None
+    for workers in args.workers:
+        elapsed, checked, duplicates, per_worker = bench(workers, args, context)
+        rate = checked / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {elapsed:>9.2f} {rate:>11.1f} {rate / baseline:>7.2f}x {duplicates:>11}  {per_worker}")
+
+    server.stop()
+
+if __name__ == '__main__':
+    main()
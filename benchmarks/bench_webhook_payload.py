@@ -0,0 +1,105 @@
+# benchmarks/bench_webhook_payload.py
+"""
+Measure the CPU and allocation cost of building webhook bodies at high fan-out.
+
+    python -m benchmarks.bench_webhook_payload --fanout 10 100 1000
+
+Compares the previous per-webhook path (copy the video, build the payload dict,
+json.dumps it for the request and again for the delivery log) with a
+NotificationPayload serialized once per video and rendered for each webhook. Only
+body construction is measured (no HTTP, no MongoDB).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_video():
+    return {
+        'video_id': 'dQw4w9WgXcQ',
+        'channel_id': 'UC_x5XG1OV2P6uZZ5FSM9Ttw',
+        'title': 'Benchmark video ' * 4,
+        'description': 'A fairly typical video description with links and hashtags. ' * 30,
+        'published_at': datetime.utcnow(),
+        'thumbnail_url': 'https://i.ytimg.com/vi/dQw4w9WgXcQ/hqdefault.jpg',
+        'notification_count': 0,
+        'duration': 'PT4M13S',
+        'view_count': 1234567,
+        'like_count': 54321,
+        'comment_count': 987,
+        'is_manual_notification': False
+    }
+
+def legacy_bodies(video_data, fanout):
+    """What each webhook cost before: a copy, a payload dict and two json.dumps calls"""
+    bodies = []
+    for _ in range(fanout):
+        data = dict(video_data)
+        payload = {
+            'video_id': data['video_id'],
+            'channel_id': data['channel_id'],
+            'title': data['title'],
+            'description': data['description'],
+            'published_at': data['published_at'].isoformat() + 'Z',
+            'thumbnail_url': data['thumbnail_url'],
+            'video_url': f"https://www.youtube.com/watch?v={data['video_id']}",
+            'notification_time': datetime.utcnow().isoformat() + 'Z',
+            'is_manual_notification': data.get('is_manual_notification', False)
+        }
+        if 'notification_count' in data:
+            payload['notification_count'] = data['notification_count']
+        for field in ('duration', 'view_count', 'like_count', 'comment_count'):
+            if data.get(field) is not None:
+                payload[field] = data[field]
+        body = json.dumps(payload, default=str)
+        log_body = json.dumps(payload, default=str)[:1000]
+        bodies.append((body, log_body))
+    return bodies
+
+def shared_bodies(video_data, fanout):
+    """One NotificationPayload per video, rendered per webhook; the log stores payload_id"""
+    from app.services.webhook_service import NotificationPayload
+
+    payload = NotificationPayload(video_data)
+    count = video_data.get('notification_count')
+    return [(payload.render(count), payload.payload_id) for _ in range(fanout)]
+
+def measure(function, video, fanout, videos):
+    start = time.perf_counter()
+    for _ in range(videos):
+        function(video, fanout)
+    elapsed = time.perf_counter() - start
+
+    # Allocations of one video's fan-out (kept alive until the end, like in-flight requests)
+    tracemalloc.start()
+    result = function(video, fanout)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed / (videos * fanout), allocated / fanout
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fanout', type=int, nargs='+', default=[10, 100, 1000], help='Webhooks per video')
+    parser.add_argument('--videos', type=int, default=200, help='Videos per timing run')
+    args = parser.parse_args()
+
+    video = make_video()
+    # Import the app outside the timed runs
+    shared_bodies(video, 1)
+    print(f"{'webhooks':>9} {'legacy us':>10} {'shared us':>10} {'speedup':>8} {'legacy B':>9} {'shared B':>9}  (per webhook)")
+    for fanout in args.fanout:
+        videos = max(args.videos * 10 // fanout, 1)
+        legacy_time, legacy_bytes = measure(legacy_bodies, video, fanout, videos)
+        shared_time, shared_bytes = measure(shared_bodies, video, fanout, videos)
+        print(f"{fanout:>9} {legacy_time * 1e6:>10.1f} {shared_time * 1e6:>10.1f} {legacy_time / shared_time:>7.1f}x "
+              f"{legacy_bytes:>9.0f} {shared_bytes:>9.0f}")
+
+if __name__ == '__main__':
+    main()
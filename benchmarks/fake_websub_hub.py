@@ -0,0 +1,174 @@
+# benchmarks/fake_websub_hub.py
+"""
+Local stand-in for the YouTube WebSub hub.
+
+Accepts subscribe/unsubscribe requests, verifies them against the callback with a
+challenge like the real hub, and publishes signed Atom notifications to subscribers.
+
+    python -m benchmarks.fake_websub_hub --port 8085
+
+Point the app at it with WEBSUB_HUB_URL=http://127.0.0.1:8085/subscribe, then type
+"<channel_id> <video_id>" lines on stdin to push a notification for that channel.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TOPIC_URL = 'https://www.youtube.com/xml/feeds/videos.xml'
+
+class FakeWebSubHub:
+    def __init__(self, host='127.0.0.1', port=0, verify_delay=0.0):
+        self.host = host
+        self.port = port
+        self.verify_delay = verify_delay
+        # callback -> {'topic', 'secret', 'expires'}
+        self.subscriptions = {}
+        self.log = []
+        self._loop = None
+        self._runner = None
+        self._started = threading.Event()
+
+    @property
+    def hub_url(self):
+        return f"http://{self.host}:{self.port}/subscribe"
+
+    def start(self):
+        """Start the hub on a background thread and wait until it is listening"""
+        thread = threading.Thread(target=self._serve, daemon=True)
+        thread.start()
+        self._started.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop and self._runner:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        app = web.Application()
+        app.router.add_post('/subscribe', self._subscribe)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _subscribe(self, request):
+        form = await request.post()
+        mode = form.get('hub.mode')
+        callback = form.get('hub.callback')
+        topic = form.get('hub.topic')
+        if mode not in ('subscribe', 'unsubscribe') or not callback or not topic:
+            return web.Response(status=400, text='hub.mode, hub.callback and hub.topic are required')
+
+        lease_seconds = int(form.get('hub.lease_seconds') or 432000)
+        asyncio.ensure_future(self._verify(mode, callback, topic, lease_seconds, form.get('hub.secret')))
+        return web.Response(status=202)
+
+    async def _verify(self, mode, callback, topic, lease_seconds, secret):
+        """Confirm the intent with the subscriber, as the real hub does before (un)subscribing"""
+        if self.verify_delay:
+            await asyncio.sleep(self.verify_delay)
+
+        challenge = secrets.token_hex(16)
+        params = {'hub.mode': mode, 'hub.topic': topic, 'hub.challenge': challenge}
+        if mode == 'subscribe':
+            params['hub.lease_seconds'] = str(lease_seconds)
+
+        try:
+            async with ClientSession() as session:
+                async with session.get(callback, params=params) as response:
+                    body = await response.text()
+                    verified = response.status < 300 and body == challenge
+        except Exception as e:
+            verified = False
+            body = str(e)
+
+        self.log.append((mode, callback, verified))
+        if not verified:
+            print(f"hub: {mode} of {callback} NOT verified ({body[:80]})")
+            return
+
+        if mode == 'subscribe':
+            self.subscriptions[callback] = {'topic': topic, 'secret': secret, 'expires': time.time() + lease_seconds}
+        else:
+            self.subscriptions.pop(callback, None)
+        print(f"hub: {mode} of {callback} verified")
+
+    def publish(self, channel_id, video_id, title='New video'):
+        """Push a notification for a channel's topic to every subscriber; returns their status codes"""
+        future = asyncio.run_coroutine_threadsafe(self._publish(channel_id, video_id, title), self._loop)
+        return future.result(30)
+
+    async def _publish(self, channel_id, video_id, title):
+        topic = f"{TOPIC_URL}?channel_id={channel_id}"
+        body = make_notification(channel_id, video_id, title).encode('utf-8')
+
+        statuses = {}
+        async with ClientSession() as session:
+            for callback, subscription in list(self.subscriptions.items()):
+                if subscription['topic'] != topic or subscription['expires'] < time.time():
+                    continue
+                headers = {'Content-Type': 'application/atom+xml'}
+                if subscription['secret']:
+                    digest = hmac.new(subscription['secret'].encode('utf-8'), body, hashlib.sha1).hexdigest()
+                    headers['X-Hub-Signature'] = f"sha1={digest}"
+                async with session.post(callback, data=body, headers=headers) as response:
+                    statuses[callback] = response.status
+        return statuses
+
+def make_notification(channel_id, video_id, title='New video'):
+    """Atom document shaped like a YouTube WebSub upload notification"""
+    now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">'
+        f'<link rel="hub" href="https://pubsubhubbub.appspot.com"/>'
+        f'<link rel="self" href="{TOPIC_URL}?channel_id={channel_id}"/>'
+        f'<title>YouTube video feed</title><updated>{now}</updated>'
+        f'<entry><id>yt:video:{video_id}</id><yt:videoId>{video_id}</yt:videoId>'
+        f'<yt:channelId>{channel_id}</yt:channelId><title>{title}</title>'
+        f'<link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>'
+        f'<author><name>{channel_id}</name></author>'
+        f'<published>{now}</published><updated>{now}</updated></entry>'
+        '</feed>'
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    args = parser.parse_args()
+
+    hub = FakeWebSubHub(host=args.host, port=args.port).start()
+    print(f"Fake WebSub hub at {hub.hub_url}")
+    print("Type '<channel_id> <video_id>' to publish a notification, Ctrl+D to quit")
+
+    for line in sys.stdin:
+        parts = line.split()
+        if len(parts) != 2:
+            print(f"{len(hub.subscriptions)} live subscriptions")
+            continue
+        statuses = hub.publish(*parts)
+        print(f"Delivered to {len(statuses)} subscribers: {statuses}")
+
+    hub.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/fake_youtube_server.py
+"""
+Local stand-in for the YouTube Data API used by the benchmarks.
+
+Serves playlistItems, channels and videos with a configurable artificial latency,
+and honours If-None-Match so ETag behaviour can be measured too. The channel RSS
+feed (/feeds/videos.xml) is served the same way.
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from aiohttp import web
+
+class FakeYouTubeServer:
+    def __init__(self, latency=0.02, videos_per_page=15, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.videos_per_page = videos_per_page
+        self.host = host
+        self.port = port
+        self.request_count = 0
+        self._loop = None
+        self._runner = None
+        self._started = threading.Event()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/youtube/v3"
+
+    @property
+    def feed_url(self):
+        return f"http://{self.host}:{self.port}/feeds/videos.xml"
+
+    def start(self):
+        """Start the server on a background thread and wait until it is listening"""
+        thread = threading.Thread(target=self._serve, daemon=True)
+        thread.start()
+        self._started.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop and self._runner:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        app = web.Application()
+        app.router.add_get('/youtube/v3/playlistItems', self._playlist_items)
+        app.router.add_get('/youtube/v3/channels', self._channels)
+        app.router.add_get('/youtube/v3/videos', self._videos)
+        app.router.add_get('/feeds/videos.xml', self._feed)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port, backlog=4096)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _respond(self, request, body, etag=None, content_type=None):
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if etag and request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        headers = {'ETag': etag} if etag else None
+        if content_type:
+            return web.Response(text=body, content_type=content_type, headers=headers)
+        return web.json_response(body, headers=headers)
+
+    async def _playlist_items(self, request):
+        playlist_id = request.query.get('playlistId', '')
+        published = datetime(2024, 1, 1)
+        items = []
+        for i in range(self.videos_per_page):
+            items.append({
+                'snippet': {
+                    'resourceId': {'videoId': f"{playlist_id[-6:]}{i:05d}"},
+                    'publishedAt': (published - timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    'title': f"Video {i} of {playlist_id}",
+                    'description': '',
+                    'thumbnails': {'high': {'url': 'https://i.ytimg.com/vi/x/hqdefault.jpg'}}
+                }
+            })
+        return await self._respond(request, {'items': items}, etag=f'"{playlist_id}-v1"')
+
+    async def _channels(self, request):
+        ids = request.query.get('id', '').split(',')
+        items = [{
+            'id': channel_id,
+            'snippet': {'title': channel_id, 'thumbnails': {}},
+            'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + channel_id[2:]}}
+        } for channel_id in ids if channel_id]
+        return await self._respond(request, {'items': items})
+
+    async def _videos(self, request):
+        ids = request.query.get('id', '').split(',')
+        items = [{
+            'id': video_id,
+            'contentDetails': {'duration': 'PT4M13S'},
+            'statistics': {'viewCount': '1', 'likeCount': '0', 'commentCount': '0'}
+        } for video_id in ids if video_id]
+        return await self._respond(request, {'items': items})
+
+    async def _feed(self, request):
+        channel_id = request.query.get('channel_id', '')
+        body = make_feed(channel_id, self.videos_per_page)
+        return await self._respond(request, body, etag=f'"{channel_id}-feed-v1"', content_type='application/atom+xml')
+
+def make_feed(channel_id, entries=15):
+    """Atom document shaped like a YouTube channel feed"""
+    published = datetime(2024, 1, 1)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" '
+        'xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">',
+        f"<id>yt:channel:{channel_id}</id><yt:channelId>{channel_id}</yt:channelId>",
+        f"<title>{channel_id}</title>"
+    ]
+    for i in range(entries):
+        video_id = f"{channel_id[-6:]}{i:05d}"
+        timestamp = (published - timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        parts.append(
+            f"<entry><id>yt:video:{video_id}</id><yt:videoId>{video_id}</yt:videoId>"
+            f"<yt:channelId>{channel_id}</yt:channelId><title>Video {i} of {channel_id}</title>"
+            f"<published>{timestamp}</published><updated>{timestamp}</updated>"
+            f"<media:group><media:title>Video {i}</media:title>"
+            f"<media:description>Description of video {i}</media:description>"
+            f"<media:thumbnail url=\"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg\" width=\"480\" height=\"360\"/>"
+            f"</media:group></entry>"
+        )
+    parts.append('</feed>')
+    return ''.join(parts)
+
+def make_channels(count):
+    """Channel documents with stored uploads playlist IDs, as the monitor would load them"""
+    return [{
+        'channel_id': f"UCbench{i:017d}",
+        'channel_name': f"Bench channel {i}",
+        'uploads_playlist_id': f"UUbench{i:017d}",
+        'active': True
+    } for i in range(count)]
@@ -0,0 +1,167 @@
+# tests/conftest.py
+
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import mongomock
+import pytest
+
+from app import create_app, mongo
+from app.services import youtube_service
+from app.services.api_key_pool import youtube_keys
+
+@pytest.fixture(scope='session')
+def app():
+    """The app without a monitor; every test gets its own in-memory database (see db)"""
+    return create_app('testing', start_monitor=False)
+
+@pytest.fixture
+def db(app):
+    previous = mongo.db
+    mongo.db = mongomock.MongoClient().db
+    with app.app_context():
+        yield mongo.db
+    mongo.db = previous
+
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        receiver = self.server.receiver
+        with receiver.lock:
+            failing = receiver.failures > 0
+            if failing:
+                receiver.failures -= 1
+            else:
+                receiver.requests.append((self.path, body))
+        self.send_response(500 if failing else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class Receiver:
+    """Local webhook receiver that records the JSON bodies it accepts; the next `failures` requests get a 500"""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = 0
+        self.lock = threading.Lock()
+        # Webhook sessions keep their connections open, so every connection gets its own thread
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _ReceiverHandler)
+        self.server.daemon_threads = True
+        self.server.receiver = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path='/hook'):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def receiver():
+    receiver = Receiver()
+    yield receiver
+    receiver.close()
+
+class _YouTubeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        endpoint = url.path.rsplit('/', 1)[-1]
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        api = self.server.api
+        with api.lock:
+            api.calls.append(endpoint)
+        if api.delay:
+            time.sleep(api.delay)
+
+        if endpoint == 'videos':
+            ids = [video_id for video_id in query.get('id', '').split(',') if video_id in api.videos]
+            body = {'items': [api.video_item(video_id) for video_id in ids]}
+        elif endpoint == 'playlistItems':
+            channel_id = 'UC' + query.get('playlistId', '')[2:]
+            body = {'items': [api.playlist_item(video_id) for video_id, video in api.videos.items() if video['channel_id'] == channel_id]}
+        else:
+            body = {'items': []}
+
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class YouTubeApi:
+    """
+    Local stand-in for the YouTube Data API (videos and playlistItems)
+
+    Serves the videos added with add_video, newest first, and records the endpoint of
+    every call in .calls; each response waits .delay seconds.
+    """
+
+    def __init__(self):
+        self.videos = {}
+        self.calls = []
+        self.delay = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _YouTubeApiHandler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/youtube/v3"
+
+    def add_video(self, channel_id, video_id, title='New video'):
+        published = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        # Newest first, like the uploads playlist
+        self.videos = dict([(video_id, {'channel_id': channel_id, 'title': title, 'published_at': published})] + list(self.videos.items()))
+
+    def snippet(self, video_id):
+        video = self.videos[video_id]
+        return {
+            'channelId': video['channel_id'],
+            'title': video['title'],
+            'description': '',
+            'publishedAt': video['published_at'],
+            'thumbnails': {'high': {'url': f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}}
+        }
+
+    def video_item(self, video_id):
+        return {
+            'id': video_id,
+            'snippet': self.snippet(video_id),
+            'contentDetails': {'duration': 'PT4M13S'},
+            'statistics': {'viewCount': '1', 'likeCount': '0', 'commentCount': '0'}
+        }
+
+    def playlist_item(self, video_id):
+        return {'snippet': dict(self.snippet(video_id), resourceId={'videoId': video_id})}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def youtube_api(db, monkeypatch):
+    api = YouTubeApi()
+    monkeypatch.setattr(youtube_service, 'YOUTUBE_API_BASE_URL', api.base_url)
+    youtube_keys.set_keys(['test-api-key'])
+    yield api
+    youtube_keys.set_keys([])
+    api.close()
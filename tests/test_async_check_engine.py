@@ -0,0 +1,77 @@
+# tests/test_async_check_engine.py
+
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.services.async_check_engine import AsyncCheckEngine
+from app.services.single_flight import channel_checks
+from app.services.youtube_service import YouTubeService
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+@pytest.fixture
+def channel(db, youtube_api):
+    """A channel with one new upload; every response of the API stand-in takes half a second"""
+    channel_id = 'UC' + uuid.uuid4().hex[:22]
+    channel = {'channel_id': channel_id, 'channel_name': 'Test channel', 'active': True,
+               'uploads_playlist_id': 'UU' + channel_id[2:]}
+    db.channels.insert_one(dict(channel))
+    youtube_api.add_video(channel_id, channel_id[-11:], 'New upload')
+    youtube_api.delay = 0.5
+    yield channel
+    channel_checks.forget(channel_id)
+
+def in_thread(app, function):
+    """Run function in an app context on another thread; returns (thread, results list)"""
+    results = []
+
+    def run():
+        with app.app_context():
+            results.append(function())
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, results
+
+def test_sync_check_during_an_async_check_shares_its_api_call(app, channel, youtube_api):
+    engine = AsyncCheckEngine(app, fresh_for=60)
+    thread, results = in_thread(app, lambda: engine.run([channel]))
+    assert wait_for(lambda: youtube_api.calls)
+
+    sync_result = YouTubeService.check_channel(channel['channel_id'], enrich=False)
+    thread.join(10)
+
+    [(_, async_result)] = results[0]
+    assert youtube_api.calls == ['playlistItems']
+    assert async_result['shared'] is False
+    assert [video['video_id'] for video in async_result['new_videos']] == [channel['channel_id'][-11:]]
+    assert sync_result['shared'] is True
+    assert sync_result['new_videos'] == async_result['new_videos']
+
+def test_async_check_during_a_sync_check_shares_its_api_call(app, channel, youtube_api):
+    thread, results = in_thread(app, lambda: YouTubeService.check_channel(channel['channel_id'], enrich=False))
+    assert wait_for(lambda: youtube_api.calls)
+
+    [(_, async_result)] = AsyncCheckEngine(app, fresh_for=60).run([channel])
+    thread.join(10)
+
+    assert youtube_api.calls == ['playlistItems']
+    assert results[0]['shared'] is False and len(results[0]['new_videos']) == 1
+    assert async_result['shared'] is True
+
+def test_async_check_reuses_a_fresh_result(app, channel, youtube_api):
+    YouTubeService.check_channel(channel['channel_id'], enrich=False)
+
+    [(_, async_result)] = AsyncCheckEngine(app, fresh_for=60).run([channel])
+
+    assert youtube_api.calls == ['playlistItems']
+    assert async_result['shared'] is True
@@ -0,0 +1,92 @@
+# tests/test_feed_service.py
+
+import io
+import os
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from app.services import feed_service
+from app.services.feed_service import FeedService, parse_feed
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+def fixture_path(name):
+    return os.path.join(FIXTURES, name)
+
+def test_parse_feed_reads_entries_in_order():
+    entries = parse_feed(fixture_path('feed_channel.xml'))
+
+    assert [entry['video_id'] for entry in entries] == ['aaaaaaaaaa1', 'aaaaaaaaaa2', 'aaaaaaaaaa3']
+    assert {entry['channel_id'] for entry in entries} == {'UC_x5XG1OV2P6uZZ5FSM9Ttw'}
+    # The feed's own <title> and the entry's media:title don't leak into the entry title
+    assert entries[0]['title'] == 'Newest upload'
+
+def test_parse_feed_converts_published_to_naive_utc():
+    entries = parse_feed(fixture_path('feed_channel.xml'))
+
+    assert entries[0]['published_at'] == datetime(2024, 3, 2, 17, 0, 5)
+    assert entries[1]['published_at'] == datetime(2024, 3, 1, 17, 30)
+    assert entries[2]['published_at'] is None
+
+def test_parse_feed_skips_entries_without_video_id():
+    entries = parse_feed(fixture_path('feed_channel.xml'))
+
+    assert 'Entry without a video ID' not in [entry['title'] for entry in entries]
+
+def test_parse_feed_deleted_entry_has_no_videos():
+    assert parse_feed(fixture_path('feed_deleted_entry.xml')) == []
+
+def test_parse_feed_accepts_file_objects():
+    with open(fixture_path('feed_channel.xml'), 'rb') as f:
+        body = f.read()
+
+    assert len(parse_feed(io.BytesIO(body))) == 3
+
+def test_parse_feed_raises_on_malformed_xml():
+    with pytest.raises(ET.ParseError):
+        parse_feed(fixture_path('feed_malformed.xml'))
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with open(fixture_path(self.server.fixture), 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/atom+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def feed_server(monkeypatch):
+    server = HTTPServer(('127.0.0.1', 0), _FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(feed_service, 'YOUTUBE_FEED_URL', f"http://127.0.0.1:{server.server_port}/feeds/videos.xml")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_fetch_feed_parses_response(feed_server):
+    feed_server.fixture = 'feed_channel.xml'
+
+    result = FeedService.fetch_feed('UC_x5XG1OV2P6uZZ5FSM9Ttw')
+
+    assert result['status'] == 'ok'
+    assert result['etag'] == '"v1"'
+    assert [entry['video_id'] for entry in result['entries']] == ['aaaaaaaaaa1', 'aaaaaaaaaa2', 'aaaaaaaaaa3']
+
+def test_fetch_feed_reports_malformed_xml_as_error(feed_server):
+    feed_server.fixture = 'feed_malformed.xml'
+
+    result = FeedService.fetch_feed('UC_x5XG1OV2P6uZZ5FSM9Ttw')
+
+    assert result['status'] == 'error'
+    assert result['entries'] == []
@@ -0,0 +1,198 @@
+# tests/test_webhook_digest.py
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.outbox import OutboxJob
+from app.models.webhook import Webhook
+from app.tasks.delivery_task import DeliveryWorkers
+
+@pytest.fixture
+def workers(db):
+    return DeliveryWorkers()
+
+def make_videos(db, count):
+    """Store count videos (unique IDs, so cached payloads never leak between tests)"""
+    prefix = uuid.uuid4().hex[:6]
+    videos = [
+        {
+            'video_id': f"{prefix}{index}",
+            'channel_id': 'UC_x5XG1OV2P6uZZ5FSM9Ttw',
+            'title': f"Video {index}",
+            'description': 'Description',
+            'published_at': datetime.utcnow(),
+            'thumbnail_url': 'https://i.ytimg.com/vi/x/hqdefault.jpg'
+        }
+        for index in range(count)
+    ]
+    db.videos.insert_many([dict(video) for video in videos])
+    return videos
+
+def add_webhook(receiver, mode, max_batch=25, window_seconds=60):
+    webhook = Webhook.create(receiver.url(), digest={'mode': mode, 'window_seconds': window_seconds, 'max_batch': max_batch})
+    return str(webhook['_id'])
+
+def make_due(db):
+    """Let every waiting job be claimed now (closes digest windows, skips retry backoff)"""
+    db.webhook_outbox.update_many({'status': {'$in': ['pending', 'held']}}, {'$set': {'next_attempt_at': datetime.utcnow() - timedelta(seconds=1)}})
+
+def deliver_all(workers):
+    processed = 0
+    while workers.deliver_next():
+        processed += 1
+    return processed
+
+def sent_ids(receiver):
+    return [[video['video_id'] for video in body['videos']] for _, body in receiver.requests]
+
+def statuses(db):
+    return sorted(job['status'] for job in db.webhook_outbox.find())
+
+def test_off_mode_sends_one_request_per_video(db, workers, receiver):
+    Webhook.create(receiver.url())
+    videos = make_videos(db, 3)
+
+    workers.enqueue(videos)
+    deliver_all(workers)
+
+    assert sorted(body['video_id'] for _, body in receiver.requests) == sorted(video['video_id'] for video in videos)
+    assert not any(body.get('is_digest') for _, body in receiver.requests)
+
+def test_window_holds_videos_until_the_window_closes(db, workers, receiver):
+    add_webhook(receiver, 'window')
+    first, second = make_videos(db, 2)
+
+    workers.enqueue([first])
+    workers.enqueue([second])
+
+    # The second video joined the window the first one opened
+    due_times = {job['next_attempt_at'] for job in db.webhook_outbox.find()}
+    assert len(due_times) == 1 and due_times.pop() > datetime.utcnow()
+    assert deliver_all(workers) == 0
+
+    make_due(db)
+    deliver_all(workers)
+
+    assert len(receiver.requests) == 1
+    body = receiver.requests[0][1]
+    assert body['is_digest'] is True and body['video_count'] == 2
+    assert sent_ids(receiver) == [[first['video_id'], second['video_id']]]
+    assert statuses(db) == ['delivered', 'delivered']
+
+def test_window_batches_are_limited_to_max_batch(db, workers, receiver):
+    add_webhook(receiver, 'window', max_batch=2)
+    videos = make_videos(db, 5)
+
+    workers.enqueue(videos)
+    make_due(db)
+    deliver_all(workers)
+
+    assert [len(ids) for ids in sent_ids(receiver)] == [2, 2, 1]
+    assert sorted(video_id for ids in sent_ids(receiver) for video_id in ids) == sorted(video['video_id'] for video in videos)
+    assert statuses(db) == ['delivered'] * 5
+
+def test_gather_batch_only_takes_unsent_jobs_of_the_same_webhook(db, workers, receiver):
+    add_webhook(receiver, 'window', max_batch=10)
+    Webhook.create(receiver.url('/other'), digest={'mode': 'window', 'window_seconds': 60, 'max_batch': 10})
+    videos = make_videos(db, 3)
+
+    workers.enqueue(videos)
+    make_due(db)
+    head = OutboxJob.claim(workers.worker_id, 60)
+    members = OutboxJob.gather_batch(head, 10)
+
+    # Three videos for each of the two webhooks; the batch takes the other two of the head's webhook
+    assert db.webhook_outbox.count_documents({}) == 6
+    assert {member['webhook_id'] for member in members} == {head['webhook_id']}
+    assert len(members) == 2
+    assert all(member['status'] == 'batched' and member['batch_id'] == head['_id'] for member in members)
+    # A second gather returns the same members instead of taking more
+    assert [member['_id'] for member in OutboxJob.gather_batch(head, 10)] == [member['_id'] for member in members]
+
+def test_cycle_jobs_wait_for_their_own_cycle(db, workers, receiver):
+    add_webhook(receiver, 'cycle')
+    ours = make_videos(db, 2)
+    theirs = make_videos(db, 1)
+    # Another monitor process with its own check cycle
+    other = DeliveryWorkers()
+
+    cycle_id = workers.open_cycle(3600)
+    workers.enqueue(ours)
+    other_cycle_id = other.open_cycle(3600)
+    other.enqueue(theirs)
+
+    assert statuses(db) == ['held'] * 3
+    assert deliver_all(workers) == 0
+
+    assert workers.close_cycle(cycle_id) == 2
+    deliver_all(workers)
+
+    assert sent_ids(receiver) == [[video['video_id'] for video in ours]]
+    assert db.webhook_outbox.find_one({'video_id': theirs[0]['video_id']})['status'] == 'held'
+
+    other.close_cycle(other_cycle_id)
+    deliver_all(workers)
+
+    assert sent_ids(receiver)[1] == [theirs[0]['video_id']]
+    assert statuses(db) == ['delivered'] * 3
+
+def test_cycle_jobs_go_out_at_the_deadline_if_the_cycle_never_closes(db, workers, receiver):
+    add_webhook(receiver, 'cycle')
+    videos = make_videos(db, 2)
+
+    workers.open_cycle(3600)
+    workers.enqueue(videos)
+    # The process that opened the cycle died; its deadline passes
+    make_due(db)
+    deliver_all(workers)
+
+    assert sent_ids(receiver) == [[video['video_id'] for video in videos]]
+
+def test_without_an_open_cycle_jobs_join_the_polling_interval_slot(app, db, workers):
+    now = datetime.utcnow()
+
+    cycle_id, deadline = workers.current_cycle(now)
+
+    assert cycle_id.startswith('slot:')
+    assert now < deadline <= now + timedelta(seconds=app.config['POLLING_INTERVAL'])
+    assert workers.current_cycle(now)[0] == cycle_id
+
+def test_failed_batch_is_retried_with_the_same_videos(db, workers, receiver):
+    webhook_id = add_webhook(receiver, 'window')
+    videos = make_videos(db, 3)
+    receiver.failures = 1
+
+    workers.enqueue(videos)
+    make_due(db)
+    deliver_all(workers)
+
+    assert receiver.requests == []
+    assert statuses(db) == ['batched', 'batched', 'pending']
+
+    make_due(db)
+    deliver_all(workers)
+
+    assert sent_ids(receiver) == [[video['video_id'] for video in videos]]
+    assert statuses(db) == ['delivered'] * 3
+    logs = list(db.webhook_deliveries.find({'webhook_id': Webhook.get_by_id(webhook_id)['_id']}))
+    assert [log['success'] for log in logs] == [False, True]
+    assert logs[0]['batch_id'] == logs[1]['batch_id']
+    assert logs[1]['video_ids'] == [video['video_id'] for video in videos]
+
+def test_batch_of_a_webhook_deactivated_mid_batch_is_cancelled(db, workers, receiver):
+    webhook_id = add_webhook(receiver, 'window')
+    videos = make_videos(db, 3)
+    receiver.failures = 1
+
+    workers.enqueue(videos)
+    make_due(db)
+    deliver_all(workers)
+    Webhook.update(webhook_id, active=False)
+
+    make_due(db)
+    deliver_all(workers)
+
+    assert receiver.requests == []
+    assert statuses(db) == ['cancelled'] * 3
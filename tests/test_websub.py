@@ -0,0 +1,98 @@
+# tests/test_websub.py
+
+import hashlib
+import hmac
+import threading
+import time
+
+import pytest
+from werkzeug.serving import make_server
+
+from app.models.webhook import Webhook
+from app.services.websub_service import WebSubService
+from benchmarks.fake_websub_hub import FakeWebSubHub, make_notification
+
+CHANNEL_ID = 'UC_x5XG1OV2P6uZZ5FSM9Ttw'
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+@pytest.fixture
+def channel(db):
+    db.channels.insert_one({'channel_id': CHANNEL_ID, 'channel_name': 'Test channel', 'active': True})
+    return CHANNEL_ID
+
+@pytest.fixture
+def app_server(app, db):
+    """The app served over HTTP so the hub can call /websub/callback"""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+@pytest.fixture
+def hub(app, app_server, monkeypatch):
+    hub = FakeWebSubHub().start()
+    monkeypatch.setitem(app.config, 'WEBSUB_ENABLED', True)
+    monkeypatch.setitem(app.config, 'WEBSUB_HUB_URL', hub.hub_url)
+    monkeypatch.setitem(app.config, 'WEBSUB_CALLBACK_URL', f"{app_server}/websub/callback")
+    yield hub
+    hub.stop()
+
+@pytest.fixture
+def subscribed(db, channel, hub):
+    assert WebSubService.subscribe(channel)
+    assert wait_for(lambda: hub.log)
+    return db.channels.find_one({'channel_id': channel})
+
+def test_subscribe_is_verified_by_echoing_the_challenge(subscribed, hub):
+    callback = WebSubService.callback_url(CHANNEL_ID)
+
+    assert hub.log == [('subscribe', callback, True)]
+    assert subscribed['websub']['state'] == 'subscribed'
+    # The hub signs pushes with the secret sent in the subscribe request
+    assert subscribed['websub']['secret'] == hub.subscriptions[callback]['secret']
+    assert subscribed['websub']['pending_secret'] is None
+
+def test_verification_with_another_topic_is_refused(app, channel):
+    response = app.test_client().get(f"/websub/callback/{channel}", query_string={
+        'hub.mode': 'subscribe',
+        'hub.topic': WebSubService.topic_url('UCsomeoneelse0000000000'),
+        'hub.challenge': 'abc'
+    })
+
+    assert response.status_code == 404
+
+def test_signed_push_stores_the_video_and_queues_webhook_jobs(db, subscribed, hub, youtube_api):
+    Webhook.create('http://127.0.0.1:9/hook')
+    youtube_api.add_video(CHANNEL_ID, 'pushvideo01', 'Pushed upload')
+
+    statuses = hub.publish(CHANNEL_ID, 'pushvideo01', 'Pushed upload')
+
+    assert list(statuses.values()) == [202]
+    assert wait_for(lambda: db.webhook_outbox.count_documents({'video_id': 'pushvideo01'}) == 1)
+    video = db.videos.find_one({'video_id': 'pushvideo01'})
+    assert video['channel_id'] == CHANNEL_ID and video['title'] == 'Pushed upload'
+    assert youtube_api.calls == ['videos']
+
+@pytest.mark.parametrize('signature', [None, 'sha1=' + '0' * 40, 'sha1=' + hmac.new(b'wrong secret', b'', hashlib.sha1).hexdigest()])
+def test_push_with_missing_or_bad_signature_is_ignored(app, db, subscribed, youtube_api, signature):
+    Webhook.create('http://127.0.0.1:9/hook')
+    youtube_api.add_video(CHANNEL_ID, 'pushvideo02')
+    headers = {'Content-Type': 'application/atom+xml'}
+    if signature:
+        headers['X-Hub-Signature'] = signature
+
+    response = app.test_client().post(f"/websub/callback/{CHANNEL_ID}", data=make_notification(CHANNEL_ID, 'pushvideo02'), headers=headers)
+
+    # Acknowledged so the hub doesn't retry, but nothing is fetched or stored
+    assert response.status_code == 202
+    assert db.videos.count_documents({}) == 0
+    assert db.webhook_outbox.count_documents({}) == 0
+    assert youtube_api.calls == []